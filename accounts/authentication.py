@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+
+class UserCache:
+    """
+    Two tiers of user rows keyed by id: an in-process LRU bounded by
+    ``max_entries`` whose entries live ``timeout`` seconds, then an
+    optional shared Django cache (``shared``) that every process reads.
+
+    Rows are kept as column values and rebuilt into a fresh User on every
+    hit, so a request that modifies ``request.user`` never changes the
+    object another request sees. Invalidation reaches the shared tier and
+    this process at once; other processes can serve their local copy
+    until it expires, so keep ``timeout`` short.
+    """
+
+    def __init__(self, timeout=30, max_entries=10000, shared=None, shared_timeout=300):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fields = [field.attname for field in User._meta.concrete_fields]
+
+    def key(self, user_id):
+        return f'auth:user:{user_id}'
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, values = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    return self._build(values)
+                del self._entries[user_id]
+        if self.shared is None:
+            return None
+        values = self.shared.get(self.key(user_id))
+        if values is None or len(values) != len(self._fields):
+            return None
+        self._remember(user_id, values)
+        return self._build(values)
+
+    def set(self, user):
+        values = tuple(getattr(user, name) for name in self._fields)
+        if self.shared is not None:
+            self.shared.set(self.key(user.pk), values, self.shared_timeout)
+        self._remember(user.pk, values)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.shared is not None:
+            self.shared.delete(self.key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, user_id, values):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.timeout, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _build(self, values):
+        return User.from_db(DEFAULT_DB_ALIAS, self._fields, values)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_user_cache = None
+
+
+def get_user_cache():
+    """The cache configured by AUTH_USER_CACHE, or None when its TIMEOUT is 0."""
+    global _user_cache
+    if _user_cache is None:
+        config = getattr(settings, 'AUTH_USER_CACHE', {})
+        if not config.get('TIMEOUT', 30):
+            return None
+        alias = config.get('SHARED_CACHE')
+        _user_cache = UserCache(
+            timeout=config.get('TIMEOUT', 30),
+            max_entries=config.get('MAX_ENTRIES', 10000),
+            shared=caches[alias] if alias else None,
+            shared_timeout=config.get('SHARED_TIMEOUT', 300),
+        )
+    return _user_cache
+
+
+@receiver(setting_changed)
+def reset_user_cache(setting, **kwargs):
+    global _user_cache
+    if setting in ('AUTH_USER_CACHE', 'CACHES'):
+        _user_cache = None
+
+
+def invalidate_user(user_id):
+    """
+    Forget the cached row of ``user_id`` now, and again once the current
+    transaction commits, so a request that read the old row in between
+    can't leave it cached.
+    """
+    cache = get_user_cache()
+    if cache is None or user_id is None:
+        return
+    cache.delete(user_id)
+    transaction.on_commit(lambda: cache.delete(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that, once the token's signature and expiry check
+    out, takes the user from the user cache instead of a query per
+    request. The active and password-change checks still run on every
+    request, against the cached row.
+    """
+
+    def get_user(self, validated_token):
+        cache = get_user_cache()
+        if cache is None:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(user)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
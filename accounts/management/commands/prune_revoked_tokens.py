@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.revocation import prune_revoked_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete revoked refresh tokens that have expired. They would be "
+        "refused anyway, so only the table's size changes."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_revoked_tokens()
+        self.stdout.write(f"Pruned {deleted} expired revoked tokens.")
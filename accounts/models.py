@@ -10,6 +10,8 @@ class User(AbstractUser):
     phone = models.CharField(max_length=15, blank=True, null=True)
     bio = models.TextField(max_length=500, blank=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Storage names of the avatar's thumbnails by label, filled in the background
+    avatar_renditions = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -25,4 +27,20 @@ class User(AbstractUser):
     
     @property
     def full_name(self):
-        return f"{self.first_name} {self.last_name}".strip() or self.username
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}".strip() or self.username
+
+
+class RevokedToken(models.Model):
+    """
+    A refresh token that may not be used again, by its ``jti``. Rows are
+    only needed until the token would have expired anyway, so
+    ``prune_revoked_tokens`` deletes them after ``expires_at``.
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'revoked_tokens'
+    
+    def __str__(self):
+        return self.jti
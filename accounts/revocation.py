@@ -0,0 +1,131 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+
+class RevocationList:
+    """
+    The jtis this process knows to be revoked, with their expiry (epoch
+    seconds). Expired entries are dropped every ``prune_interval``
+    seconds, and the oldest go first past ``max_entries``. It only ever
+    says yes: a jti missing here may still be revoked in the database.
+    """
+
+    def __init__(self, max_entries=100000, prune_interval=60):
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.time() + prune_interval
+
+    def __contains__(self, jti):
+        expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._entries[jti] = expires_at
+            if len(self._entries) > self.max_entries or time.time() >= self._next_prune:
+                self._prune()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _prune(self):
+        now = time.time()
+        self._entries = {jti: expires_at for jti, expires_at in self._entries.items() if expires_at > now}
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._next_prune = now + self.prune_interval
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_revocation_list = None
+
+
+def get_revocation_list():
+    global _revocation_list
+    if _revocation_list is None:
+        _revocation_list = RevocationList(max_entries=getattr(settings, 'AUTH_REVOCATION_CACHE_SIZE', 100000))
+    return _revocation_list
+
+
+@receiver(setting_changed)
+def reset_revocation_list(setting, **kwargs):
+    global _revocation_list
+    if setting == 'AUTH_REVOCATION_CACHE_SIZE':
+        _revocation_list = None
+
+
+def revoke(token):
+    """
+    Revoke ``token`` until it expires. Returns False when it already was,
+    which makes this the check too: of two requests rotating the same
+    refresh token, only one gets True.
+    """
+    jti, expires_at = token[api_settings.JTI_CLAIM], token['exp']
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=datetime_from_epoch(expires_at))
+    except IntegrityError:
+        revoked = False
+    else:
+        revoked = True
+    get_revocation_list().add(jti, expires_at)
+    return revoked
+
+
+def is_revoked(token):
+    """Whether ``token`` was revoked; known revocations cost no query."""
+    jti = token.get(api_settings.JTI_CLAIM)
+    revocations = get_revocation_list()
+    if jti in revocations:
+        return True
+    if RevokedToken.objects.filter(jti=jti).exists():
+        revocations.add(jti, token['exp'])
+        return True
+    return False
+
+
+def prune_revoked_tokens():
+    """Delete revocations of tokens that have expired anyway. Returns how many."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    RefreshToken checked against, and revoked into, the RevokedToken
+    table instead of simplejwt's token_blacklist app, which keeps every
+    token ever issued. Decoding only consults this process's revocation
+    list; ``blacklist()`` is the authoritative check when rotating, and
+    ``check_revoked()`` when not.
+    """
+
+    def verify(self):
+        super().verify()
+        if self.payload.get(api_settings.JTI_CLAIM) in get_revocation_list():
+            raise TokenError(_("Token is blacklisted"))
+
+    def check_revoked(self):
+        if is_revoked(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        if not revoke(self):
+            raise TokenError(_("Token is blacklisted"))
@@ -1,19 +1,30 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
+from task_management_api.fieldsets import SelectableFieldsMixin
+from task_management_api.renditions import rendition_urls
+from .revocation import RevocableRefreshToken, is_revoked
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
+    avatar_renditions = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
-            'full_name', 'phone', 'bio', 'avatar', 'created_at'
+            'full_name', 'phone', 'bio', 'avatar', 'avatar_renditions', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+    
+    def get_avatar_renditions(self, obj):
+        """Thumbnail URLs by label ('small', 'medium'); empty until they are rendered."""
+        return rendition_urls(obj.avatar, obj.avatar_renditions, self.context.get('request'))
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -56,3 +67,23 @@ class ChangePasswordSerializer(serializers.Serializer):
         required=True,
         validators=[validate_password]
     )
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refuses revoked refresh tokens, and revokes the old one on rotation."""
+    token_class = RevocableRefreshToken
+    
+    def validate(self, attrs):
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            self.token_class(attrs['refresh']).check_revoked()
+        return super().validate(attrs)
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        # Only refresh tokens are ever revoked; access tokens cost no query
+        if token.get(api_settings.TOKEN_TYPE_CLAIM) == RevocableRefreshToken.token_type and is_revoked(token):
+            raise serializers.ValidationError("Token is blacklisted")
+        return {}
+
+class TokenBlacklistSerializer(jwt_serializers.TokenBlacklistSerializer):
+    token_class = RevocableRefreshToken
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from task_management_api.renditions import current_renditions, render, submit
+from .authentication import invalidate_user
+from .models import User
+
+# Square thumbnails, cropped to fill, for lists and for profile pages
+AVATAR_RENDITIONS = {
+    'small': (48, 48),
+    'medium': (128, 128),
+}
+
+
+def render_avatar(user_id, name):
+    storage = User._meta.get_field('avatar').storage
+    renditions = render(storage, name, AVATAR_RENDITIONS, crop=True)
+    # Skipped when the avatar changed again while this one was rendering
+    if User.objects.filter(pk=user_id, avatar=name).update(avatar_renditions=renditions, updated_at=timezone.now()):
+        invalidate_user(user_id)
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, **kwargs):
+    if instance.avatar and not current_renditions(instance.avatar, instance.avatar_renditions):
+        submit(render_avatar, instance.pk, instance.avatar.name)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
@@ -1,14 +1,30 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
+from .authentication import get_user_cache
+from .models import RevokedToken
+from .revocation import RevocableRefreshToken, RevocationList, get_revocation_list, revoke
 
 User = get_user_model()
 
+# A fresh in-process store per test, whatever THROTTLE_STORE is configured
+LOCAL_THROTTLE_STORE = {'BACKEND': 'task_management_api.throttling.LocalBucketStore', 'OPTIONS': {}}
+
 class UserAuthenticationTests(TestCase):
     """Test user authentication endpoints"""
     
     def setUp(self):
+        # Logins share the test client's IP; start each test with full buckets
+        self.enterContext(override_settings(THROTTLE_STORE=LOCAL_THROTTLE_STORE))
         self.client = APIClient()
         self.register_url = '/api/auth/register/'
         self.login_url = '/api/auth/login/'
@@ -53,3 +69,184 @@ class UserAuthenticationTests(TestCase):
             'password': 'wrongpass'
         })
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AvatarRenditionTests(TestCase):
+    """Avatar thumbnails rendered after upload"""
+    
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=media, RENDITION_WORKERS=0, THROTTLE_STORE=LOCAL_THROTTLE_STORE))
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def upload_avatar(self, size):
+        image = BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(image, 'PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/auth/profile/', {
+                'avatar': SimpleUploadedFile('me.png', image.getvalue(), content_type='image/png')
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+    
+    def test_renditions_listed_with_user(self):
+        self.upload_avatar((640, 480))
+        self.assertEqual(set(self.user.avatar_renditions), {'small', 'medium'})
+        with self.user.avatar.storage.open(self.user.avatar_renditions['small']) as small:
+            self.assertEqual(Image.open(small).size, (48, 48))
+        
+        listed = self.client.get('/api/auth/users/').data
+        listed = listed.get('results', listed)[0]
+        self.assertTrue(listed['avatar_renditions']['medium'].endswith('/medium.webp'))
+    
+    def test_new_avatar_replaces_renditions(self):
+        self.upload_avatar((100, 100))
+        first = self.user.avatar_renditions
+        self.upload_avatar((300, 200))
+        self.assertNotEqual(self.user.avatar_renditions, first)
+        self.assertTrue(self.user.avatar_renditions['small'].startswith(f'renditions/{self.user.avatar.name}/'))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Users behind JWTs come from the user cache, not a query per request"""
+    
+    def setUp(self):
+        self.enterContext(override_settings(AUTH_USER_CACHE={'TIMEOUT': 30, 'MAX_ENTRIES': 100}))
+        self.enterContext(override_settings(THROTTLE_STORE=LOCAL_THROTTLE_STORE))
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client = APIClient()
+        token = self.client.post('/api/auth/login/', {'username': 'testuser', 'password': 'TestPass123!'}).data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token['access']}")
+    
+    def get_profile(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/auth/profile/')
+        return response
+    
+    def test_hot_path_costs_no_queries(self):
+        self.get_profile(1)
+        response = self.get_profile(0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], 'test@example.com')
+    
+    def test_user_save_invalidates(self):
+        self.get_profile(1)
+        self.user.bio = 'Changed'
+        self.user.save()
+        self.assertEqual(self.get_profile(1).data['bio'], 'Changed')
+        
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile(1).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_change_password_invalidates(self):
+        self.get_profile(1)
+        response = self.client.post('/api/auth/change-password/', {
+            'old_password': 'TestPass123!', 'new_password': 'NewPass456!'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.get_profile(1)
+    
+    def test_request_user_is_not_shared(self):
+        self.get_profile(1)
+        cache = get_user_cache()
+        first, second = cache.get(self.user.pk), cache.get(self.user.pk)
+        first.bio = 'Only on this request'
+        self.assertEqual(second.bio, '')
+    
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-users'},
+    })
+    def test_shared_tier(self):
+        with self.settings(AUTH_USER_CACHE={'TIMEOUT': 30, 'SHARED_CACHE': 'shared'}):
+            self.get_profile(1)
+            # A fresh process: its own tier is empty, the shared one isn't
+            get_user_cache().clear()
+            self.get_profile(0)
+            self.user.save()
+            get_user_cache().clear()
+            self.get_profile(1)
+
+
+class TokenRevocationTests(TestCase):
+    """Rotated and logged-out refresh tokens are refused until they expire"""
+    
+    def setUp(self):
+        get_revocation_list().clear()
+        self.enterContext(override_settings(THROTTLE_STORE=LOCAL_THROTTLE_STORE))
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client = APIClient()
+        self.tokens = self.client.post('/api/auth/login/', {'username': 'testuser', 'password': 'TestPass123!'}).data
+    
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token})
+    
+    def test_rotation_revokes_old_token(self):
+        response = self.refresh(self.tokens['refresh'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh'], self.tokens['refresh'])
+        self.assertEqual(RevokedToken.objects.count(), 1)
+        
+        # Known to this process: refused without touching the database
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(self.tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, status.HTTP_200_OK)
+    
+    def test_revoked_in_another_process(self):
+        self.refresh(self.tokens['refresh'])
+        get_revocation_list().clear()
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_only_one_rotation_wins(self):
+        token = RevocableRefreshToken(self.tokens['refresh'])
+        self.assertTrue(revoke(token))
+        self.assertFalse(revoke(token))
+    
+    @override_settings(SIMPLE_JWT={'ROTATE_REFRESH_TOKENS': False})
+    def test_logout_without_rotation(self):
+        response = self.client.post('/api/auth/logout/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_revocation_list().clear()
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_verify(self):
+        verify_url = '/api/auth/token/verify/'
+        with self.assertNumQueries(0):
+            response = self.client.post(verify_url, {'token': self.tokens['access']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.post('/api/auth/logout/', {'refresh': self.tokens['refresh']})
+        get_revocation_list().clear()
+        response = self.client.post(verify_url, {'token': self.tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_prune_expired(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='expired', expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='live', expires_at=now + timedelta(days=1))
+        call_command('prune_revoked_tokens', stdout=StringIO())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+    
+    def test_revocation_list_bounds(self):
+        revocations = RevocationList(max_entries=2)
+        now = timezone.now().timestamp()
+        revocations.add('expired', now - 1)
+        self.assertNotIn('expired', revocations)
+        revocations.add('first', now + 60)
+        revocations.add('second', now + 60)
+        self.assertEqual(len(revocations), 2)
+        self.assertIn('second', revocations)
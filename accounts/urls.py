@@ -1,14 +1,14 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (TokenObtainPairView,TokenRefreshView,TokenVerifyView,)
-from .views import ( UserRegistrationView,UserProfileView,ChangePasswordView,UserListView,)
+from .views import ( LoginView,RefreshView,VerifyView,LogoutView,UserRegistrationView,UserProfileView,ChangePasswordView,UserListView,)
 
 app_name = 'accounts'
 
 urlpatterns = [
     # JWT Token endpoints
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('login/', LoginView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', RefreshView.as_view(), name='token_refresh'),
+    path('token/verify/', VerifyView.as_view(), name='token_verify'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     
     # User management endpoints
     path('register/', UserRegistrationView.as_view(), name='register'),
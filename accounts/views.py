@@ -3,6 +3,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import (
+    TokenBlacklistView,
+    TokenObtainPairView,
+    TokenRefreshView,
+    TokenVerifyView
+)
 from django.contrib.auth import get_user_model
 from .serializers import (
     UserSerializer,
@@ -17,6 +23,7 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
     serializer_class = UserRegistrationSerializer
+    throttle_scope = 'auth'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -35,6 +42,19 @@ class UserRegistrationView(generics.CreateAPIView):
             'message': 'User registered successfully'
         }, status=status.HTTP_201_CREATED)
 
+class LoginView(TokenObtainPairView):
+    throttle_scope = 'auth'
+
+# Clients call these routinely, so they get a looser scope than logins
+class RefreshView(TokenRefreshView):
+    throttle_scope = 'token'
+
+class VerifyView(TokenVerifyView):
+    throttle_scope = 'token'
+
+class LogoutView(TokenBlacklistView):
+    throttle_scope = 'token'
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -44,6 +64,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class ChangePasswordView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'auth'
     
     def post(self, request):
         serializer = ChangePasswordSerializer(data=request.data)
@@ -0,0 +1,110 @@
+from rest_framework import serializers
+
+from .metrics import TimedSerializerMixin
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class FieldSelection:
+    """
+    What one serializer renders, parsed from ``?fields=`` and ``?expand=``:
+    ``fields`` is the set of field names to include and ``expand`` the
+    relations to nest as objects; None means all of them. Dotted names
+    select inside a relation, e.g. ``fields=id,owner.username`` or
+    ``expand=comments.author``.
+    """
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+        self.children = {}
+
+    @classmethod
+    def from_params(cls, params):
+        """A selection from query parameters, or None when neither is given."""
+        fields, expand = params.get('fields'), params.get('expand')
+        if fields is None and expand is None:
+            return None
+        selection = cls()
+        for path in _names(fields):
+            selection._add('fields', path.split('.'))
+        if expand is not None:
+            selection._expand_none()
+            for path in _names(expand):
+                selection._add('expand', path.split('.'))
+        return selection
+
+    def _add(self, attr, parts):
+        node = self
+        for part in parts:
+            names = getattr(node, attr)
+            if names is None:
+                names = set()
+                setattr(node, attr, names)
+            names.add(part)
+            node = node.child(part, create=True)
+
+    def _expand_none(self):
+        """Once ?expand= is given, relations it doesn't name stay flat at every depth."""
+        self.expand = set()
+        for child in self.children.values():
+            child._expand_none()
+
+    def child(self, name, create=False):
+        """The selection inside relation ``name``."""
+        if name in self.children:
+            return self.children[name]
+        child = FieldSelection(expand=None if self.expand is None else set())
+        if create:
+            self.children[name] = child
+        return child
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.includes(name) and (self.expand is None or name in self.expand)
+
+
+class SelectableFieldsMixin(TimedSerializerMixin):
+    """
+    Serializer that renders only the fields its FieldSelection includes,
+    and renders nested serializers it doesn't expand as primary keys.
+    Pass ``selection=`` (views build it from the request); nested
+    serializers with this mixin receive their part of it. Input fields
+    are never affected, so a write with ``?fields=id`` still validates
+    and saves everything.
+    """
+
+    def __init__(self, *args, selection=None, **kwargs):
+        self.selection = selection
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selection is None:
+            return fields
+        for name, field in fields.items():
+            if not isinstance(field, serializers.BaseSerializer) or not field.read_only:
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            if self.selection.expands(name):
+                nested = field.child if many else field
+                if isinstance(nested, SelectableFieldsMixin):
+                    nested.selection = self.selection.child(name)
+            else:
+                extra = {'source': field.source} if field.source else {}
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many, **extra)
+        return fields
+
+    @property
+    def _readable_fields(self):
+        # Worked out once per serializer, not once per rendered row
+        if not hasattr(self, '_selected_readable_fields'):
+            self._selected_readable_fields = [
+                field for field in super()._readable_fields
+                if self.selection is None or self.selection.includes(field.field_name)
+            ]
+        return self._selected_readable_fields
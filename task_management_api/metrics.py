@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    What one sampled request spent on the database and in serializers.
+    Time spent in nested serializers counts once, under the outermost.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.worst_query_time = 0.0
+        self.worst_sql = None
+        self.serializer_time = 0.0
+        self._serializing = False
+
+    def time_serializer(self, to_representation, instance):
+        if self._serializing:
+            return to_representation(instance)
+        self._serializing = True
+        start = time.perf_counter()
+        try:
+            return to_representation(instance)
+        finally:
+            self.serializer_time += time.perf_counter() - start
+            self._serializing = False
+
+
+def start_sampling():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop_sampling(token):
+    _current.reset(token)
+
+
+class TimedSerializerMixin:
+    """Serializer whose rendering counts towards a sampled request's serializer time."""
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        return metrics.time_serializer(super().to_representation, instance)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.queries += 1
+        metrics.query_time += elapsed
+        if elapsed >= metrics.worst_query_time:
+            metrics.worst_query_time, metrics.worst_sql = elapsed, sql
+
+
+def _install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+# Connections opened before this module was imported
+for _connection in connections.all(initialized_only=True):
+    _install(_connection)
+
+
+class Histogram:
+    """
+    A Prometheus histogram per ``view`` label, kept in this process.
+    Observing is a bisect and three additions under a lock.
+    """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self, view):
+        """(cumulative bucket counts, sum, count) for ``view``, or None."""
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                return None
+            counts, total, count = series
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            return cumulative, total, count
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            views = sorted(self._series)
+        for view in views:
+            cumulative, total, count = self.series(view)
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            for bound, value in zip([*map(repr, map(float, self.buckets)), '+Inf'], cumulative):
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {value}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total!r}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {count}')
+        return '\n'.join(lines)
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Wall time of each request.', SECONDS)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Response body size, where it is known up front.',
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per sampled request.',
+    (0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+DB_DURATION = Histogram('http_request_db_duration_seconds', 'Database time per sampled request.', SECONDS)
+SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds', 'Serializer time per sampled request.', SECONDS,
+)
+HISTOGRAMS = (REQUEST_DURATION, RESPONSE_SIZE, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION)
+
+
+def view_label(request):
+    """'TaskViewSet.list', 'TaskViewSet.complete', 'LoginView.post', or the URL name."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    cls = getattr(match.func, 'cls', None)
+    if cls is None:
+        return match.view_name
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+def record_request(request, response, duration, metrics=None):
+    """Add a finished request to the histograms, and log it if it was slow."""
+    view = view_label(request)
+    REQUEST_DURATION.observe(view, duration)
+    if not response.streaming:
+        RESPONSE_SIZE.observe(view, len(response.content))
+    elif response.has_header('Content-Length'):
+        RESPONSE_SIZE.observe(view, int(response['Content-Length']))
+    if metrics is not None:
+        DB_QUERIES.observe(view, metrics.queries)
+        DB_DURATION.observe(view, metrics.query_time)
+        SERIALIZER_DURATION.observe(view, metrics.serializer_time)
+
+    threshold = getattr(settings, 'REQUEST_METRICS', {}).get('SLOW_REQUEST_MS')
+    if threshold is None or duration * 1000 < threshold:
+        return
+    if metrics is None:
+        logger.warning(
+            'Slow request %s %s (%s): %.0f ms, not sampled',
+            request.method, request.path, view, duration * 1000,
+        )
+    else:
+        logger.warning(
+            'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, serializers %.0f ms; '
+            'slowest query %.0f ms: %s',
+            request.method, request.path, view, duration * 1000, metrics.queries,
+            metrics.query_time * 1000, metrics.serializer_time * 1000,
+            metrics.worst_query_time * 1000, metrics.worst_sql,
+        )
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+def clear_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class MetricsView(APIView):
+    """
+    This process's request histograms in the Prometheus text format.
+    Staff only; each worker process reports its own requests.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_classes = []
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
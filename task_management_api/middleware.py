@@ -0,0 +1,90 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import record_request, start_sampling, stop_sampling
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also sit in an async middleware chain. The stock
+    class is sync-only, which under ASGI makes every request, static or
+    not, hold a thread until its (possibly async) view finishes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Opening and stat-ing the file blocks, so keep it off the event loop
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request into the histograms in task_management_api.metrics,
+    tagged by view and action, and logs the slow ones. A SAMPLE_RATE share
+    of requests also count their queries and serializer time; for the
+    rest the cost is two clock reads and a few additions.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = getattr(settings, 'REQUEST_METRICS', {}).get('SAMPLE_RATE', 0)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if not self.sampled():
+            response = self.get_response(request)
+            record_request(request, response, time.perf_counter() - start)
+            return response
+        metrics, token = start_sampling()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_sampling(token)
+        record_request(request, response, time.perf_counter() - start, metrics)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if not self.sampled():
+            response = await self.get_response(request)
+            record_request(request, response, time.perf_counter() - start)
+            return response
+        # Context variables follow the request into sync_to_async threads,
+        # so queries run there are counted too
+        metrics, token = start_sampling()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_sampling(token)
+        record_request(request, response, time.perf_counter() - start, metrics)
+        return response
@@ -0,0 +1,114 @@
+import logging
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Renditions are WebP: small, and it keeps the alpha channel of PNG avatars
+RENDITION_FORMAT = 'WEBP'
+RENDITION_QUALITY = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def worker_count():
+    return getattr(settings, 'RENDITION_WORKERS', 2)
+
+
+def is_image(filename):
+    content_type = mimetypes.guess_type(filename or '')[0] or ''
+    return content_type.startswith('image/') and content_type != 'image/svg+xml'
+
+
+def rendition_dir(source_name):
+    """Renditions of a file live under a directory named after its storage name."""
+    return f'renditions/{source_name}/'
+
+
+def rendition_name(source_name, label):
+    return f'{rendition_dir(source_name)}{label}.webp'
+
+
+def current_renditions(file, renditions):
+    """``renditions`` if they were made from the file ``file`` holds now, else {}."""
+    if not file or not renditions:
+        return {}
+    prefix = rendition_dir(file.name)
+    return renditions if all(name.startswith(prefix) for name in renditions.values()) else {}
+
+
+def rendition_urls(file, renditions, request=None):
+    """Map each label to a URL, absolute when there is a request to build it from."""
+    urls = {}
+    for label, name in current_renditions(file, renditions).items():
+        url = file.storage.url(name)
+        urls[label] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def render(storage, source_name, sizes, crop=False):
+    """
+    Write a rendition of the image at ``source_name`` for each
+    ``label: (width, height)`` in ``sizes`` and return their storage
+    names. ``crop`` fills the box exactly; otherwise the image is scaled
+    to fit inside it. Renditions already in storage are reused, so
+    content-addressed sources are only ever rendered once.
+    """
+    names = {label: rendition_name(source_name, label) for label in sizes}
+    missing = {label: size for label, size in sizes.items() if not storage.exists(names[label])}
+    if not missing:
+        return names
+
+    with storage.open(source_name, 'rb') as source, Image.open(source) as image:
+        # Lets JPEG decode straight at a reduced scale instead of full size
+        image.draft('RGB', max(missing.values()))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        for label, size in missing.items():
+            if crop:
+                rendition = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+            else:
+                rendition = image.copy()
+                rendition.thumbnail(size, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            rendition.save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+            storage.save(names[label], ContentFile(buffer.getvalue()))
+    return names
+
+
+def _run(function, args):
+    try:
+        function(*args)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Could not render %s%r', function.__name__, args, exc_info=True)
+    except Exception:
+        logger.exception('Rendition job %s%r failed', function.__name__, args)
+    finally:
+        if worker_count():
+            # Pool threads outlive requests, so nothing else closes their connections
+            connections.close_all()
+
+
+def submit(function, *args):
+    """
+    Run ``function(*args)`` on the rendition pool once the current
+    transaction commits, so the job sees the row that scheduled it.
+    With RENDITION_WORKERS = 0 the job runs inline instead.
+    """
+    global _executor
+    if not worker_count():
+        transaction.on_commit(lambda: _run(function, args))
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=worker_count(), thread_name_prefix='renditions')
+    transaction.on_commit(lambda: _executor.submit(_run, function, args))
@@ -51,7 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'task_management_api.middleware.AsyncWhiteNoiseMiddleware',
+    'task_management_api.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,7 +89,9 @@ WSGI_APPLICATION = 'task_management_api.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR / "db.sqlite3"}'),
-        conn_max_age=600,
+        # Under ASGI each request thread holds its own connection; set 0
+        # there unless a pooler (pgbouncer) sits in front of Postgres
+        conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
         conn_health_checks=True,
     )
 }
@@ -97,7 +100,7 @@ DATABASES = {
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -109,6 +112,31 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # orjson-backed when it is installed, plain JSONRenderer/JSONParser otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'task_management_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'task_management_api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token buckets per user (per IP when anonymous) and scope: 'read' and
+    # 'write' by HTTP method, unless the view names its own throttle_scope
+    'DEFAULT_THROTTLE_CLASSES': [
+        'task_management_api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': config('THROTTLE_READ_RATE', default='600/min'),
+        'write': config('THROTTLE_WRITE_RATE', default='120/min'),
+        'uploads': config('THROTTLE_UPLOADS_RATE', default='600/min'),
+        'auth': config('THROTTLE_AUTH_RATE', default='20/min'),
+        'token': config('THROTTLE_TOKEN_RATE', default='120/min'),
+    },
+    # Proxies in front of the app; their X-Forwarded-For entries are skipped
+    # to find an anonymous client's IP
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # JWT Settings
@@ -118,7 +146,102 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Revocation goes through accounts.RevokedToken rather than the
+    # token_blacklist app, which stores every token it ever issued
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'accounts.serializers.TokenVerifySerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'accounts.serializers.TokenBlacklistSerializer',
+}
+
+# Revoked refresh-token ids each process remembers, so a replayed token is
+# refused without a query. Run prune_revoked_tokens daily to drop the
+# revocations of tokens that have expired.
+AUTH_REVOCATION_CACHE_SIZE = config('AUTH_REVOCATION_CACHE_SIZE', default=100000, cast=int)
+
+# Where throttle buckets live: in Redis, shared by every worker and node,
+# once THROTTLE_STORE_URL (or REDIS_URL) is set; otherwise in each process,
+# which is only right with a single worker and warns when WEB_CONCURRENCY
+# (exported by the Procfile) is higher. Set THROTTLE_STORE_BACKEND to ''
+# to turn throttling off.
+THROTTLE_STORE_URL = config('THROTTLE_STORE_URL', default=config('REDIS_URL', default=''))
+THROTTLE_STORE_BACKEND = config(
+    'THROTTLE_STORE_BACKEND',
+    default='task_management_api.throttling.RedisBucketStore' if THROTTLE_STORE_URL
+    else 'task_management_api.throttling.LocalBucketStore'
+)
+THROTTLE_STORE = {
+    'BACKEND': THROTTLE_STORE_BACKEND,
+    'OPTIONS': (
+        {'url': THROTTLE_STORE_URL} if THROTTLE_STORE_BACKEND.endswith('.RedisBucketStore')
+        else {'workers': config('WEB_CONCURRENCY', default=1, cast=int)}
+    ),
+}
+
+# Users behind JWTs are cached per process for TIMEOUT seconds (up to
+# MAX_ENTRIES users), then in the Django cache named by SHARED_CACHE, if
+# any, so authenticating costs no query. Saves invalidate both tiers at
+# once; other processes may use their copy until TIMEOUT. 0 disables it.
+AUTH_USER_CACHE = {
+    'TIMEOUT': config('AUTH_USER_CACHE_TIMEOUT', default=30, cast=int),
+    'MAX_ENTRIES': config('AUTH_USER_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'SHARED_CACHE': config('AUTH_USER_CACHE_SHARED', default=''),
+    'SHARED_TIMEOUT': config('AUTH_USER_CACHE_SHARED_TIMEOUT', default=300, cast=int),
+}
+
+# Per-request timings (task_management_api.metrics): the share of requests
+# that also count queries and serializer time (1 in 10 by default, since each
+# sampled query pays for the wrapper; 0 turns that off), and the wall time
+# in ms past which a request is logged with its slowest query
+REQUEST_METRICS = {
+    'SAMPLE_RATE': config('REQUEST_METRICS_SAMPLE_RATE', default=0.1, cast=float),
+    'SLOW_REQUEST_MS': config('SLOW_REQUEST_MS', default=1000, cast=int),
+}
+
+# Task API settings
+# How TaskQuerySet.visible_to() finds owned + assigned tasks: 'union' or 'or'
+TASK_VISIBILITY_STRATEGY = config('TASK_VISIBILITY_STRATEGY', default='union')
+# Default total for task/comment/attachment pages: 'exact', 'estimate' or 'none'
+TASK_PAGINATION_COUNT = config('TASK_PAGINATION_COUNT', default='exact')
+# Planner estimates below this are replaced by an exact COUNT(*)
+TASK_PAGINATION_ESTIMATE_THRESHOLD = config('TASK_PAGINATION_ESTIMATE_THRESHOLD', default=1000, cast=int)
+# Upper bound on operations accepted by POST /api/tasks/bulk/
+TASK_BULK_MAX_ITEMS = config('TASK_BULK_MAX_ITEMS', default=1000, cast=int)
+# Newest comments and attachments embedded in a task; the rest are paged
+# from /api/tasks/{id}/comments/ and /api/tasks/{id}/attachments/
+TASK_EMBED_LIMIT = config('TASK_EMBED_LIMIT', default=10, cast=int)
+# Rows per server-side cursor fetch in /api/tasks/export/
+TASK_EXPORT_CHUNK_SIZE = config('TASK_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+# Rows per bulk insert (and per transaction) for task imports
+TASK_IMPORT_CHUNK_SIZE = config('TASK_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+# Chunked attachment uploads: where parts are staged until completed, the
+# largest file accepted, and how long an idle upload is kept for resuming
+TASK_UPLOAD_DIR = config('TASK_UPLOAD_DIR', default=str(BASE_DIR / 'upload_staging'))
+TASK_UPLOAD_MAX_SIZE = config('TASK_UPLOAD_MAX_SIZE', default=1024 ** 3, cast=int)
+TASK_UPLOAD_EXPIRY_HOURS = config('TASK_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+# Who sends attachment downloads: '' streams them from Django (with Range
+# support); 'x-accel-redirect' hands off to nginx through an internal
+# location at TASK_ATTACHMENT_ACCEL_PREFIX aliased to MEDIA_ROOT;
+# 'x-sendfile' hands off to Apache mod_xsendfile or lighttpd
+TASK_ATTACHMENT_SENDFILE = config('TASK_ATTACHMENT_SENDFILE', default='')
+TASK_ATTACHMENT_ACCEL_PREFIX = config('TASK_ATTACHMENT_ACCEL_PREFIX', default='/protected-media/')
+# Threads per process rendering avatar and image attachment thumbnails
+# after upload; 0 renders inline, before the response
+RENDITION_WORKERS = config('RENDITION_WORKERS', default=2, cast=int)
+# Per-user cache of task list responses. Leave BACKEND empty to disable;
+# use tasks.cache.LocalMemoryBackend only with a single worker process,
+# or tasks.cache.RedisBackend (OPTIONS: {'url': ...}) across workers.
+TASK_LIST_CACHE = {
+    'BACKEND': config('TASK_LIST_CACHE_BACKEND', default=''),
+    'TIMEOUT': config('TASK_LIST_CACHE_TIMEOUT', default=30, cast=int),
+    'OPTIONS': {},
 }
+# Changes feed: tombstone retention (older sync tokens get 410 Gone) and the
+# window each token re-reads to catch transactions that committed late
+TASK_SYNC_TOMBSTONE_DAYS = config('TASK_SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+TASK_SYNC_OVERLAP_SECONDS = config('TASK_SYNC_OVERLAP_SECONDS', default=5, cast=int)
+# Maintain per-user stats rollups on every task write, so /api/tasks/stats/
+# reads a few rows; run `manage.py rebuild_task_stats` after turning it on
+TASK_STATS_ROLLUP = config('TASK_STATS_ROLLUP', default=False, cast=bool)
 
 
 # Password validation
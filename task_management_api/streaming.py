@@ -0,0 +1,36 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def is_asgi(request):
+    """Whether ``request`` (Django's or DRF's) is being served over ASGI."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiter_blocking(iterable):
+    """
+    Iterate a blocking iterable from async code, one item per thread hop.
+    Items run on the request's sync thread, so a database cursor opened
+    by the first one is still there for the next.
+    """
+    iterator = iter(iterable)
+    done = object()
+    try:
+        while True:
+            item = await sync_to_async(next)(iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterable):
+    """
+    ``iterable`` as the body of a StreamingHttpResponse. Under ASGI, Django
+    would read a sync iterator to the end before sending a byte, so it is
+    handed over as an async iterator instead.
+    """
+    return aiter_blocking(iterable) if is_asgi(request) else iterable
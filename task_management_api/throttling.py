@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60), in the format of DRF's DEFAULT_THROTTLE_RATES."""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Token buckets in this process, two numbers per key, at most
+    ``max_keys`` of them; the least recently used bucket is forgotten
+    (refilled) first. Only suitable when a single process serves the API,
+    since each process would otherwise allow the full rate; it warns when
+    told of more ``workers`` than one.
+    """
+
+    def __init__(self, max_keys=100000, workers=1):
+        if workers > 1:
+            logger.warning(
+                'LocalBucketStore with %d worker processes lets each of them allow the full '
+                'throttle rate; set THROTTLE_STORE_URL to share buckets in Redis.', workers,
+            )
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Take a token from ``key``'s bucket; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens, wait = tokens - 1, 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Refill, take a token and save in one round trip. Redis runs scripts one
+# at a time, and its clock is the same for every web node.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every process, on any client exposing
+    redis-py's ``eval``. Pass ``client`` directly, or ``url`` to build a
+    redis-py client (the ``redis`` package is then required). A bucket
+    expires once it would have refilled anyway.
+    """
+
+    def __init__(self, client=None, url=None, prefix='throttle'):
+        if client is None:
+            if not url:
+                raise ImproperlyConfigured('RedisBucketStore needs a client or a url.')
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured('RedisBucketStore with a url requires the redis package.')
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def consume(self, key, capacity, rate):
+        return float(self.client.eval(TOKEN_BUCKET_SCRIPT, 1, f'{self.prefix}:{key}', capacity, rate))
+
+
+_store = None
+
+
+def get_bucket_store():
+    """The configured store, or None when THROTTLE_STORE has no BACKEND."""
+    global _store
+    if _store is None:
+        config = getattr(settings, 'THROTTLE_STORE', {})
+        if not config.get('BACKEND'):
+            return None
+        _store = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_bucket_store(setting, **kwargs):
+    global _store
+    if setting == 'THROTTLE_STORE':
+        _store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    One token bucket per client and scope, holding the scope's rate from
+    DEFAULT_THROTTLE_RATES ('100/min' allows bursts of 100 and refills
+    100 a minute). Clients are users, or IP addresses when anonymous.
+    The scope is the view's ``throttle_scope`` if it has one ('auth',
+    'uploads'), else 'read' or 'write' by HTTP method. Scopes without a
+    rate aren't throttled.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_client(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        store = get_bucket_store()
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if store is None or rate is None:
+            return True
+        capacity, duration = parse_rate(rate)
+        key = f'{scope}:{self.get_client(request)}'
+        self.wait_seconds = store.consume(key, capacity, capacity / duration)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
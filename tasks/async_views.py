@@ -0,0 +1,173 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed, NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+from task_management_api.fieldsets import SelectableFieldsMixin
+from .counters import adjust_counters
+from .models import Task, Comment
+from .serializers import TaskSerializer, TaskListSerializer, CommentSerializer
+from .pagination import TaskPagination
+from .permissions import IsOwnerOrReadOnly
+from .views import FieldSelectionMixin, TaskViewSet
+
+
+class AsyncAPIView(FieldSelectionMixin, APIView):
+    """
+    APIView whose handlers are coroutines, so under ASGI a request waiting
+    on the database holds no worker thread. Authentication, permissions
+    and throttling stay sync (simplejwt loads the user through the ORM)
+    and run together in a single thread hop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = getattr(self, method, None) if method in self.http_method_names else None
+            if handler is None:
+                raise MethodNotAllowed(request.method)
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                # options() is inherited from APIView and stays sync
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def filter_queryset(self, queryset):
+        # Filter validation can hit the database (assigned_to is a ModelChoiceFilter)
+        def apply_backends():
+            result = queryset
+            for backend in getattr(self, 'filter_backends', []):
+                result = backend().filter_queryset(self.request, result, self)
+            return result
+        return await sync_to_async(apply_backends)()
+
+    async def paginate(self, queryset):
+        """
+        A page-number page with an exact count, through ``acount()`` and
+        async iteration. Returns the rows and the pagination envelope.
+        """
+        page_size = TaskPagination.page_size
+        try:
+            number = int(self.request.query_params.get('page', 1))
+        except ValueError:
+            raise NotFound('Invalid page.')
+        count = await queryset.acount()
+        if number < 1 or (number > 1 and (number - 1) * page_size >= count):
+            raise NotFound('Invalid page.')
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        url = self.request.build_absolute_uri()
+        previous = None
+        if number == 2:
+            previous = remove_query_param(url, 'page')
+        elif number > 2:
+            previous = replace_query_param(url, 'page', number - 1)
+        return rows, {
+            'count': count,
+            'next': replace_query_param(url, 'page', number + 1) if bottom + page_size < count else None,
+            'previous': previous,
+        }
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        kwargs['context'] = {'request': self.request, 'format': self.format_kwarg, 'view': self}
+        if issubclass(serializer_class, SelectableFieldsMixin):
+            kwargs.setdefault('selection', self.get_field_selection())
+        return serializer_class(*args, **kwargs)
+
+
+class AsyncTaskListView(AsyncAPIView):
+    """
+    Async twin of the task list, my_tasks and assigned_to_me actions, with
+    the same filters, search, ordering and page-number pages. ``scope``
+    picks the rows: 'visible', 'owned' or 'assigned'.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TaskListSerializer
+    scope = 'visible'
+
+    filter_backends = TaskViewSet.filter_backends
+    filterset_class = TaskViewSet.filterset_class
+    search_fields = TaskViewSet.search_fields
+    ordering_fields = TaskViewSet.ordering_fields
+    ordering = TaskViewSet.ordering
+
+    def get_queryset(self):
+        user = self.request.user
+        if self.scope == 'owned':
+            return Task.objects.filter(owner=user)
+        if self.scope == 'assigned':
+            return Task.objects.filter(assigned_to=user)
+        return Task.objects.visible_to(user)
+
+    def get_serializer_class(self):
+        if self.get_field_selection() is not None:
+            return TaskSerializer
+        return self.serializer_class
+
+    async def get(self, request):
+        queryset = await self.filter_queryset(self.get_queryset())
+        rows, envelope = await self.paginate(self.setup_eager_loading(queryset))
+        return Response({**envelope, 'results': self.get_serializer(rows, many=True).data})
+
+
+class AsyncTaskDetailView(AsyncAPIView):
+    """Async twin of the task detail, read-only."""
+    permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    serializer_class = TaskSerializer
+
+    async def get(self, request, pk):
+        queryset = self.setup_eager_loading(Task.objects.visible_to(request.user))
+        try:
+            task = await queryset.aget(pk=pk)
+        except Task.DoesNotExist:
+            raise NotFound()
+        self.check_object_permissions(request, task)
+        return Response(self.get_serializer(task).data)
+
+
+class AsyncCommentListView(AsyncAPIView):
+    """Async twin of the comment list (``?task_id=``) and create."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = CommentSerializer
+
+    async def get(self, request):
+        queryset = self.setup_eager_loading(Comment.objects.all())
+        task_id = request.query_params.get('task_id')
+        if task_id:
+            queryset = queryset.filter(task_id=task_id)
+        rows, envelope = await self.paginate(queryset)
+        return Response({**envelope, 'results': self.get_serializer(rows, many=True).data})
+
+    async def post(self, request):
+        data = await sync_to_async(self.create_comment)(request)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def create_comment(self, request):
+        # Validation resolves the task and the save fires signals: all sync ORM work
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            comment = serializer.save(author=request.user)
+            adjust_counters(comment.task, comment_count=1)
+        return serializer.data
@@ -0,0 +1,154 @@
+import hashlib
+import math
+import random
+import statistics
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .counters import recounts
+from .models import Task, Category, Tag, TaskCategory, TaskTag, Comment, Attachment
+
+User = get_user_model()
+
+# Word pool for generated text; picks are skewed so a few words are
+# common and most are rare, which is what makes search selective
+VOCABULARY = (
+    'report review deploy migrate invoice client meeting budget design draft '
+    'release server database backup audit schedule contract feedback roadmap '
+    'security onboarding payroll vendor inventory forecast campaign analytics '
+    'support ticket outage latency dashboard quarterly annual summary proposal '
+    'research interview hiring training workshop compliance renewal upgrade '
+    'refactor testing documentation translation pricing shipment warehouse'
+).split()
+
+
+def seed_users(count, prefix='bench_user'):
+    return User.objects.bulk_create([
+        User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com', password='!')
+        for i in range(count)
+    ])
+
+
+def words(rng, count):
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    return ' '.join(rng.choices(VOCABULARY, weights=weights, k=count))
+
+
+def seed_tasks(users, count, batch_size=5000, seed=42, description_words=0, skew_assignees=False, due_dates=False):
+    """
+    Bulk-insert ``count`` tasks. Owners follow a skewed distribution, like
+    real tenants, and half the tasks are assigned to a random user; with
+    ``skew_assignees`` the same few users get most assignments too. With
+    ``due_dates``, two in three tasks are due within 60 days either way.
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(users))]
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+    now = timezone.now()
+
+    remaining = count
+    while remaining > 0:
+        size = min(remaining, batch_size)
+        owners = rng.choices(users, weights=weights, k=size)
+        if skew_assignees:
+            assignees = [rng.choices(users, weights=weights)[0] if rng.random() < 0.5 else None for _ in range(size)]
+        else:
+            assignees = rng.choices(users + [None] * len(users), k=size)
+        tasks = [
+            Task(
+                title=f'{words(rng, 3).capitalize()} {remaining - i}',
+                description=words(rng, description_words) if description_words else '',
+                status=rng.choice(statuses),
+                priority=rng.choice(priorities),
+                owner=owner,
+                assigned_to=assignee,
+            )
+            for i, (owner, assignee) in enumerate(zip(owners, assignees))
+        ]
+        if due_dates:
+            for task in tasks:
+                if rng.random() < 2 / 3:
+                    task.due_date = now + timedelta(minutes=rng.randint(-60 * 24 * 60, 60 * 24 * 60))
+        Task.objects.bulk_create(tasks)
+        remaining -= size
+
+
+def seed_labels(users, categories, tags, prefix='bench'):
+    """Bulk-insert categories and tags, created by the busiest users."""
+    colors = ['#e74c3c', '#3498db', '#2ecc71', '#f1c40f', '#9b59b6', '#808080']
+    return (
+        Category.objects.bulk_create([
+            Category(name=f'{prefix} {VOCABULARY[i % len(VOCABULARY)]} {i}', color=colors[i % len(colors)],
+                     created_by=users[i % len(users)])
+            for i in range(categories)
+        ]),
+        Tag.objects.bulk_create([
+            Tag(name=f'{prefix}-{VOCABULARY[i % len(VOCABULARY)]}-{i}', created_by=users[i % len(users)])
+            for i in range(tags)
+        ]),
+    )
+
+
+def seed_task_details(tasks, users, categories=(), tags=(), comments_per_task=3.0, attachments_per_task=0.5,
+                      batch_size=5000, seed=42):
+    """
+    Label, comment on and attach files to ``tasks`` (a queryset), a batch
+    at a time, then set their counters. Per-task comment and attachment
+    numbers are geometrically distributed with the given means, so most
+    tasks have a few and some have many; popular labels are popular.
+    Attachments are metadata only: no file is written.
+    """
+    rng = random.Random(seed)
+    user_weights = [1 / (rank + 1) for rank in range(len(users))]
+    category_weights = [1 / (rank + 1) for rank in range(len(categories))]
+    tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+    extensions = ['pdf', 'png', 'jpg', 'docx', 'xlsx', 'txt']
+
+    def how_many(mean):
+        # Geometric, so the mean is exact and the tail is long
+        return int(math.log(1 - rng.random()) / math.log(mean / (1 + mean))) if mean > 0 else 0
+
+    rows = tasks.order_by('pk').values_list('pk', 'owner_id', 'assigned_to_id')
+    ids = list(rows.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = list(rows.filter(pk__in=ids[start:start + batch_size]))
+        links, labels, comments, attachments = [], [], [], []
+        for task_id, owner_id, assignee_id in batch:
+            if categories and rng.random() < 0.7:
+                links.append(TaskCategory(task_id=task_id, category=rng.choices(categories, category_weights)[0]))
+            for tag in set(rng.choices(tags, tag_weights, k=rng.randint(0, 3))) if tags else ():
+                labels.append(TaskTag(task_id=task_id, tag=tag))
+            people = [owner_id, assignee_id or owner_id]
+            for _ in range(how_many(comments_per_task)):
+                author_id = rng.choice(people) if rng.random() < 0.8 else rng.choices(users, user_weights)[0].pk
+                comments.append(Comment(task_id=task_id, author_id=author_id, content=words(rng, rng.randint(5, 40))))
+            for _ in range(how_many(attachments_per_task)):
+                digest = hashlib.sha256(f'{task_id}:{len(attachments)}:{rng.random()}'.encode()).hexdigest()
+                extension = rng.choice(extensions)
+                attachments.append(Attachment(
+                    task_id=task_id,
+                    file=f'task_attachments/{digest}.{extension}',
+                    filename=f'{words(rng, 2).replace(" ", "-")}.{extension}',
+                    file_size=min(int(rng.lognormvariate(11, 1.5)) + 1, 2 ** 31 - 1),
+                    sha256=digest,
+                    uploaded_by_id=rng.choice(people),
+                ))
+        TaskCategory.objects.bulk_create(links)
+        TaskTag.objects.bulk_create(labels)
+        Comment.objects.bulk_create(comments)
+        Attachment.objects.bulk_create(attachments)
+        Task.objects.filter(pk__in=[row[0] for row in batch]).update(**recounts())
+
+
+def latency_summary(latencies):
+    """p50/p95/p99 and mean of a list of millisecond timings."""
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else (latencies or [0.0]) * 99
+    return {
+        'p50_ms': percentiles[49],
+        'p95_ms': percentiles[94],
+        'p99_ms': percentiles[98],
+        'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+    }
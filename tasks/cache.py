@@ -0,0 +1,186 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+
+class LocalMemoryBackend:
+    """
+    In-process LRU cache bounded by entry count and approximate size.
+    Only suitable when a single process serves the API, since other
+    processes would never see its invalidations.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + timeout, size, value)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def get_generation(self, user_id):
+        return self._generations.get(user_id, 0)
+
+    def bump_generations(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Shared cache on any client exposing redis-py's ``get``, ``set`` and
+    ``incr``. Pass ``client`` directly, or ``url`` to build a redis-py
+    client (the ``redis`` package is then required).
+    """
+
+    def __init__(self, client=None, url=None, prefix='tasks:list'):
+        if client is None:
+            if not url:
+                raise ImproperlyConfigured('RedisBackend needs a client or a url.')
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured('RedisBackend with a url requires the redis package.')
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(f'{self.prefix}:{key}')
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.set(f'{self.prefix}:{key}', json.dumps(value), ex=timeout)
+
+    def get_generation(self, user_id):
+        return int(self.client.get(f'{self.prefix}:gen:{user_id}') or 0)
+
+    def bump_generations(self, user_ids):
+        # INCR is atomic, so concurrent writers can't lose an invalidation
+        for user_id in user_ids:
+            self.client.incr(f'{self.prefix}:gen:{user_id}')
+
+
+_backend = None
+
+
+def get_list_cache():
+    """The configured backend, or None when TASK_LIST_CACHE has no BACKEND."""
+    global _backend
+    if _backend is None:
+        config = getattr(settings, 'TASK_LIST_CACHE', {})
+        if not config.get('BACKEND'):
+            return None
+        _backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_list_cache(setting, **kwargs):
+    global _backend
+    if setting == 'TASK_LIST_CACHE':
+        _backend = None
+
+
+def invalidate_users(user_ids):
+    """
+    Drop every cached list of these users once the current transaction
+    commits. Bumping the user's generation orphans the old keys, which
+    then age out of the backend.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    backend = get_list_cache()
+    if backend is None or not user_ids:
+        return
+    transaction.on_commit(lambda: backend.bump_generations(user_ids))
+
+
+def invalidate_tasks(tasks):
+    """Invalidate the owner, assignee and previous assignee of each task."""
+    user_ids = set()
+    for task in tasks:
+        user_ids.update((
+            task.owner_id,
+            task.assigned_to_id,
+            getattr(task, '_loaded_assigned_to_id', None),
+        ))
+    invalidate_users(user_ids)
+
+
+def list_cache_key(backend, view, request):
+    """
+    Key of one list response: the user, their current generation, and a
+    digest of the action and the full query string (filters, search,
+    ordering, page). It changes whenever the cached data would.
+    """
+    user_id = request.user.pk
+    params = sorted(request.query_params.lists())
+    digest = hashlib.sha1(json.dumps([view.action, request.path, params]).encode()).hexdigest()
+    return f'{user_id}:{backend.get_generation(user_id)}:{digest}'
+
+
+def cache_list_response(view_method):
+    """Cache a viewset list action's response data per user, under list_cache_key()."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        backend = get_list_cache()
+        if backend is None:
+            return view_method(self, request, *args, **kwargs)
+
+        key = list_cache_key(backend, self, request)
+        data = backend.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'TASK_LIST_CACHE', {}).get('TIMEOUT', 30)
+            backend.set(key, response.data, timeout)
+            response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
@@ -0,0 +1,161 @@
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_list_cache, list_cache_key
+from .models import Attachment, Category, Comment, Tag
+
+
+def make_etag(*parts, weak=False):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def _newest(queryset, field):
+    """The greatest ``field`` among ``queryset``'s rows, as a subquery."""
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def nested_versions():
+    """
+    Per task, the newest ``updated_at`` among the rows it nests through
+    its links: categories and tags and their creators, and the authors
+    of its comments and attachments. Owner and assignee are plain joins.
+    """
+    task = OuterRef('pk')
+    return {
+        'category': _newest(Category.objects.filter(tasks=task), 'updated_at'),
+        'category_creator': _newest(Category.objects.filter(tasks=task), 'created_by__updated_at'),
+        'tag': _newest(Tag.objects.filter(tasks=task), 'updated_at'),
+        'tag_creator': _newest(Tag.objects.filter(tasks=task), 'created_by__updated_at'),
+        'comment_author': _newest(Comment.objects.filter(task=task), 'author__updated_at'),
+        'uploader': _newest(Attachment.objects.filter(task=task), 'uploaded_by__updated_at'),
+    }
+
+
+def detail_validators(view, pk, lock=False):
+    """
+    Strong ETag and Last-Modified of one task, from a single query for
+    the ``updated_at`` of the task and of every row it nests: owner and
+    assignee, categories and tags and their creators, and the authors of
+    its comments and attachments. ``?fields=`` and ``?expand=`` pick a
+    different representation, so they are part of the ETag. Returns
+    ``(None, None)`` when the task is not visible or ``pk`` isn't one,
+    leaving the 404 to the view. With ``lock``, the task row stays locked
+    until the surrounding transaction ends.
+    """
+    versions = nested_versions()
+    tasks = view.get_visible_tasks()
+    if lock:
+        # Only the task row; the joined owner and assignee aren't written
+        tasks = tasks.select_for_update(of=('self',))
+    try:
+        row = (
+            tasks.filter(pk=pk).annotate(**versions)
+            .values_list('updated_at', 'owner__updated_at', 'assigned_to__updated_at', *versions)
+            .first()
+        )
+    except (TypeError, ValueError, ValidationError):
+        return None, None
+    if row is None:
+        return None, None
+    params = view.request.query_params
+    etag = make_etag(
+        'task', pk, *(version and version.isoformat() for version in row),
+        params.get('fields'), params.get('expand')
+    )
+    return etag, max(version for version in row if version is not None)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_detail_response(view_method):
+    """
+    Answer If-None-Match/If-Modified-Since with 304 and If-Match/
+    If-Unmodified-Since with 412 before the task is loaded or serialized.
+    Task.updated_at moves whenever the task or its comments, attachments
+    or links change; detail_validators adds the rows the task nests.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return respond(self, request, *args, **kwargs)
+        # A write checks If-Match and saves with the task locked, so two
+        # clients holding the same ETag can't both pass the check
+        with transaction.atomic():
+            return respond(self, request, *args, **kwargs)
+
+    def respond(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        write = request.method not in ('GET', 'HEAD')
+        etag, last_modified = detail_validators(self, pk, lock=write)
+        if etag is None:
+            return view_method(self, request, *args, **kwargs)
+
+        response = get_conditional_response(
+            request, etag=etag,
+            last_modified=int(last_modified.timestamp())
+        )
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            if write:
+                # The write moved updated_at; describe the new version
+                etag, last_modified = detail_validators(self, pk)
+            set_validators(response, etag, last_modified)
+        return response
+    return wrapper
+
+
+def conditional_list_response(view_method):
+    """
+    Weak ETag for a list action. With the list cache on, it is the
+    response's cache key, which moves with the user's cache generation,
+    so no query is needed. Otherwise it comes from one aggregate over
+    the filtered queryset: the newest ``updated_at`` of the tasks and of
+    the rows they nest, plus the row count, which also catches
+    deletions. The query string is part of it, ``?fields=`` and
+    ``?expand=`` included. Matching If-None-Match requests get a
+    304. Last-Modified is left off, since a deletion doesn't move it
+    forward. Without the cache, cursor and uncounted pages skip
+    validators: they exist to avoid exactly this kind of full scan.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        backend = get_list_cache()
+        if backend is not None:
+            etag = make_etag('list', list_cache_key(backend, self, request), weak=True)
+        else:
+            counts_rows = getattr(self.paginator, 'counts_rows', None)
+            if counts_rows is not None and not counts_rows(request):
+                return view_method(self, request, *args, **kwargs)
+            
+            versions = nested_versions()
+            stats = self.get_list_queryset().annotate(**versions).aggregate(
+                *(Max(name) for name in ('updated_at', 'owner__updated_at', 'assigned_to__updated_at', *versions)),
+                count=Count('pk'),
+            )
+            etag = make_etag(
+                self.action, request.user.pk, *sorted(stats.items()),
+                sorted(request.query_params.lists()),
+                weak=True
+            )
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+        return response
+    return wrapper
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_tasks, invalidate_users
+from .models import Task, Comment, Attachment
+
+COUNTERS = Task.counter_fields
+
+
+def adjust_counters(task, **deltas):
+    """
+    Move ``task``'s counters by ``deltas`` and touch it. Call inside the
+    transaction that wrote the comment or attachment, so the counters
+    commit (or roll back) with it. Cached task lists show the counters,
+    so they are dropped too.
+    """
+    Task.objects.filter(pk=task.pk).add_to_counters(**deltas)
+    invalidate_tasks([task])
+
+
+def _aggregate(model, expression):
+    rows = model.objects.filter(task=OuterRef('pk')).order_by().values('task')
+    return Coalesce(Subquery(rows.annotate(value=expression).values('value')), 0, output_field=IntegerField())
+
+
+def recounts():
+    """Each counter, recounted from the comments and attachments tables."""
+    return {
+        'comment_count': _aggregate(Comment, Count('pk')),
+        'attachment_count': _aggregate(Attachment, Count('pk')),
+        'attachment_bytes': _aggregate(Attachment, Sum('file_size')),
+    }
+
+
+def reconcile_counters(queryset=None, batch_size=1000):
+    """
+    Recount the counters of the tasks in ``queryset`` (all by default)
+    whose stored values have drifted, e.g. after comments were added in
+    the admin. Returns the ids of the tasks that were fixed.
+    """
+    queryset = Task.objects.all() if queryset is None else queryset
+    drifted = queryset.alias(**{f'actual_{name}': expression for name, expression in recounts().items()}).filter(
+        Q(*[~Q(**{name: F(f'actual_{name}')}) for name in COUNTERS], _connector=Q.OR)
+    )
+    ids = list(drifted.order_by().values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            # Locking first makes the recount wait for writers still
+            # holding these rows, then read what they committed
+            rows = Task.objects.select_for_update().filter(pk__in=batch).order_by()
+            users = rows.values_list('owner_id', 'assigned_to_id')
+            invalidate_users({user_id for row in users for user_id in row})
+            Task.objects.filter(pk__in=batch).update(updated_at=timezone.now(), **recounts())
+    return ids
@@ -0,0 +1,159 @@
+import json
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+from rest_framework import status
+from rest_framework.renderers import BaseRenderer
+from task_management_api.streaming import aiter_blocking, is_asgi
+
+# Bytes per read when Django streams the file itself
+BLOCK_SIZE = 64 * 1024
+
+# A single byte range: "bytes=0-499", "bytes=500-" or "bytes=-500"
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class DownloadRenderer(BaseRenderer):
+    """
+    Lets the download action accept any ``Accept`` header; the view builds
+    the file response itself. Only error payloads are rendered here.
+    """
+    media_type = '*/*'
+    format = 'download'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+def sendfile_mode():
+    return getattr(settings, 'TASK_ATTACHMENT_SENDFILE', '')
+
+
+def accel_prefix():
+    return getattr(settings, 'TASK_ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+
+
+class FileRange:
+    """
+    ``length`` bytes of ``file`` from ``start``. read() stops at the end
+    of the range, and fileno() lets a WSGI server's file_wrapper sendfile()
+    the range straight from the current offset, bounded by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)``, inclusive, for a single byte range of a ``size``-byte
+    file; None when the header is absent or not one this view serves
+    (multiple ranges get the whole file); ``False`` when unsatisfiable.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size:
+        return False
+    return start, end
+
+
+def attachment_response(request, attachment):
+    """
+    The bytes of ``attachment``, as a download. With TASK_ATTACHMENT_SENDFILE
+    set, the front server sends the file and Django only answers headers;
+    otherwise a FileResponse streams it, honouring a single Range.
+    """
+    etag = f'"{attachment.sha256}"' if attachment.sha256 else None
+    if etag:
+        # Content-addressed bytes never change under the same digest
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+            return response
+
+    content_type = mimetypes.guess_type(attachment.filename)[0] or 'application/octet-stream'
+    mode = sendfile_mode()
+    if mode:
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel-redirect':
+            # nginx serves the file, Range included, from an `internal` location
+            response['X-Accel-Redirect'] = quote(accel_prefix() + attachment.file.name)
+        else:
+            response['X-Sendfile'] = attachment.file.path
+        response['Content-Disposition'] = content_disposition_header(True, attachment.filename)
+    else:
+        response = stream_attachment(request, attachment, content_type, etag)
+
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = 'private'
+    return response
+
+
+def stream_attachment(request, attachment, content_type, etag):
+    file = attachment.file.open('rb')
+    size = attachment.file.size
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range is not None and if_range != etag:
+        # The client's partial copy is of other bytes; send them all
+        byte_range = None
+
+    if byte_range is False:
+        file.close()
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        body = file
+        response = FileResponse(
+            body, as_attachment=True, filename=attachment.filename, content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        body = FileRange(file, start, end - start + 1)
+        response = FileResponse(
+            body, status=status.HTTP_206_PARTIAL_CONTENT,
+            as_attachment=True, filename=attachment.filename, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.block_size = BLOCK_SIZE
+    if is_asgi(request):
+        # Django reads a sync file body whole before sending it over ASGI;
+        # hand it blocks one at a time instead. The headers FileResponse
+        # worked out stay, and the file is still closed with the response.
+        response.streaming_content = aiter_blocking(iter(lambda: body.read(BLOCK_SIZE), b''))
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,136 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from task_management_api.renderers import orjson
+from .models import TaskCategory, TaskTag
+
+# Flat columns read with values(); categories and tags are added per chunk
+EXPORT_VALUES = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'status': 'status',
+    'priority': 'priority',
+    'due_date': 'due_date',
+    'owner': 'owner__username',
+    'assigned_to': 'assigned_to__username',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'completed_at': 'completed_at',
+}
+EXPORT_COLUMNS = [*EXPORT_VALUES, 'categories', 'tags']
+
+# Joins category and tag names inside one CSV cell
+CSV_LIST_SEPARATOR = '|'
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Negotiates ``?format=csv`` / ``Accept: text/csv`` for the export action,
+    which streams its own body. Only error payloads pass through here.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('detail', data)
+        return f'error\n{data}\n'.encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Negotiates ``?format=ndjson``; an error payload renders as a single line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data, cls=DjangoJSONEncoder) + '\n').encode()
+
+
+def export_chunk_size():
+    return getattr(settings, 'TASK_EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Yield lists of flat task dicts, one list per chunk. Rows come off a
+    server-side cursor (``iterator``), and each chunk costs two more
+    queries for its category and tag names, so memory is bounded by the
+    chunk size however many tasks there are.
+    """
+    chunk_size = chunk_size or export_chunk_size()
+    rows = queryset.values(*EXPORT_VALUES.values()).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        links = {}
+        for model, name, column in ((TaskCategory, 'category__name', 'categories'), (TaskTag, 'tag__name', 'tags')):
+            for task_id, value in model.objects.filter(task_id__in=ids).values_list('task_id', name).order_by(name):
+                links.setdefault((task_id, column), []).append(value)
+        yield [
+            {
+                **{column: row[source] for column, source in EXPORT_VALUES.items()},
+                'categories': links.get((row['id'], 'categories'), []),
+                'tags': links.get((row['id'], 'tags'), []),
+            }
+            for row in chunk
+        ]
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(queryset, chunk_size=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for chunk in export_rows(queryset, chunk_size):
+        yield ''.join(
+            writer.writerow([_csv_cell(row[column]) for column in EXPORT_COLUMNS])
+            for row in chunk
+        )
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder cuts datetimes to milliseconds, which
+    # would stop an export from round-tripping through the importer
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def stream_ndjson(queryset, chunk_size=None):
+    for chunk in export_rows(queryset, chunk_size):
+        if orjson is not None:
+            # Native datetimes, serialized at full precision like _json_default
+            yield b''.join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in chunk)
+        else:
+            yield ''.join(json.dumps(row, default=_json_default) + '\n' for row in chunk)
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
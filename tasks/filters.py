@@ -1,5 +1,7 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 from .models import Task
+from .search import search_tasks
 
 class TaskFilter(filters.FilterSet):
     status = filters.ChoiceFilter(choices=Task.STATUS_CHOICES)
@@ -12,3 +14,47 @@ class TaskFilter(filters.FilterSet):
     class Meta:
         model = Task
         fields = ['status', 'priority', 'assigned_to']
+
+
+class TaskSearchFilter(SearchFilter):
+    """
+    ``?search=`` through the full-text index (tsvector on Postgres, FTS5 on
+    SQLite) instead of ILIKE scans, with ``?search_comments=true`` to match
+    comment text as well. Other databases keep DRF's substring search.
+    """
+    comments_param = 'search_comments'
+    
+    def search_comments(self, request):
+        return request.query_params.get(self.comments_param, '').lower() in ('1', 'true', 'yes')
+    
+    def get_search_fields(self, view, request):
+        search_fields = super().get_search_fields(view, request)
+        if search_fields and self.search_comments(request):
+            return [*search_fields, 'comments__content']
+        return search_fields
+    
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        results = search_tasks(queryset, terms, comments=self.search_comments(request))
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
+
+
+class TaskOrderingFilter(OrderingFilter):
+    """Rank search results by relevance unless ``?ordering=`` says otherwise."""
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if 'search_rank' in queryset.query.annotations and not self.get_explicit_ordering(request, queryset, view):
+            return ['-search_rank', *(ordering or [])]
+        return ordering
+    
+    def get_explicit_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return None
+        fields = [param.strip() for param in params.split(',')]
+        return self.remove_invalid_fields(queryset, fields, view, request)
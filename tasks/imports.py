@@ -0,0 +1,238 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import invalidate_tasks
+from .export import CSV_LIST_SEPARATOR
+from .models import Task, Category, Tag, TaskCategory, TaskTag
+from .stats import track_saved
+
+User = get_user_model()
+
+FORMATS = ('csv', 'ndjson')
+
+
+def import_chunk_size():
+    return getattr(settings, 'TASK_IMPORT_CHUNK_SIZE', 1000)
+
+
+def guess_format(filename):
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def parse_rows(stream, import_format):
+    """
+    Yield ``(row number, dict or error message)`` from a binary stream,
+    one row at a time, so an upload of any size is never held in memory.
+    Accepts what /api/tasks/export/ produces.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Expected a JSON object'
+
+
+def _names(value):
+    """Category/tag names from an NDJSON list or a CSV cell joined with '|'."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(CSV_LIST_SEPARATOR)
+    if not isinstance(value, list):
+        return None
+    return list(dict.fromkeys(str(name).strip() for name in value if str(name).strip()))
+
+
+def _choice(value, choices, default):
+    if value in (None, ''):
+        return default
+    for choice, label in choices:
+        if str(value).lower() in (choice, label.lower()):
+            return choice
+    return None
+
+
+def _datetime(value):
+    if value in (None, ''):
+        return None
+    value = str(value)
+    try:
+        # A bare date means the start of that day
+        parsed = parse_datetime(value) or parse_datetime(f'{value}T00:00:00')
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class TaskImporter:
+    """
+    Create tasks for ``user`` from parsed rows, a chunk at a time: each
+    chunk resolves its category, tag and assignee names with one query
+    per kind, then goes in with bulk_create inside its own transaction.
+    Rows that fail validation are skipped and reported: passed to
+    ``on_error`` when given, else the first ``max_errors`` are kept and
+    the rest only counted.
+    """
+    title_max_length = Task._meta.get_field('title').max_length
+    name_max_length = Category._meta.get_field('name').max_length
+
+    def __init__(self, user, chunk_size=None, create_missing=True, max_errors=1000, on_error=None):
+        self.user = user
+        self.chunk_size = chunk_size or import_chunk_size()
+        self.create_missing = create_missing
+        self.max_errors = max_errors
+        self.on_error = on_error
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+    def fail(self, number, errors):
+        self.failed += 1
+        error = {'row': number, 'errors': errors}
+        if self.on_error is not None:
+            self.on_error(error)
+        elif len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    @transaction.atomic
+    def import_chunk(self, chunk):
+        parsed = []
+        for number, row in chunk:
+            if isinstance(row, str):
+                self.fail(number, {'non_field_errors': [row]})
+                continue
+            task, links, errors = self.parse(row)
+            if errors:
+                self.fail(number, errors)
+            else:
+                parsed.append((number, task, links))
+
+        categories = self.resolve(Category, {name for _, _, links in parsed for name in links['categories']})
+        tags = self.resolve(Tag, {name for _, _, links in parsed for name in links['tags']})
+        assignees = dict(
+            User.objects.filter(username__in={links['assigned_to'] for _, _, links in parsed} - {None})
+            .values_list('username', 'pk')
+        )
+
+        tasks, task_links = [], []
+        for number, task, links in parsed:
+            errors = {}
+            for field, known in (('categories', categories), ('tags', tags)):
+                missing = [name for name in links[field] if name not in known]
+                if missing:
+                    errors[field] = [f'Unknown or not yours: {missing}']
+            if links['assigned_to'] is not None:
+                task.assigned_to_id = assignees.get(links['assigned_to'])
+                if task.assigned_to_id is None:
+                    errors['assigned_to'] = [f"No user named {links['assigned_to']!r}"]
+            if errors:
+                self.fail(number, errors)
+                continue
+            tasks.append(task)
+            task_links.append(links)
+
+        Task.objects.bulk_create(tasks)
+        # Tasks only hash once bulk_create has given them primary keys
+        for model, field, ids in ((TaskCategory, 'categories', categories), (TaskTag, 'tags', tags)):
+            model.objects.sync({
+                task: [ids[name] for name in links[field]]
+                for task, links in zip(tasks, task_links) if links[field]
+            }, new=True)
+        # bulk_create sends no model signals
+        invalidate_tasks(tasks)
+        track_saved(tasks, created=True)
+        self.created += len(tasks)
+
+    def parse(self, row):
+        errors = {}
+        title = str(row.get('title') or '').strip()
+        if not title:
+            errors['title'] = ['This field is required.']
+        elif len(title) > self.title_max_length:
+            errors['title'] = [f'Ensure this field has no more than {self.title_max_length} characters.']
+
+        status = _choice(row.get('status'), Task.STATUS_CHOICES, 'todo')
+        if status is None:
+            errors['status'] = [f"{row.get('status')!r} is not a valid choice."]
+        priority = _choice(row.get('priority'), Task.PRIORITY_CHOICES, 'medium')
+        if priority is None:
+            errors['priority'] = [f"{row.get('priority')!r} is not a valid choice."]
+
+        dates = {}
+        for field in ('due_date', 'completed_at'):
+            dates[field] = _datetime(row.get(field))
+            if row.get(field) not in (None, '') and dates[field] is None:
+                errors[field] = ['Datetime has wrong format.']
+
+        links = {'assigned_to': str(row['assigned_to']) if row.get('assigned_to') else None}
+        for field in ('categories', 'tags'):
+            links[field] = _names(row.get(field))
+            if links[field] is None:
+                errors[field] = ['Expected a list of names.']
+            elif any(len(name) > self.name_max_length for name in links[field]):
+                errors[field] = [f'Names may have no more than {self.name_max_length} characters.']
+        if errors:
+            return None, None, errors
+
+        task = Task(
+            owner=self.user,
+            title=title,
+            description=str(row.get('description') or ''),
+            status=status,
+            priority=priority,
+            due_date=dates['due_date'],
+            completed_at=dates['completed_at'],
+        )
+        task.sync_completed_at()
+        return task, links, None
+
+    def resolve(self, model, names):
+        """
+        Map names to ids among the user's own categories or tags, creating
+        the missing ones first. Names are unique across users, so a name
+        someone else owns stays unresolved.
+        """
+        if not names:
+            return {}
+        if self.create_missing:
+            model.objects.bulk_create(
+                [model(name=name, created_by=self.user) for name in names],
+                ignore_conflicts=True
+            )
+        return dict(
+            model.objects.filter(created_by=self.user, name__in=names).values_list('name', 'pk')
+        )
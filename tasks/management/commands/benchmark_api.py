@@ -0,0 +1,118 @@
+import json
+import platform
+import time
+from itertools import cycle
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from tasks.benchmarking import VOCABULARY, latency_summary
+from tasks.models import Task
+
+User = get_user_model()
+
+SCENARIOS = ('list', 'filter', 'search', 'detail', 'create', 'bulk')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the API's list, filter, search, detail, create and bulk paths "
+        "in-process through the test client, on the data already in the "
+        "database (see seed_benchmark_data), and print p50/p95/p99 latency "
+        "and query counts as JSON. Writes are rolled back when the run ends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='bench_user_0', help='Username the requests are made as')
+        parser.add_argument('--runs', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario first')
+        parser.add_argument('--bulk-size', type=int, default=20, help='Creates and updates per bulk request')
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+            help='Scenario to run; repeatable (default: all)'
+        )
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}; run seed_benchmark_data first.")
+        visible = list(Task.objects.visible_to(user).order_by('pk').values_list('pk', flat=True)[:1000])
+        owned = list(Task.objects.filter(owner=user).order_by('pk').values_list('pk', flat=True)[:1000])
+        if not owned:
+            raise CommandError(f"{user.username} owns no tasks to benchmark.")
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        self.task_ids = cycle(visible)
+        # Only owners may update a task
+        self.owned_ids = cycle(owned)
+        self.bulk_size = options['bulk_size']
+        # A batch may name each task only once, so cap updates at the distinct owned ids
+        self.bulk_update_size = min(self.bulk_size, len(owned))
+        self.counter = 0
+
+        report = {
+            'user': user.username,
+            'visible_tasks': Task.objects.visible_to(user).count(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'runs': options['runs'],
+            'scenarios': {},
+        }
+        # The test client's host, and no throttling of our own requests
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], THROTTLE_STORE={}):
+            with transaction.atomic():
+                for name in options['scenarios'] or SCENARIOS:
+                    report['scenarios'][name] = self.run_scenario(client, name, options)
+                transaction.set_rollback(True)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def run_scenario(self, client, name, options):
+        for _ in range(options['warmup']):
+            self.request(client, name)
+        latencies, queries, errors = [], [], 0
+        for _ in range(options['runs']):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self.request(client, name)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        queries.sort()
+        return {
+            **latency_summary(latencies),
+            'queries_median': queries[len(queries) // 2],
+            'queries_max': queries[-1],
+            'errors': errors,
+        }
+
+    def request(self, client, name):
+        self.counter += 1
+        word = VOCABULARY[self.counter % len(VOCABULARY)]
+        if name == 'list':
+            return client.get('/api/tasks/')
+        if name == 'filter':
+            return client.get('/api/tasks/?status=todo&priority=high&ordering=due_date')
+        if name == 'search':
+            return client.get(f'/api/tasks/?search={word}')
+        if name == 'detail':
+            return client.get(f'/api/tasks/{next(self.task_ids)}/')
+        if name == 'create':
+            return client.post('/api/tasks/', {'title': f'Benchmark {word} {self.counter}', 'priority': 'high'})
+        return client.post('/api/tasks/bulk/', {
+            'create': [{'title': f'Bulk {word} {self.counter}.{i}'} for i in range(self.bulk_size)],
+            'update': [{'id': next(self.owned_ids), 'priority': 'low'} for _ in range(self.bulk_update_size)],
+        }, format='json')
@@ -0,0 +1,60 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from task_management_api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from tasks.benchmarking import seed_tasks, seed_users
+from tasks.models import Task
+from tasks.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's stdlib JSON renderer and parser with the orjson-backed "
+        "ones on TaskSerializer output. The seed data is rolled back when the "
+        "run finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--words', type=int, default=40, help='Words per generated description')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson is not installed; FastJSONRenderer uses the stdlib path.')
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['users']} users and {options['tasks']} tasks...")
+            users = seed_users(options['users'])
+            seed_tasks(users, options['tasks'], description_words=options['words'])
+            queryset = TaskSerializer.setup_eager_loading(Task.objects.filter(owner__in=users))
+            data = TaskSerializer(queryset, many=True).data
+            transaction.set_rollback(True)
+
+        body = JSONRenderer().render(data)
+        self.stdout.write(f"{len(data)} tasks, {len(body)} bytes of JSON\n")
+        for label, stdlib, fast in (
+            ('render', lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+            ('parse', lambda: JSONParser().parse(BytesIO(body)), lambda: FastJSONParser().parse(BytesIO(body))),
+        ):
+            slow_ms = self.time(stdlib, options['runs'])
+            fast_ms = self.time(fast, options['runs'])
+            self.stdout.write(
+                f"{label:<7} stdlib median {slow_ms:8.2f} ms   "
+                f"fast median {fast_ms:8.2f} ms   {slow_ms / fast_ms:5.1f}x"
+            )
+
+    def time(self, function, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
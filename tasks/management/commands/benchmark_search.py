@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from tasks.benchmarking import seed_tasks, seed_users
+from tasks.models import Task
+from tasks.search import search_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare substring (ILIKE) search with the full-text index on a seeded "
+        "dataset. The seed data is rolled back when the run finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--words', type=int, default=40, help='Words per generated description')
+        parser.add_argument(
+            '--query', action='append', dest='queries',
+            help='Search string to time; repeatable (default: a common, a rare and a two-word query)'
+        )
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of each backend')
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ['report', 'warehouse', 'budget forecast']
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['users']} users and {options['tasks']} tasks...")
+            users = seed_users(options['users'])
+            seed_tasks(
+                users, options['tasks'], batch_size=options['batch_size'],
+                description_words=options['words']
+            )
+            for query in queries:
+                terms = query.split()
+                plans = {
+                    'ilike': lambda: self.substring_search(terms),
+                    'fulltext': lambda: search_tasks(Task.objects.all(), terms).order_by('-search_rank', '-created_at'),
+                }
+                self.stdout.write(f"\nsearch={query!r}")
+                for name, build in plans.items():
+                    if build() is None:
+                        self.stdout.write(f"{name:<10} not supported on this database")
+                        continue
+                    self.run_plan(name, build, options)
+            transaction.set_rollback(True)
+
+    def substring_search(self, terms):
+        """What DRF's SearchFilter builds for search_fields = ['title', 'description']."""
+        queryset = Task.objects.all()
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset.order_by('-created_at')
+
+    def run_plan(self, name, build, options):
+        """Time what TaskViewSet.list does: a count plus the first page."""
+        timings = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            queryset = build()
+            count = queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(
+            f"{name:<10} median {statistics.median(timings):8.2f} ms   "
+            f"max {max(timings):8.2f} ms   {count} matches"
+        )
+        if options['explain']:
+            self.stdout.write(build()[:10].explain())
@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from tasks.benchmarking import seed_tasks, seed_users
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the task visibility query plans on a seeded dataset. "
+        "The seed data is rolled back when the run finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--explain', action='store_true', help='Print the query plan of each strategy')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options)
+            plans = {
+                'or+distinct': lambda: Task.objects.filter(Q(owner=user) | Q(assigned_to=user)).distinct(),
+                'or': lambda: Task.objects.visible_to(user, strategy='or'),
+                'union': lambda: Task.objects.visible_to(user, strategy='union'),
+            }
+            for name, build in plans.items():
+                self.run_plan(name, build, options)
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        self.stdout.write(f"Seeding {options['users']} users and {options['tasks']} tasks...")
+        users = seed_users(options['users'])
+        seed_tasks(users, options['tasks'], batch_size=options['batch_size'])
+        return users[0]
+
+    def run_plan(self, name, build, options):
+        """Time what TaskViewSet.list does: a filtered count plus the first page."""
+        timings = []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            queryset = build().filter(status='todo').order_by('-created_at')
+            queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(
+            f"{name:<12} median {statistics.median(timings):8.2f} ms   "
+            f"max {max(timings):8.2f} ms"
+        )
+        if options['explain']:
+            queryset = build().filter(status='todo').order_by('-created_at')[:10]
+            self.stdout.write(queryset.explain())
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.signals import render_avatar
+from task_management_api.renditions import current_renditions, is_image
+from tasks.models import Attachment
+from tasks.storage import render_attachment
+
+
+class Command(BaseCommand):
+    help = (
+        "Render missing avatar and image attachment thumbnails, e.g. for files "
+        "uploaded before renditions existed or jobs lost to a restart."
+    )
+
+    def handle(self, *args, **options):
+        jobs = []
+        for user in User.objects.exclude(avatar='').exclude(avatar__isnull=True).iterator():
+            if not current_renditions(user.avatar, user.avatar_renditions):
+                jobs.append((render_avatar, user.pk, user.avatar.name))
+        for attachment in Attachment.objects.iterator():
+            if is_image(attachment.filename) and not current_renditions(attachment.file, attachment.renditions):
+                jobs.append((render_attachment, attachment.pk, attachment.task_id, attachment.file.name))
+
+        failed = 0
+        for function, *args in jobs:
+            try:
+                function(*args)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{args[-1]}: {exc}")
+        self.stdout.write(f"Rendered thumbnails for {len(jobs) - failed} files, {failed} failed.")
@@ -0,0 +1,65 @@
+import csv
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.imports import FORMATS, TaskImporter, guess_format, parse_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks for a user from a CSV or NDJSON file in the layout "
+        "/api/tasks/export/ produces. The file is read a row at a time and "
+        "inserted in chunks, each committed on its own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--user', required=True, help='Username that will own the tasks')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension, else csv')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk insert (TASK_IMPORT_CHUNK_SIZE)')
+        parser.add_argument(
+            '--no-create-missing', action='store_false', dest='create_missing',
+            help='Reject rows naming categories or tags the user does not have'
+        )
+        parser.add_argument('--errors', help='Write every failed row to this file, one JSON object per line')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        path = options['path']
+        import_format = options['format'] or guess_format(path)
+        try:
+            stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        except OSError as exc:
+            raise CommandError(exc)
+        errors = open(options['errors'], 'w') if options['errors'] else None
+        importer = TaskImporter(
+            user,
+            chunk_size=options['chunk_size'],
+            create_missing=options['create_missing'],
+            max_errors=20,
+            on_error=(lambda error: errors.write(json.dumps(error) + '\n')) if errors else None,
+        )
+        try:
+            importer.run(parse_rows(stream, import_format))
+        except (OSError, ValueError, csv.Error) as exc:
+            raise CommandError(f"Stopped after importing {importer.created} tasks: {exc}")
+        finally:
+            stream.close()
+            if errors:
+                errors.close()
+
+        report = importer.report()
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if report['failed'] > len(report['errors']) and not errors:
+            self.stderr.write(f"... pass --errors FILE to see all {report['failed']} failed rows")
+        self.stdout.write(f"Imported {report['created']} tasks, {report['failed']} rows failed.")
@@ -0,0 +1,95 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tasks.benchmarking import latency_summary
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with concurrent keep-alive clients and report "
+        "throughput and latency per path. Start the server under test first, "
+        "e.g. sync gunicorn and uvicorn with the same number of workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request; repeatable (default: the sync and async task lists)'
+        )
+        parser.add_argument('--user', required=True, help='Username whose access token the clients send')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per path')
+        parser.add_argument('--json', action='store_true', help='Print one JSON object instead of a table')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        token = str(AccessToken.for_user(user))
+        paths = options['paths'] or ['/api/tasks/', '/api/async/tasks/']
+
+        results = {path: self.run_path(options['url'], path, token, options) for path in paths}
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for path, result in results.items():
+            self.stdout.write(
+                f"{path:<28} {result['requests_per_second']:8.1f} req/s   "
+                f"p50 {result['p50_ms']:7.1f} ms   p95 {result['p95_ms']:7.1f} ms   "
+                f"p99 {result['p99_ms']:7.1f} ms   errors {result['errors']}"
+            )
+
+    def run_path(self, url, path, token, options):
+        target = urlsplit(url)
+        headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+        deadline = time.monotonic() + options['duration']
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def client():
+            connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            mine, failed = [], 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failed += 1
+                        continue
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    connection.close()
+                    continue
+                mine.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'requests_per_second': len(latencies) / elapsed,
+            **latency_summary(latencies),
+        }
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.models import Tombstone
+from tasks.sync import tombstone_retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tombstones older than TASK_SYNC_TOMBSTONE_DAYS. Sync tokens "
+        "from before that point are answered with 410 Gone."
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - tombstone_retention()
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f"Pruned {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.uploads import prune_uploads, upload_expiry
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete chunked attachment uploads idle for longer than "
+        "TASK_UPLOAD_EXPIRY_HOURS, and their staging files."
+    )
+
+    def handle(self, *args, **options):
+        removed = prune_uploads()
+        self.stdout.write(f"Removed {removed} staging files idle for over {upload_expiry()}.")
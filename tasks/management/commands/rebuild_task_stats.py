@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskStatsRollup, TaskCompletionRollup
+from tasks.stats import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the per-user task stats rollups from the tasks table. Run it "
+        "after turning TASK_STATS_ROLLUP on, or to repair drift."
+    )
+
+    def handle(self, *args, **options):
+        rebuild_rollups()
+        self.stdout.write(
+            f"Rebuilt {TaskStatsRollup.objects.count()} count rows and "
+            f"{TaskCompletionRollup.objects.count()} completion rows."
+        )
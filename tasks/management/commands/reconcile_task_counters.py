@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tasks.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount comment_count, attachment_count and attachment_bytes on tasks "
+        "whose stored values drifted from the comments and attachments tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tasks recounted per transaction')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(f"Reconciled the counters of {len(fixed)} tasks.")
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from tasks.benchmarking import seed_labels, seed_task_details, seed_tasks, seed_users
+from tasks.models import Task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a reproducible benchmark dataset: users, tasks "
+        "with skewed owners and assignees, categories, tags, comments and "
+        "attachment metadata. The same --seed gives the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--tasks', type=int, default=20000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--comments', type=float, default=3.0, help='Mean comments per task')
+        parser.add_argument('--attachments', type=float, default=0.5, help='Mean attachments per task')
+        parser.add_argument('--words', type=int, default=40, help='Words per generated description')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench', help='Prefix of generated usernames and labels')
+        parser.add_argument('--flush', action='store_true', help='Delete an earlier dataset with this prefix first')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_user_')
+        if existing.exists():
+            if not options['flush']:
+                raise CommandError(f"A dataset with prefix {prefix!r} exists; pass --flush to replace it.")
+            self.stdout.write(f"Deleting the earlier {prefix!r} dataset...")
+            # Their tasks, labels, comments and attachments go with them
+            existing.delete()
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = seed_users(options['users'], prefix=f'{prefix}_user')
+            categories, tags = seed_labels(users, options['categories'], options['tags'], prefix=prefix)
+            seed_tasks(
+                users, options['tasks'], batch_size=options['batch_size'], seed=options['seed'],
+                description_words=options['words'], skew_assignees=True, due_dates=True,
+            )
+            tasks = Task.objects.filter(owner__in=users)
+            seed_task_details(
+                tasks, users, categories, tags,
+                comments_per_task=options['comments'], attachments_per_task=options['attachments'],
+                batch_size=options['batch_size'], seed=options['seed'],
+            )
+            totals = tasks.aggregate(comments=Sum('comment_count'), attachments=Sum('attachment_count'))
+
+        self.stdout.write(
+            f"Seeded {len(users)} users, {options['tasks']} tasks, {len(categories)} categories, "
+            f"{len(tags)} tags, {totals['comments']} comments and {totals['attachments']} attachments "
+            f"in {time.perf_counter() - start:.1f} s. The busiest user is {users[0].username}."
+        )
+        if getattr(settings, 'TASK_STATS_ROLLUP', False):
+            self.stdout.write("TASK_STATS_ROLLUP is on: run `manage.py rebuild_task_stats` to count the new tasks.")
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskCategory', to='tasks.category'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='tasks.TaskTag', to='tasks.tag'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tasks.search
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index for task search: generated, GIN-indexed tsvector
+    columns on Postgres, FTS5 tables kept in step by triggers on SQLite.
+    The tsvector columns live outside the model state, so rows never
+    load them.
+    """
+
+    dependencies = [
+        ('tasks', '0004_tombstones_and_change_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(tasks.search.create_search_index, tasks.search.drop_search_index),
+        migrations.CreateModel(
+            name='TaskSearchDocument',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='tasks.task')),
+                ('document', tasks.search.FTS5DocumentField(db_column='tasks_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'tasks_fts',
+                'managed': False,
+            },
+        ),
+    ]
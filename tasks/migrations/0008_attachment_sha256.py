@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_attachment_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_attachment_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:54
+
+from django.db import migrations, models
+
+import tasks.search
+
+BACKFILL_SQL = """
+UPDATE tasks SET
+    comment_count = (SELECT COUNT(*) FROM comments WHERE comments.task_id = tasks.id),
+    attachment_count = (SELECT COUNT(*) FROM attachments WHERE attachments.task_id = tasks.id),
+    attachment_bytes = (SELECT COALESCE(SUM(file_size), 0) FROM attachments WHERE attachments.task_id = tasks.id)
+"""
+
+
+class Migration(migrations.Migration):
+    """
+    Denormalized comment and attachment counters on tasks, filled in from
+    the existing rows. Adding columns with a default rebuilds the table on
+    SQLite, which drops its search triggers, so they are recreated.
+    """
+
+    dependencies = [
+        ('tasks', '0009_attachment_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='attachment_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attachment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunPython(tasks.search.create_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['task', '-uploaded_at'], name='attachments_task_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', '-created_at'], name='comments_task_created_idx'),
+        ),
+    ]
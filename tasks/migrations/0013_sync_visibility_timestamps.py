@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_uploaded_at(apps, schema_editor):
+    # Existing attachments haven't changed since upload
+    Attachment = apps.get_model('tasks', 'Attachment')
+    Attachment.objects.update(updated_at=models.F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_category_tag_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_uploaded_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='task',
+            name='assigned_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['updated_at'], name='attachments_updated_577ae2_idx'),
+        ),
+    ]
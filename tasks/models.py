@@ -1,6 +1,74 @@
 
+import threading
+import uuid
+from contextlib import contextmanager
+
 from django.db import models
 from django.conf import settings
+from django.dispatch import Signal
+from django.utils.functional import cached_property
+
+from .search import FTS5DocumentField
+
+# Sent by TaskLinkQuerySet.sync() with the tasks whose links changed,
+# since its bulk writes bypass the model save/delete signals.
+task_links_changed = Signal()
+
+
+def embed_limit():
+    """How many of the newest comments and attachments a task embeds."""
+    return getattr(settings, 'TASK_EMBED_LIMIT', 10)
+
+
+class TaskQuerySet(models.QuerySet):
+    
+    VISIBILITY_STRATEGIES = ('union', 'or')
+    
+    def visible_to(self, user, strategy=None):
+        """
+        Tasks owned by or assigned to ``user``.
+        
+        Both strategies return each task at most once, so no DISTINCT is
+        needed and filters/ordering can still use the indexes:
+        - ``union``: two disjoint branches, each served by its own
+          (owner, -created_at) / (assigned_to, -created_at) index,
+          glued with UNION ALL inside an ``IN`` subquery.
+        - ``or``: a plain OR across both columns, which Postgres turns
+          into a BitmapOr over the same two indexes.
+        """
+        strategy = strategy or getattr(settings, 'TASK_VISIBILITY_STRATEGY', 'union')
+        if strategy not in self.VISIBILITY_STRATEGIES:
+            raise ValueError(f"Unknown task visibility strategy: {strategy}")
+        
+        if strategy == 'or':
+            return self.filter(models.Q(owner=user) | models.Q(assigned_to=user))
+        
+        # Subqueries of a compound statement may not carry an ORDER BY
+        owned = Task.objects.filter(owner=user).order_by().values('pk')
+        assigned = Task.objects.filter(assigned_to=user).exclude(owner=user).order_by().values('pk')
+        return self.filter(pk__in=owned.union(assigned, all=True))
+    
+    def touch(self):
+        """
+        Move updated_at forward without a save(), for changes that show up
+        in a task's representation but live in other tables (comments,
+        attachments). ETags and sync feeds key off updated_at.
+        """
+        from django.utils import timezone
+        return self.update(updated_at=timezone.now())
+    
+    def add_to_counters(self, **deltas):
+        """
+        Move the denormalized counters by ``deltas`` (e.g. comment_count=1)
+        and touch the tasks, in one UPDATE. Adding to the column, rather
+        than writing a recount, can't lose a concurrent writer's change.
+        """
+        from django.utils import timezone
+        return self.update(
+            updated_at=timezone.now(),
+            **{name: models.F(name) + delta for name, delta in deltas.items() if delta}
+        )
+
 
 class Task(models.Model):
     """Main task model"""
@@ -44,11 +112,38 @@ class Task(models.Model):
         blank=True,
         related_name='assigned_tasks'
     )
-    
-   
+
+    # Backed by the existing join tables so the links can be prefetched
+    categories = models.ManyToManyField(
+        'Category',
+        through='TaskCategory',
+        related_name='tasks',
+        blank=True
+    )
+    tags = models.ManyToManyField(
+        'Tag',
+        through='TaskTag',
+        related_name='tasks',
+        blank=True
+    )
+
+
+    # Denormalized from comments and attachments for task lists; kept in
+    # step by the API (tasks.counters) and repaired by reconcile_task_counters.
+    # save() leaves them alone, so an out-of-date copy can't write them back
+    comment_count = models.IntegerField(default=0)
+    attachment_count = models.IntegerField(default=0)
+    attachment_bytes = models.BigIntegerField(default=0)
+    counter_fields = ('comment_count', 'attachment_count', 'attachment_bytes')
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # When assigned_to last changed; the changes feed sends a new assignee
+    # the task's comments and attachments from before then
+    assigned_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         db_table = 'tasks'
@@ -57,19 +152,53 @@ class Task(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['priority']),
             models.Index(fields=['due_date']),
+            # Back the two branches of TaskQuerySet.visible_to()
+            models.Index(fields=['owner', '-created_at'], name='tasks_owner_created_idx'),
+            models.Index(fields=['assigned_to', '-created_at'], name='tasks_assignee_created_idx'),
+            # Range scans for the changes feed
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
         return self.title
     
     def save(self, *args, **kwargs):
-        """Auto-set completed_at when status changes to completed"""
+        """
+        Auto-set completed_at when status changes to completed. Updates
+        write every column but the counters, unless update_fields names them.
+        """
+        self.sync_completed_at()
+        self.sync_assigned_at()
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+    
+    # TaskSerializer prefetches these for whole pages; the queries below
+    # only run for a task loaded without them
+    @cached_property
+    def latest_comments(self):
+        return list(self.comments.order_by('-created_at', '-pk')[:embed_limit()])
+    
+    @cached_property
+    def latest_attachments(self):
+        return list(self.attachments.order_by('-uploaded_at', '-pk')[:embed_limit()])
+    
+    def sync_completed_at(self):
+        """Keep completed_at in step with status; bulk writes call this since they skip save()"""
         if self.status == 'completed' and not self.completed_at:
             from django.utils import timezone
             self.completed_at = timezone.now()
         elif self.status != 'completed':
             self.completed_at = None
-        super().save(*args, **kwargs)
+    
+    def sync_assigned_at(self):
+        """Stamp assigned_at when the assignee changed since loading; bulk writes call this too"""
+        if self.assigned_to_id is not None and self.assigned_to_id != getattr(self, '_loaded_assigned_to_id', None):
+            from django.utils import timezone
+            self.assigned_at = timezone.now()
 
 
 class Category(models.Model):
@@ -82,6 +211,7 @@ class Category(models.Model):
         related_name='categories'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'categories'
@@ -100,6 +230,7 @@ class Tag(models.Model):
         related_name='tags'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'tags'
@@ -110,10 +241,73 @@ class Tag(models.Model):
 
 
 
+class TaskSearchDocument(models.Model):
+    """
+    A task's row in the SQLite FTS5 index (see tasks.search); the table
+    only exists on SQLite, where search_tasks() joins it for ranking.
+    """
+    task = models.OneToOneField(
+        Task,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_document'
+    )
+    document = FTS5DocumentField(db_column='tasks_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'tasks_fts'
+
+
+class TaskLinkQuerySet(models.QuerySet):
+    
+    def sync(self, wanted, new=False):
+        """
+        Make each task's links match ``wanted`` ({task: [ids]}), touching
+        only the rows that change: at most one SELECT, one DELETE and one
+        bulk INSERT however many tasks and ids are involved. ``new``
+        skips the SELECT for tasks that were just created.
+        """
+        if not wanted:
+            return
+        column = f'{self.model.link_field}_id'
+        current = {}
+        if not new:
+            rows = self.filter(task__in=list(wanted)).values_list('pk', 'task_id', column)
+            for pk, task_id, target_id in rows:
+                current.setdefault(task_id, {})[target_id] = pk
+        
+        inserts, deletes = [], []
+        for task, ids in wanted.items():
+            ids = dict.fromkeys(ids)
+            existing = current.get(task.pk, {})
+            inserts.extend(
+                self.model(task=task, **{column: target_id})
+                for target_id in ids if target_id not in existing
+            )
+            deletes.extend(pk for target_id, pk in existing.items() if target_id not in ids)
+        
+        if deletes:
+            self.filter(pk__in=deletes).delete()
+        if inserts:
+            self.bulk_create(inserts)
+        if inserts or deletes:
+            if not new:
+                # Links are part of the task's representation
+                Task.objects.filter(pk__in=[task.pk for task in wanted]).touch()
+            task_links_changed.send(sender=self.model, tasks=list(wanted))
+
+
 class TaskCategory(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     
+    link_field = 'category'
+    objects = TaskLinkQuerySet.as_manager()
+    
     class Meta:
         db_table = 'task_categories'
         unique_together = ['task', 'category']
@@ -123,6 +317,9 @@ class TaskTag(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
     
+    link_field = 'tag'
+    objects = TaskLinkQuerySet.as_manager()
+    
     class Meta:
         db_table = 'task_tags'
         unique_together = ['task', 'tag']
@@ -146,6 +343,11 @@ class Comment(models.Model):
     class Meta:
         db_table = 'comments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at']),
+            # A task's comments newest first: nested pages and embedded latest
+            models.Index(fields=['task', '-created_at'], name='comments_task_created_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.author.username} on {self.task.title}"
@@ -160,15 +362,178 @@ class Attachment(models.Model):
     file = models.FileField(upload_to='task_attachments/')
     filename = models.CharField(max_length=255)
     file_size = models.IntegerField()
+    # Hex SHA-256 of the content; the file is stored under it
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Storage names of image thumbnails by label, filled in the background
+    renditions = models.JSONField(default=dict, blank=True)
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'attachments'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['uploaded_at']),
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['task', '-uploaded_at'], name='attachments_task_uploaded_idx'),
+        ]
+    
+    def __str__(self):
+        return self.filename
+
+
+class AttachmentUpload(models.Model):
+    """
+    A chunked attachment upload in progress. Parts are written to a
+    staging file at ``offset``, which only moves once a part has fully
+    arrived, so a dropped connection resumes from there. Completing the
+    upload turns the staged file into an Attachment and deletes this row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attachment_uploads'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+
+class TombstoneManager(models.Manager):
+    
+    _batch = threading.local()
+    
+    def record(self, kind, object_id, user_ids, task_id=None):
+        """Note that ``object_id`` stopped being visible to each of ``user_ids``."""
+        tombstones = [
+            self.model(user_id=user_id, kind=kind, object_id=object_id, task_id=task_id)
+            for user_id in set(user_ids) if user_id is not None
+        ]
+        pending = getattr(self._batch, 'tombstones', None)
+        if pending is not None:
+            pending.extend(tombstones)
+        elif tombstones:
+            self.bulk_create(tombstones)
+    
+    def record_lost_assignments(self, tasks):
+        """Tombstone tasks for the assignee they were loaded with, if it changed."""
+        for task in tasks:
+            previous = getattr(task, '_loaded_assigned_to_id', None)
+            if previous not in (None, task.assigned_to_id, task.owner_id):
+                self.record('task', task.pk, [previous])
+    
+    @contextmanager
+    def batch(self):
+        """Collect every tombstone recorded inside the block into one bulk insert."""
+        if getattr(self._batch, 'tombstones', None) is not None:
+            yield
+            return
+        self._batch.tombstones = []
+        try:
+            yield
+            self.bulk_create(self._batch.tombstones)
+        finally:
+            self._batch.tombstones = None
+
+
+class Tombstone(models.Model):
+    """
+    Record of an object that a user can no longer see, because it was
+    deleted or the task was reassigned away from them. Read by the task
+    changes feed and pruned after TASK_SYNC_TOMBSTONE_DAYS.
+    """
+    
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+        ('attachment', 'Attachment'),
+    ]
+    
+    # No constraint: tombstones are written while a user's tasks are being
+    # cascade-deleted, and are pruned by age rather than with the user
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    task_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = TombstoneManager()
+    
+    class Meta:
+        db_table = 'tombstones'
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.object_id} removed for user {self.user_id}"
+
+
+class TaskStatsRollup(models.Model):
+    """
+    Number of tasks visible to a user in one status/priority pair. Kept
+    in step by tasks.stats when TASK_STATS_ROLLUP is on, so the stats
+    dashboard reads a few rows instead of scanning every task.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    priority = models.CharField(max_length=20, choices=Task.PRIORITY_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'task_stats_rollups'
+        unique_together = ['user', 'status', 'priority']
+    
+    def __str__(self):
+        return f"{self.user_id} {self.status}/{self.priority}: {self.count}"
+
+
+class TaskCompletionRollup(models.Model):
+    """Number of visible tasks a user saw completed on one (local) day."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'task_completion_rollups'
+        unique_together = ['user', 'day']
     
     def __str__(self):
-        return self.filename
\ No newline at end of file
+        return f"{self.user_id} {self.day}: {self.count}"
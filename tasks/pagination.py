@@ -0,0 +1,304 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from the Postgres planner, which costs no table scan.
+    Small results are counted exactly since estimates are rough there,
+    and other databases always get an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    threshold = getattr(settings, 'TASK_PAGINATION_ESTIMATE_THRESHOLD', 1000)
+    if estimate < threshold:
+        return queryset.count()
+    return estimate
+
+
+class UncountedPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class UncountedPaginator(Paginator):
+    """
+    Paginator that never relies on the total for slicing. It reads one row
+    past the page to know whether another page exists, so ``count`` can be
+    skipped (``None``) or just an estimate.
+    """
+    estimate = False
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise EmptyPage('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return UncountedPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page
+        )
+
+    @cached_property
+    def count(self):
+        if self.estimate:
+            return estimate_count(self.object_list)
+        return None
+
+    @property
+    def num_pages(self):
+        # Unknown without an exact count; keeps page controls and ?page=last off
+        return 0
+
+
+class EstimatedCountPaginator(UncountedPaginator):
+    estimate = True
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the active ordering plus ``id`` as a
+    tie-breaker. Each page is a range seek from the previous position,
+    so it costs the same at any depth and never counts the result set.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, reverse))
+        queryset = queryset.order_by(*self.order_expressions(reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, request, queryset, view):
+        """Follow OrderingFilter, falling back to the model's default ordering."""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = self.model._meta.ordering or []
+        # Positions are read off stored columns, so computed keys (search rank) are dropped
+        ordering = [
+            name for name in ordering
+            if name.lstrip('-') not in ('id', 'pk') and name.lstrip('-') not in queryset.query.annotations
+        ]
+
+        # id keeps positions unique when the sort keys tie
+        last_desc = ordering[-1].startswith('-') if ordering else False
+        return ordering + ['-id' if last_desc else 'id']
+
+    def order_expressions(self, reverse=False):
+        expressions = []
+        for name in self.ordering:
+            field, descending = self._field(name)
+            if reverse:
+                descending = not descending
+            nulls = {}
+            if field.null:
+                # Nulls sort after every value going forward
+                nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            expression = F(field.name)
+            expressions.append(expression.desc(**nulls) if descending else expression.asc(**nulls))
+        return expressions
+
+    def seek_filter(self, position, reverse=False):
+        """Rows strictly after ``position`` (before it when ``reverse``), lexicographically."""
+        condition = None
+        for name, value in reversed(list(zip(self.ordering, position))):
+            field, descending = self._field(name)
+            beyond = self._beyond(field, descending, value, reverse)
+            if condition is None:
+                condition = beyond
+            else:
+                equal = Q(**{f'{field.name}__isnull': True}) if value is None else Q(**{field.name: value})
+                condition = beyond | (equal & condition)
+        return condition
+
+    def _beyond(self, field, descending, value, reverse):
+        """Rows strictly past ``value`` on one key, in the direction of travel."""
+        nothing = Q(pk__in=[])
+        if value is None:
+            # Nulls are last: nothing follows them, every value precedes them
+            return Q(**{f'{field.name}__isnull': False}) if reverse else nothing
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition = Q(**{f'{field.name}__{lookup}': value})
+        if field.null and not reverse:
+            condition |= Q(**{f'{field.name}__isnull': True})
+        return condition
+
+    def _field(self, name):
+        descending = name.startswith('-')
+        return self.model._meta.get_field(name.lstrip('-')), descending
+
+    def _position(self, instance):
+        position = []
+        for name in self.ordering:
+            field, _ = self._field(name)
+            value = field.value_from_object(instance)
+            position.append(None if value is None else field.value_to_string(instance))
+        return position
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'o': self.ordering, 'p': self._position(instance), 'r': int(reverse)}
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor only makes sense under the ordering that produced it
+        if (
+            payload.get('o') != self.ordering or not isinstance(position, list)
+            or len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                None if value is None else self._field(name)[0].to_python(value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class TaskPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, with two per-request options:
+    - ``?pagination=cursor`` (or any ``?cursor=``) switches to keyset paging.
+    - ``?count=exact|estimate|none`` controls how the total is computed.
+    """
+    pagination_query_param = 'pagination'
+    count_query_param = 'count'
+    count_modes = {
+        'exact': Paginator,
+        'estimate': EstimatedCountPaginator,
+        'none': UncountedPaginator,
+    }
+
+    def uses_keyset(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.uses_keyset(request):
+            self.keyset = KeysetPagination()
+            self.keyset.page_size = self.get_page_size(request)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.django_paginator_class = self.count_modes.get(
+            request.query_params.get(self.count_query_param),
+            self.count_modes[getattr(settings, 'TASK_PAGINATION_COUNT', 'exact')]
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def counts_rows(self, request):
+        """Whether this request already pays for a full COUNT(*) of the list."""
+        if self.uses_keyset(request):
+            return False
+        mode = request.query_params.get(self.count_query_param)
+        if mode not in self.count_modes:
+            mode = getattr(settings, 'TASK_PAGINATION_COUNT', 'exact')
+        return mode == 'exact'
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
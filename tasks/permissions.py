@@ -7,5 +7,6 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        # Write permissions are only allowed to the owner
-        return obj.owner == request.user
+        # Write permissions are only allowed to the owner.
+        # Compare ids so the check never has to load the owner row.
+        return obj.owner_id == request.user.pk
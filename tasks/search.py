@@ -0,0 +1,160 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db import models
+from django.db.models import Exists, Expression, F, Lookup, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+# Text search configuration of the Postgres index. The generated columns
+# are built with it, so changing it needs a migration that rebuilds them.
+SEARCH_CONFIG = 'english'
+
+POSTGRES_INDEX_SQL = [
+    """
+    ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS tasks_search_vector_idx ON tasks USING gin (search_vector)',
+    """
+    ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english'::regconfig, coalesce(content, ''))
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS comments_search_vector_idx ON comments USING gin (search_vector)',
+]
+
+POSTGRES_DROP_SQL = [
+    'ALTER TABLE comments DROP COLUMN IF EXISTS search_vector',
+    'ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _fts5_sql(table, columns):
+    """External-content FTS5 table over ``table``, kept in step by triggers."""
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+SQLITE_INDEX_SQL = [
+    *_fts5_sql('tasks', ['title', 'description']),
+    # Default ORDER BY rank: title hits weigh 10x description hits
+    "INSERT INTO tasks_fts(tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    *_fts5_sql('comments', ['content']),
+]
+
+SQLITE_DROP_SQL = [
+    f'DROP TABLE IF EXISTS {fts}' for fts in ('comments_fts', 'tasks_fts')
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Build the search index for the current database. Safe to run again:
+    SQLite drops a table's triggers whenever a migration rebuilds it, so
+    such migrations must call this afterwards.
+    """
+    statements = {
+        'postgresql': POSTGRES_INDEX_SQL,
+        'sqlite': SQLITE_INDEX_SQL,
+    }.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_DROP_SQL,
+        'sqlite': SQLITE_DROP_SQL,
+    }.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class SearchVectorColumn(Expression):
+    """
+    The ``search_vector`` column of the queryset's base table. It is kept
+    off the models so rows never carry it; the alias is resolved at
+    compile time, which keeps it valid inside relabelled subqueries.
+    """
+    output_field = SearchVectorField()
+
+    def as_sql(self, compiler, connection):
+        alias = compiler.query.get_initial_alias()
+        return f'{compiler.quote_name_unless_alias(alias)}.search_vector', []
+
+
+class FTS5DocumentField(models.TextField):
+    """The hidden column an FTS5 table shares its name with; ``__match`` runs a full-text query."""
+
+
+@FTS5DocumentField.register_lookup
+class FTS5Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def fts5_query(terms):
+    """Quote each term so user input can't inject FTS5 syntax; a trailing * keeps prefix matches."""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_tasks(queryset, terms, comments=False):
+    """
+    Tasks matching every term in their title or description (or, with
+    ``comments``, in one of their comments), annotated with
+    ``search_rank`` where the backend can rank them. Returns None when the database has no full-text
+    index, leaving the caller to fall back to substring search.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.alias(search_vector=SearchVectorColumn())
+        matches = Q(search_vector=query)
+        if comments:
+            from .models import Comment
+            matches |= Exists(
+                Comment.objects.order_by().alias(search_vector=SearchVectorColumn())
+                .filter(task=OuterRef('pk'), search_vector=query)
+            )
+        return queryset.filter(matches).annotate(
+            search_rank=SearchRank(SearchVectorColumn(), query)
+        )
+
+    if vendor == 'sqlite':
+        match = fts5_query(terms)
+        if not comments:
+            # Joined rather than correlated, so FTS5 evaluates the query once
+            return queryset.filter(search_document__document__match=match).annotate(
+                search_rank=-F('search_document__rank')
+            )
+        # Comment matches have no task row to rank, and a MATCH on the outer
+        # side of a join would run once per task, so these stay unranked
+        return queryset.filter(
+            Q(pk__in=RawSQL('SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH %s', [match]))
+            | Q(pk__in=RawSQL(
+                'SELECT comments.task_id FROM comments_fts '
+                'JOIN comments ON comments.id = comments_fts.rowid '
+                'WHERE comments_fts MATCH %s', [match]
+            ))
+        )
+
+    return None
@@ -1,63 +1,141 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Task, Category, Tag, Comment, Attachment
+from .models import Task, Category, Tag, TaskCategory, TaskTag, Comment, Attachment, AttachmentUpload, Tombstone, embed_limit
+from .permissions import IsOwnerOrReadOnly
+from .cache import invalidate_tasks
+from .stats import track_saved
+from .uploads import max_upload_size
 from accounts.serializers import UserSerializer
+from task_management_api.fieldsets import SelectableFieldsMixin
+from task_management_api.metrics import TimedSerializerMixin
+from task_management_api.renditions import rendition_urls
 
-class CategorySerializer(serializers.ModelSerializer):
+User = get_user_model()
+
+
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the relations it renders, so views can load
+    them up front instead of issuing one query per row.
+    """
+    select_related_fields = []
+    prefetch_related_fields = []
+
+    @classmethod
+    def get_select_related(cls, selection=None):
+        """Joins only for relations the FieldSelection nests; flat ones read the FK column."""
+        return [name for name in cls.select_related_fields if selection is None or selection.expands(name)]
+
+    @classmethod
+    def get_prefetch_related(cls, selection=None):
+        return [name for name in cls.prefetch_related_fields if selection is None or selection.includes(name)]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, selection=None):
+        select_related = cls.get_select_related(selection)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = cls.get_prefetch_related(selection)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+class CategorySerializer(SelectableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
+    select_related_fields = ['created_by']
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'color', 'created_by', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SelectableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
+    select_related_fields = ['created_by']
     
     class Meta:
         model = Tag
         fields = ['id', 'name', 'created_by', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SelectableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
+    select_related_fields = ['author']
     
     class Meta:
         model = Comment
         fields = ['id', 'task', 'author', 'content', 'created_at', 'updated_at']
         read_only_fields = ['id', 'author', 'created_at', 'updated_at']
 
-class AttachmentSerializer(serializers.ModelSerializer):
+class AttachmentSerializer(SelectableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
+    renditions = serializers.SerializerMethodField()
+    select_related_fields = ['uploaded_by']
     
     class Meta:
         model = Attachment
         fields = [
-            'id', 'task', 'file', 'filename',
-            'file_size', 'uploaded_by', 'uploaded_at'
+            'id', 'task', 'file', 'filename', 'file_size',
+            'sha256', 'renditions', 'uploaded_by', 'uploaded_at'
         ]
-        read_only_fields = ['id', 'uploaded_by', 'uploaded_at']
+        read_only_fields = ['id', 'filename', 'file_size', 'sha256', 'uploaded_by', 'uploaded_at']
+    
+    def get_renditions(self, obj):
+        """Thumbnail URLs of image attachments by label ('thumb'); empty until rendered."""
+        return rendition_urls(obj.file, obj.renditions, self.context.get('request'))
 
-class TaskSerializer(serializers.ModelSerializer):
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    """A chunked upload session; ``offset`` is where the next part must start."""
+    
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'task', 'filename', 'size', 'offset', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'updated_at']
+    
+    def validate_task(self, task):
+        if not Task.objects.visible_to(self.context['request'].user).filter(pk=task.pk).exists():
+            raise serializers.ValidationError('Task not found.')
+        return task
+    
+    def validate_size(self, size):
+        if size < 0:
+            raise serializers.ValidationError('Ensure this value is greater than or equal to 0.')
+        if size > max_upload_size():
+            raise serializers.ValidationError(f'Files may be at most {max_upload_size()} bytes.')
+        return size
+
+class TaskSerializer(SelectableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     assigned_to = UserSerializer(read_only=True)
     assigned_to_id = serializers.IntegerField(write_only=True, required=False)
     
-    categories = CategorySerializer(many=True, read_only=True, source='taskcategory_set.category')
+    categories = CategorySerializer(many=True, read_only=True)
     category_ids = serializers.ListField(
         child=serializers.IntegerField(),
         write_only=True,
         required=False
     )
     
-    tags = TagSerializer(many=True, read_only=True, source='tasktag_set.tag')
+    tags = TagSerializer(many=True, read_only=True)
     tag_ids = serializers.ListField(
         child=serializers.IntegerField(),
         write_only=True,
         required=False
     )
     
-    comments = CommentSerializer(many=True, read_only=True)
-    attachments = AttachmentSerializer(many=True, read_only=True)
+    # Only the newest TASK_EMBED_LIMIT of each; the rest are paged from the URLs
+    comments = CommentSerializer(source='latest_comments', many=True, read_only=True)
+    attachments = AttachmentSerializer(source='latest_attachments', many=True, read_only=True)
+    comments_url = serializers.SerializerMethodField()
+    attachments_url = serializers.SerializerMethodField()
+    
+    select_related_fields = ['owner', 'assigned_to']
     
     class Meta:
         model = Task
@@ -65,29 +143,98 @@ class TaskSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'status', 'priority',
             'due_date', 'owner', 'assigned_to', 'assigned_to_id',
             'categories', 'category_ids', 'tags', 'tag_ids',
-            'comments', 'attachments',
+            'comments', 'attachments', 'comments_url', 'attachments_url',
+            'comment_count', 'attachment_count', 'attachment_bytes',
             'created_at', 'updated_at', 'completed_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at', 'completed_at']
+        read_only_fields = [
+            'id', 'owner', 'comment_count', 'attachment_count', 'attachment_bytes',
+            'created_at', 'updated_at', 'completed_at'
+        ]
+    
+    # Relation, its serializer, and the columns it needs when rendered as ids
+    nested_relations = [
+        ('categories', CategorySerializer, ['pk']),
+        ('tags', TagSerializer, ['pk']),
+        ('comments', CommentSerializer, ['pk', 'task']),
+        ('attachments', AttachmentSerializer, ['pk', 'task']),
+    ]
+    # Relations that can grow without bound embed only their newest rows
+    embedded_latest = ['comments', 'attachments']
+    
+    @classmethod
+    def get_prefetch_related(cls, selection=None):
+        """
+        Nested serializers decide how their own rows are loaded. Relations
+        left out of the FieldSelection aren't fetched at all, and those it
+        doesn't expand only fetch their ids. Comments and attachments are
+        cut to the newest TASK_EMBED_LIMIT per task in the same query.
+        """
+        prefetches = []
+        for name, serializer, id_columns in cls.nested_relations:
+            model = serializer.Meta.model
+            queryset = model.objects.all()
+            if selection is None or selection.expands(name):
+                child = selection.child(name) if selection is not None else None
+                queryset = serializer.setup_eager_loading(queryset, child)
+            elif selection.includes(name):
+                queryset = queryset.only(*id_columns)
+            else:
+                continue
+            if name in cls.embedded_latest:
+                # A sliced prefetch numbers rows per task with a window function;
+                # Django only supports it into a to_attr list
+                queryset = queryset.order_by(*model._meta.ordering, '-pk')[:embed_limit()]
+                prefetches.append(Prefetch(name, queryset=queryset, to_attr=f'latest_{name}'))
+            else:
+                prefetches.append(Prefetch(name, queryset=queryset))
+        return prefetches
+    
+    def get_comments_url(self, obj):
+        """Every comment, newest first, cursor-paginated."""
+        return self._task_url('tasks:task-comments', obj)
+    
+    def get_attachments_url(self, obj):
+        return self._task_url('tasks:task-attachments', obj)
+    
+    def _task_url(self, view_name, obj):
+        url = reverse(view_name, args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+    
+    def validate_category_ids(self, value):
+        return self._validate_owned_ids(Category, value)
     
+    def validate_tag_ids(self, value):
+        return self._validate_owned_ids(Tag, value)
+    
+    def _validate_owned_ids(self, model, ids):
+        """Check all ids in one query against rows the requesting user created."""
+        ids = list(dict.fromkeys(ids))
+        if not ids or self.context.get('bulk'):
+            # TaskBulkSerializer checks the whole batch at once
+            return ids
+        user = self.context['request'].user
+        known = set(model.objects.filter(pk__in=ids, created_by=user).values_list('pk', flat=True))
+        missing = [pk for pk in ids if pk not in known]
+        if missing:
+            raise serializers.ValidationError(f'Invalid ids: {missing}')
+        return ids
+    
+    @transaction.atomic
     def create(self, validated_data):
         category_ids = validated_data.pop('category_ids', [])
         tag_ids = validated_data.pop('tag_ids', [])
         
         task = Task.objects.create(**validated_data)
         
-        # Add categories
-        from .models import TaskCategory
-        for category_id in category_ids:
-            TaskCategory.objects.create(task=task, category_id=category_id)
-        
-        # Add tags
-        from .models import TaskTag
-        for tag_id in tag_ids:
-            TaskTag.objects.create(task=task, tag_id=tag_id)
+        # A new task has no links yet, so each set is a single bulk insert
+        TaskCategory.objects.sync({task: category_ids}, new=True)
+        TaskTag.objects.sync({task: tag_ids}, new=True)
         
         return task
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         category_ids = validated_data.pop('category_ids', None)
         tag_ids = validated_data.pop('tag_ids', None)
@@ -97,29 +244,204 @@ class TaskSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         
-        # Update categories if provided
+        # Only the links that changed are inserted or deleted
         if category_ids is not None:
-            from .models import TaskCategory
-            TaskCategory.objects.filter(task=instance).delete()
-            for category_id in category_ids:
-                TaskCategory.objects.create(task=instance, category_id=category_id)
-        
-        # Update tags if provided
+            TaskCategory.objects.sync({instance: category_ids})
         if tag_ids is not None:
-            from .models import TaskTag
-            TaskTag.objects.filter(task=instance).delete()
-            for tag_id in tag_ids:
-                TaskTag.objects.create(task=instance, tag_id=tag_id)
+            TaskTag.objects.sync({instance: tag_ids})
         
         return instance
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
     owner = serializers.StringRelatedField()
     assigned_to = serializers.StringRelatedField()
+    select_related_fields = ['owner', 'assigned_to']
     
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'status', 'priority',
-            'due_date', 'owner', 'assigned_to', 'created_at'
+            'due_date', 'owner', 'assigned_to',
+            'comment_count', 'attachment_count', 'attachment_bytes', 'created_at'
         ]
+
+
+class TaskSyncSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    """Flat task rows for the changes feed; links travel as id lists."""
+    category_ids = serializers.PrimaryKeyRelatedField(source='categories', many=True, read_only=True)
+    tag_ids = serializers.PrimaryKeyRelatedField(source='tags', many=True, read_only=True)
+    prefetch_related_fields = ['categories', 'tags']
+    
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'description', 'status', 'priority',
+            'due_date', 'owner', 'assigned_to', 'category_ids', 'tag_ids',
+            'created_at', 'updated_at', 'completed_at'
+        ]
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    """
+    Validates a batch of task creates, updates and deletes in one pass and
+    writes them set-based inside a single transaction. Nothing is written
+    unless every item is valid; errors are reported per item, aligned with
+    the submitted lists.
+    """
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    
+    def validate(self, attrs):
+        total = len(attrs['create']) + len(attrs['update']) + len(attrs['delete'])
+        max_items = getattr(settings, 'TASK_BULK_MAX_ITEMS', 1000)
+        if total == 0:
+            raise serializers.ValidationError('Provide at least one create, update or delete operation.')
+        if total > max_items:
+            raise serializers.ValidationError(f'A batch may contain at most {max_items} operations.')
+        
+        request = self.context['request']
+        view = self.context['view']
+        
+        # One query loads every task the batch touches
+        target_ids = [item.get('id') for item in attrs['update']] + attrs['delete']
+        targets = Task.objects.visible_to(request.user).in_bulk(
+            [pk for pk in target_ids if isinstance(pk, int)]
+        )
+        
+        # Reference ids are checked for the whole batch in _check_references
+        item_context = {**self.context, 'bulk': True}
+        errors = {'create': [], 'update': [], 'delete': []}
+        creates, updates, deletes = [], [], []
+        seen = set()
+        
+        for index, item in enumerate(attrs['create']):
+            serializer = TaskSerializer(data=item, context=item_context)
+            errors['create'].append({} if serializer.is_valid() else serializer.errors)
+            if not serializer.errors:
+                creates.append((index, serializer.validated_data))
+        
+        for index, item in enumerate(attrs['update']):
+            task, error = self._get_target(item.get('id'), targets, seen, request, view)
+            if error:
+                errors['update'].append(error)
+                continue
+            serializer = TaskSerializer(task, data=item, partial=True, context=item_context)
+            errors['update'].append({} if serializer.is_valid() else serializer.errors)
+            if not serializer.errors:
+                updates.append((index, task, serializer.validated_data))
+        
+        for pk in attrs['delete']:
+            task, error = self._get_target(pk, targets, seen, request, view)
+            errors['delete'].append(error or {})
+            if not error:
+                deletes.append(task)
+        
+        self._check_references(
+            [('create', index, data) for index, data in creates]
+            + [('update', index, data) for index, _, data in updates],
+            errors
+        )
+        
+        errors = {key: items for key, items in errors.items() if any(items)}
+        if errors:
+            raise serializers.ValidationError(errors)
+        
+        return {
+            'create': [data for _, data in creates],
+            'update': [(task, data) for _, task, data in updates],
+            'delete': deletes,
+        }
+    
+    def _get_target(self, pk, targets, seen, request, view):
+        """Resolve an update/delete target and apply IsOwnerOrReadOnly without extra queries."""
+        if not isinstance(pk, int):
+            return None, {'id': ['A valid integer is required.']}
+        if pk in seen:
+            return None, {'id': ['Task appears more than once in this batch.']}
+        seen.add(pk)
+        task = targets.get(pk)
+        if task is None:
+            return None, {'id': ['Not found.']}
+        if not IsOwnerOrReadOnly().has_object_permission(request, view, task):
+            return None, {'id': ['You do not have permission to perform this action.']}
+        return task, None
+    
+    def _check_references(self, items, errors):
+        """Validate assignee, category and tag ids for the whole batch, one query per kind."""
+        user = self.context['request'].user
+        references = [
+            ('assigned_to_id', User.objects.all()),
+            ('category_ids', Category.objects.filter(created_by=user)),
+            ('tag_ids', Tag.objects.filter(created_by=user)),
+        ]
+        for field, queryset in references:
+            requested = {(key, index): self._as_ids(data.get(field)) for key, index, data in items}
+            wanted = set().union(*requested.values())
+            if not wanted:
+                continue
+            known = set(queryset.filter(pk__in=wanted).values_list('pk', flat=True))
+            for (key, index), ids in requested.items():
+                missing = sorted(ids - known)
+                if missing:
+                    errors[key][index][field] = [f'Invalid ids: {missing}']
+    
+    @staticmethod
+    def _as_ids(value):
+        if value is None:
+            return set()
+        return set(value) if isinstance(value, list) else {value}
+    
+    @transaction.atomic
+    def save(self):
+        user = self.context['request'].user
+        data = self.validated_data
+        
+        created = []
+        for validated in data['create']:
+            validated = dict(validated)
+            validated.pop('category_ids', None)
+            validated.pop('tag_ids', None)
+            task = Task(owner=user, **validated)
+            task.sync_completed_at()
+            created.append(task)
+        Task.objects.bulk_create(created)
+        
+        now = timezone.now()
+        update_fields = {'updated_at', 'completed_at', 'assigned_at'}
+        for task, validated in data['update']:
+            for attr, value in validated.items():
+                if attr not in ('category_ids', 'tag_ids'):
+                    setattr(task, attr, value)
+                    update_fields.add(attr)
+            task.updated_at = now
+            task.sync_completed_at()
+            task.sync_assigned_at()
+        updated = [task for task, _ in data['update']]
+        if updated:
+            Task.objects.bulk_update(updated, sorted(update_fields))
+        
+        for field, model in (('category_ids', TaskCategory), ('tag_ids', TaskTag)):
+            model.objects.sync({
+                task: validated[field]
+                for task, validated in zip(created, data['create'])
+                if validated.get(field)
+            }, new=True)
+            model.objects.sync({
+                task: validated[field]
+                for task, validated in data['update']
+                if validated.get(field) is not None
+            })
+        
+        # bulk_create/bulk_update send no model signals
+        invalidate_tasks(created + updated)
+        Tombstone.objects.record_lost_assignments(updated)
+        track_saved(created, created=True)
+        track_saved(updated)
+        
+        deleted = [task.pk for task in data['delete']]
+        if deleted:
+            with Tombstone.objects.batch():
+                Task.objects.filter(pk__in=deleted).delete()
+        
+        return {'created': created, 'updated': updated, 'deleted': deleted}
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from task_management_api.renditions import current_renditions, is_image, submit
+from .cache import invalidate_tasks, invalidate_users
+from .models import Task, Category, Tag, TaskCategory, TaskTag, Attachment, Tombstone, task_links_changed
+from .stats import rollups_enabled, task_state, track_saved, update_rollups
+from .storage import render_attachment
+
+
+@receiver(post_init, sender=Task)
+def remember_assignee(sender, instance, **kwargs):
+    """Keep the loaded assignee so a reassignment also reaches the previous one."""
+    instance._loaded_assigned_to_id = instance.assigned_to_id
+
+
+@receiver(post_init, sender=Task)
+def remember_stats_state(sender, instance, **kwargs):
+    """Keep the loaded state so a save can move the stats rollups by the difference."""
+    if rollups_enabled() and not instance.get_deferred_fields():
+        instance._loaded_stats_state = task_state(instance)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    invalidate_tasks([instance])
+    # A previous assignee loses sight of the task; their feed needs a tombstone
+    Tombstone.objects.record_lost_assignments([instance])
+    instance._loaded_assigned_to_id = instance.assigned_to_id
+    track_saved([instance], created=created)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    invalidate_tasks([instance])
+    Tombstone.objects.record('task', instance.pk, [instance.owner_id, instance.assigned_to_id])
+    update_rollups([(getattr(instance, '_loaded_stats_state', task_state(instance)), None)])
+
+
+@receiver(task_links_changed)
+def task_links_synced(sender, tasks, **kwargs):
+    invalidate_tasks(tasks)
+
+
+@receiver(post_save, sender=TaskCategory)
+@receiver(post_save, sender=TaskTag)
+def task_link_saved(sender, instance, **kwargs):
+    invalidate_tasks([instance.task])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def link_target_deleted(sender, instance, **kwargs):
+    """
+    Deleting a category or tag unlinks it from every task that used it,
+    which changes those tasks: move their updated_at for ETags and the
+    changes feed, and drop their users' cached lists.
+    """
+    rows = instance.tasks.values_list('owner_id', 'assigned_to_id')
+    invalidate_users({user_id for row in rows for user_id in row})
+    instance.tasks.touch()
+
+
+@receiver(post_save, sender=Attachment)
+def attachment_saved(sender, instance, **kwargs):
+    if is_image(instance.filename) and not current_renditions(instance.file, instance.renditions):
+        submit(render_attachment, instance.pk, instance.task_id, instance.file.name)
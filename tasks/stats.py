@@ -0,0 +1,188 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Task, TaskStatsRollup, TaskCompletionRollup
+
+# Completion throughput windows, in days ending today
+THROUGHPUT_WINDOWS = (7, 30)
+
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+
+
+def rollups_enabled():
+    return getattr(settings, 'TASK_STATS_ROLLUP', False)
+
+
+def window_starts(now):
+    """Local midnight opening each throughput window, so today counts as a full day."""
+    today = timezone.localdate(now)
+    return {
+        days: timezone.make_aware(datetime.combine(today - timedelta(days=days - 1), time.min))
+        for days in THROUGHPUT_WINDOWS
+    }
+
+
+def live_stats(queryset, now=None):
+    """Every dashboard figure for ``queryset`` from a single aggregate query."""
+    now = now or timezone.now()
+    is_open = ~Q(status='completed')
+    aggregates = {'total': Count('pk'), 'overdue': Count('pk', filter=is_open & Q(due_date__lt=now))}
+    for value in STATUSES:
+        aggregates[f'status:{value}'] = Count('pk', filter=Q(status=value))
+    for value in PRIORITIES:
+        aggregates[f'priority:{value}'] = Count('pk', filter=Q(priority=value))
+        aggregates[f'open:{value}'] = Count('pk', filter=is_open & Q(priority=value))
+    for days, start in window_starts(now).items():
+        aggregates[f'completed:{days}'] = Count('pk', filter=Q(status='completed', completed_at__gte=start))
+
+    row = queryset.order_by().aggregate(**aggregates)
+    return {
+        'total': row['total'],
+        'by_status': {value: row[f'status:{value}'] for value in STATUSES},
+        'by_priority': {value: row[f'priority:{value}'] for value in PRIORITIES},
+        'open_by_priority': {value: row[f'open:{value}'] for value in PRIORITIES},
+        'overdue': row['overdue'],
+        'completed': {f'last_{days}_days': row[f'completed:{days}'] for days in THROUGHPUT_WINDOWS},
+    }
+
+
+def rollup_stats(user, now=None):
+    """
+    The same figures for every task visible to ``user``, read from the
+    rollup tables: at most nine count rows and one row per recent day.
+    Overdue moves with the clock rather than with writes, so it stays a
+    live count on the due_date index.
+    """
+    now = now or timezone.now()
+    starts = window_starts(now)
+    by_status = dict.fromkeys(STATUSES, 0)
+    by_priority = dict.fromkeys(PRIORITIES, 0)
+    open_by_priority = dict.fromkeys(PRIORITIES, 0)
+    for status, priority, count in TaskStatsRollup.objects.filter(user=user).values_list('status', 'priority', 'count'):
+        by_status[status] += count
+        by_priority[priority] += count
+        if status != 'completed':
+            open_by_priority[priority] += count
+
+    earliest = min(starts.values()).date()
+    days = TaskCompletionRollup.objects.filter(user=user, day__gte=earliest).values_list('day', 'count')
+    completed = dict.fromkeys(THROUGHPUT_WINDOWS, 0)
+    for day, count in days:
+        for window, start in starts.items():
+            if day >= start.date():
+                completed[window] += count
+
+    overdue = Task.objects.visible_to(user).filter(due_date__lt=now).exclude(status='completed').count()
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'by_priority': by_priority,
+        'open_by_priority': open_by_priority,
+        'overdue': overdue,
+        'completed': {f'last_{days}_days': completed[days] for days in THROUGHPUT_WINDOWS},
+    }
+
+
+def task_state(task):
+    """The fields of a task the rollups depend on, or None when it isn't saved yet."""
+    if task.pk is None:
+        return None
+    return (task.owner_id, task.assigned_to_id, task.status, task.priority, task.completed_at)
+
+
+def rollup_keys(state):
+    """The rollup rows a task in ``state`` counts towards, once per visible user."""
+    if state is None:
+        return []
+    owner_id, assigned_to_id, status, priority, completed_at = state
+    keys = []
+    for user_id in {owner_id, assigned_to_id} - {None}:
+        keys.append((TaskStatsRollup, user_id, (('status', status), ('priority', priority))))
+        if status == 'completed' and completed_at is not None:
+            keys.append((TaskCompletionRollup, user_id, (('day', timezone.localdate(completed_at)),)))
+    return keys
+
+
+def update_rollups(changes):
+    """
+    Apply ``changes``, an iterable of (old state, new state) pairs, to the
+    rollups with one UPDATE per affected row; rows are created on demand.
+    Decrements never create rows, so deleting a user (and their rollups)
+    can't resurrect them.
+    """
+    if not rollups_enabled():
+        return
+    delta = Counter()
+    for old, new in changes:
+        delta.update(rollup_keys(new))
+        delta.subtract(rollup_keys(old))
+
+    # A fixed order keeps concurrent writers from deadlocking on each other's rows
+    for (model, user_id, lookup), change in sorted(delta.items(), key=str):
+        if not change:
+            continue
+        rows = model.objects.filter(user_id=user_id, **dict(lookup))
+        if rows.update(count=F('count') + change) or change < 0:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(user_id=user_id, count=change, **dict(lookup))
+        except IntegrityError:
+            # A concurrent writer created the row first
+            rows.update(count=F('count') + change)
+
+
+def track_saved(tasks, created=False):
+    """
+    Move the rollups for tasks that were just written, from the state each
+    was loaded with. Tasks loaded without one (deferred fields, or before
+    the rollups were turned on) are skipped; rebuild_rollups() fixes them.
+    """
+    if not rollups_enabled():
+        return
+    changes = []
+    for task in tasks:
+        new = task_state(task)
+        if created:
+            changes.append((None, new))
+        elif hasattr(task, '_loaded_stats_state'):
+            changes.append((task._loaded_stats_state, new))
+        task._loaded_stats_state = new
+    update_rollups(changes)
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Recount every rollup from the tasks table, e.g. after turning TASK_STATS_ROLLUP on."""
+    TaskStatsRollup.objects.all().delete()
+    TaskCompletionRollup.objects.all().delete()
+
+    # Owners, plus assignees who don't own the task: each visible task counts once
+    owned = Task.objects.order_by()
+    assigned = Task.objects.order_by().filter(assigned_to__isnull=False).exclude(assigned_to=F('owner'))
+    counts, completions = Counter(), Counter()
+    for user_field, queryset in (('owner_id', owned), ('assigned_to_id', assigned)):
+        for row in queryset.values(user_field, 'status', 'priority').annotate(n=Count('pk')):
+            counts[row[user_field], row['status'], row['priority']] += row['n']
+        days = (
+            queryset.filter(status='completed', completed_at__isnull=False)
+            .values(user_field, day=TruncDate('completed_at')).annotate(n=Count('pk'))
+        )
+        for row in days:
+            completions[row[user_field], row['day']] += row['n']
+
+    TaskStatsRollup.objects.bulk_create([
+        TaskStatsRollup(user_id=user_id, status=status, priority=priority, count=count)
+        for (user_id, status, priority), count in counts.items()
+    ])
+    TaskCompletionRollup.objects.bulk_create([
+        TaskCompletionRollup(user_id=user_id, day=day, count=count)
+        for (user_id, day), count in completions.items()
+    ])
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.utils import timezone
+
+from task_management_api.renditions import render
+from .models import Task, Attachment
+
+# Image attachments get a thumbnail scaled to fit inside this box
+ATTACHMENT_RENDITIONS = {
+    'thumb': (320, 320),
+}
+
+
+def content_name(digest):
+    """Storage name for bytes with SHA-256 ``digest``, fanned out over two directory levels."""
+    return f'task_attachments/sha256/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def store_content(file):
+    """
+    Save ``file`` in the attachment storage under the SHA-256 of its
+    bytes, unless the same bytes are stored already. Returns the storage
+    name, the hex digest and the size counted while hashing.
+
+    Attachments never delete their file, so rows on different tasks can
+    safely share one.
+    """
+    storage = Attachment._meta.get_field('file').storage
+    digest, size = hashlib.sha256(), 0
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    digest = digest.hexdigest()
+
+    name = content_name(digest)
+    if not storage.exists(name):
+        # A concurrent upload of the same bytes may win the name; the
+        # storage then picks a free one and the copies just don't share
+        name = storage.save(name, file)
+    return name, digest, size
+
+
+def render_attachment(attachment_id, task_id, name):
+    storage = Attachment._meta.get_field('file').storage
+    renditions = render(storage, name, ATTACHMENT_RENDITIONS)
+    # Skipped when the file was replaced while this one was rendering
+    if Attachment.objects.filter(pk=attachment_id, file=name).update(renditions=renditions, updated_at=timezone.now()):
+        # The task's representation now includes the thumbnail URL
+        Task.objects.filter(pk=task_id).touch()
@@ -0,0 +1,88 @@
+import base64
+import binascii
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Task, Comment, Attachment, Tombstone
+from .serializers import TaskSyncSerializer, CommentSerializer, AttachmentSerializer
+
+
+class SyncTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Sync token has expired. Fetch the full task list and start over.'
+    default_code = 'sync_token_expired'
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'TASK_SYNC_TOMBSTONE_DAYS', 30))
+
+
+def encode_sync_token(moment):
+    return base64.urlsafe_b64encode(f'v1:{moment.isoformat()}'.encode()).decode()
+
+
+def decode_sync_token(token):
+    """Validate an opaque ``since`` token; 410 once its tombstones may be pruned."""
+    try:
+        version, _, value = base64.urlsafe_b64decode(token.encode()).decode().partition(':')
+        moment = parse_datetime(value) if version == 'v1' else None
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        moment = None
+    if moment is None:
+        raise ValidationError({'since': ['Invalid sync token.']})
+    if moment < timezone.now() - tombstone_retention():
+        raise SyncTokenExpired()
+    return moment
+
+
+def collect_changes(user, since=None):
+    """
+    Everything visible to ``user`` that changed after ``since``, plus
+    tombstones for what they lost. Each part is a range scan on an
+    updated_at/deleted_at index, so the cost follows the size of the
+    change. Tasks assigned to ``user`` after ``since`` bring all their
+    comments and attachments, which the client has never seen. Without
+    ``since`` this is a full snapshot.
+    
+    The returned token starts a little before now: rows written by
+    transactions still in flight show up again next time instead of
+    being missed, so clients must apply changes idempotently.
+    """
+    overlap = timedelta(seconds=getattr(settings, 'TASK_SYNC_OVERLAP_SECONDS', 5))
+    token = encode_sync_token(timezone.now() - overlap)
+    
+    visible = Task.objects.visible_to(user)
+    tasks = visible
+    comments = Comment.objects.filter(task__in=visible)
+    attachments = Attachment.objects.filter(task__in=visible)
+    deleted = {'tasks': [], 'comments': [], 'attachments': []}
+    
+    if since is not None:
+        tasks = tasks.filter(updated_at__gt=since)
+        gained = visible.filter(assigned_to=user, assigned_at__gt=since).exclude(owner=user)
+        comments = comments.filter(Q(updated_at__gt=since) | Q(task__in=gained))
+        attachments = attachments.filter(Q(updated_at__gt=since) | Q(task__in=gained))
+    tasks = list(TaskSyncSerializer.setup_eager_loading(tasks))
+    
+    if since is not None:
+        # A task can be tombstoned and then become visible again
+        live = {task.pk for task in tasks}
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=since)
+        for kind, object_id in tombstones.values_list('kind', 'object_id'):
+            if kind == 'task' and object_id in live:
+                continue
+            deleted[f'{kind}s'].append(object_id)
+    
+    return {
+        'token': token,
+        'tasks': tasks,
+        'comments': CommentSerializer.setup_eager_loading(comments),
+        'attachments': AttachmentSerializer.setup_eager_loading(attachments),
+        'deleted': {kind: sorted(set(ids)) for kind, ids in deleted.items()},
+    }
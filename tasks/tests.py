@@ -1,8 +1,39 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from PIL import Image
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Task, Category
+from rest_framework.exceptions import ErrorDetail, ParseError, ValidationError
+from rest_framework.renderers import JSONRenderer
+from task_management_api.metrics import DB_QUERIES, REQUEST_DURATION, SERIALIZER_DURATION, clear_metrics
+from task_management_api.renderers import FastJSONParser, FastJSONRenderer
+from task_management_api.throttling import LocalBucketStore, get_bucket_store
+from .models import Task, TaskQuerySet, Category, Tag, TaskCategory, TaskTag, Comment, Attachment, AttachmentUpload
+from .counters import reconcile_counters
+from .imports import TaskImporter
+from .serializers import TaskSerializer
+from .uploads import UploadOffsetMismatch, write_part, staging_path, prune_uploads
 
 User = get_user_model()
 
@@ -62,3 +93,1823 @@ class TaskAPITests(TestCase):
         
         response = self.client.get('/api/tasks/?status=todo')
         self.assertEqual(len(response.data['results']), 1)
+
+
+class TaskQueryCountTests(TestCase):
+    """Every TaskViewSet action should cost a constant number of queries"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.categories = [
+            Category.objects.create(name=f'Category {i}', created_by=self.user)
+            for i in range(3)
+        ]
+        self.tags = [
+            Tag.objects.create(name=f'Tag {i}', created_by=self.user)
+            for i in range(3)
+        ]
+        for i in range(5):
+            self.create_task(f'Task {i}')
+        self.task = Task.objects.filter(owner=self.user).first()
+    
+    def create_task(self, title, owner=None, assigned_to=None):
+        task = Task.objects.create(
+            owner=owner or self.user,
+            assigned_to=assigned_to or self.other,
+            title=title
+        )
+        for category in self.categories:
+            TaskCategory.objects.create(task=task, category=category)
+        for tag in self.tags:
+            TaskTag.objects.create(task=task, tag=tag)
+        for i in range(3):
+            Comment.objects.create(task=task, author=self.other, content=f'Comment {i}')
+            Attachment.objects.create(
+                task=task,
+                file=f'task_attachments/file{i}.txt',
+                filename=f'file{i}.txt',
+                file_size=10,
+                uploaded_by=self.other
+            )
+        return task
+    
+    def test_list(self):
+        """List costs ETag aggregate + count + page regardless of page contents"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['assigned_to'], 'otheruser')
+    
+    def test_retrieve(self):
+        """Detail reads the ETag, then the task plus one query per nested relation"""
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(len(response.data['categories']), 3)
+        self.assertEqual(len(response.data['tags']), 3)
+        self.assertEqual(len(response.data['comments']), 3)
+        self.assertEqual(len(response.data['attachments']), 3)
+        self.assertEqual(response.data['comments'][0]['author']['username'], 'otheruser')
+    
+    def test_create(self):
+        data = {
+            'title': 'New Task',
+            'category_ids': [c.id for c in self.categories],
+            'tag_ids': [t.id for t in self.tags],
+        }
+        with self.assertNumQueries(12):
+            response = self.client.post('/api/tasks/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['categories']), 3)
+        self.assertEqual(len(response.data['tags']), 3)
+    
+    def test_update(self):
+        data = {
+            'title': 'Updated',
+            'category_ids': [c.id for c in self.categories],
+            'tag_ids': [t.id for t in self.tags],
+        }
+        # Includes the savepoint pair of the atomic block that checks If-Match
+        with self.assertNumQueries(21):
+            response = self.client.put(f'/api/tasks/{self.task.id}/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['tags']), 3)
+    
+    def test_partial_update(self):
+        with self.assertNumQueries(17):
+            response = self.client.patch(f'/api/tasks/{self.task.id}/', {'title': 'Patched'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['comments']), 3)
+    
+    def test_sparse_fields(self):
+        """Relations left out of ?fields= are neither loaded nor rendered"""
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/tasks/{self.task.id}/?fields=id,title,owner')
+        self.assertEqual(set(response.data), {'id', 'title', 'owner'})
+        self.assertEqual(response.data['owner']['username'], 'testuser')
+        
+        response = self.client.get(f'/api/tasks/{self.task.id}/?fields=id,owner.username,comments.content')
+        self.assertEqual(response.data['owner'], {'username': 'testuser'})
+        self.assertEqual(set(response.data['comments'][0]), {'content'})
+    
+    def test_expand(self):
+        """Relations not named in ?expand= render as ids, without joins"""
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/tasks/{self.task.id}/?expand=comments')
+        self.assertEqual(response.data['owner'], self.user.id)
+        self.assertEqual(response.data['categories'], [c.id for c in self.categories])
+        self.assertEqual(response.data['comments'][0]['author'], self.other.id)
+        
+        response = self.client.get(f'/api/tasks/{self.task.id}/?expand=comments.author&fields=comments')
+        self.assertEqual(response.data['comments'][0]['author']['username'], 'otheruser')
+    
+    def test_list_with_fields(self):
+        """A list with ?fields= picks from the detailed representation"""
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/tasks/?fields=id,description,tags.name')
+        self.assertEqual(response.data['results'][0]['tags'][0], {'name': 'Tag 0'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'description', 'tags'})
+    
+    def test_fields_only_shape_output(self):
+        response = self.client.patch(f'/api/tasks/{self.task.id}/?fields=id', {'title': 'Patched'})
+        self.assertEqual(response.data, {'id': self.task.id})
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Patched')
+    
+    def test_destroy(self):
+        with self.assertNumQueries(8):
+            response = self.client.delete(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+    
+    def test_complete(self):
+        with self.assertNumQueries(6):
+            response = self.client.post(f'/api/tasks/{self.task.id}/complete/')
+        self.assertEqual(response.data['status'], 'completed')
+    
+    def test_assign(self):
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                f'/api/tasks/{self.task.id}/assign/',
+                {'user_id': self.user.id}
+            )
+        self.assertEqual(response.data['assigned_to']['username'], 'testuser')
+    
+    def test_my_tasks(self):
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/tasks/my_tasks/')
+        self.assertEqual(len(response.data['results']), 5)
+    
+    def test_assigned_to_me(self):
+        self.create_task('Assigned', owner=self.other, assigned_to=self.user)
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/tasks/assigned_to_me/')
+        self.assertEqual(len(response.data['results']), 1)
+    
+    def test_query_count_does_not_grow_with_rows(self):
+        """Doubling the data should not change the cost of a page"""
+        for i in range(5):
+            self.create_task(f'Extra {i}')
+        with self.assertNumQueries(7):
+            self.client.get('/api/tasks/my_tasks/')
+
+
+class TaskLinkSyncTests(TestCase):
+    """category_ids/tag_ids writes only touch the links that change"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tags = [Tag.objects.create(name=f'Tag {i}', created_by=self.user) for i in range(4)]
+        self.task = Task.objects.create(owner=self.user, title='Linked')
+        TaskTag.objects.sync({self.task: [t.id for t in self.tags[:2]]}, new=True)
+    
+    def test_unchanged_ids_write_nothing(self):
+        links = set(TaskTag.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            TaskTag.objects.sync({self.task: [t.id for t in self.tags[:2]]})
+        self.assertEqual(set(TaskTag.objects.values_list('id', flat=True)), links)
+    
+    def test_diff_applies_one_delete_and_one_insert(self):
+        """Read, delete, insert, and one touch of the task's updated_at"""
+        kept = TaskTag.objects.get(task=self.task, tag=self.tags[1])
+        with self.assertNumQueries(4):
+            TaskTag.objects.sync({self.task: [self.tags[1].id, self.tags[2].id, self.tags[3].id]})
+        self.assertEqual(
+            set(self.task.tags.values_list('id', flat=True)),
+            {self.tags[1].id, self.tags[2].id, self.tags[3].id}
+        )
+        # The surviving link row is left untouched
+        self.assertTrue(TaskTag.objects.filter(pk=kept.pk).exists())
+    
+    def test_update_through_api(self):
+        response = self.client.patch(
+            f'/api/tasks/{self.task.id}/',
+            {'tag_ids': [self.tags[3].id, self.tags[3].id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['id'] for tag in response.data['tags']], [self.tags[3].id])
+    
+    def test_rejects_ids_the_user_does_not_own(self):
+        foreign = Tag.objects.create(name='Foreign', created_by=self.other)
+        response = self.client.post(
+            '/api/tasks/',
+            {'title': 'New', 'tag_ids': [self.tags[0].id, foreign.id]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_ids', response.data)
+
+
+class TaskVisibilityTests(TestCase):
+    """Owned and assigned tasks are visible exactly once, under every strategy"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.owned = Task.objects.create(owner=self.user, title='Owned report', status='todo')
+        self.both = Task.objects.create(owner=self.user, assigned_to=self.user, title='Self assigned', status='completed')
+        self.assigned = Task.objects.create(owner=self.other, assigned_to=self.user, title='Assigned report', status='todo')
+        self.hidden = Task.objects.create(owner=self.other, title='Hidden report', status='todo')
+    
+    def test_strategies_agree(self):
+        expected = {self.owned.id, self.both.id, self.assigned.id}
+        for strategy in TaskQuerySet.VISIBILITY_STRATEGIES:
+            ids = list(Task.objects.visible_to(self.user, strategy=strategy).values_list('id', flat=True))
+            self.assertEqual(len(ids), len(expected), strategy)
+            self.assertEqual(set(ids), expected, strategy)
+    
+    def test_no_distinct_in_sql(self):
+        for strategy in TaskQuerySet.VISIBILITY_STRATEGIES:
+            sql = str(Task.objects.visible_to(self.user, strategy=strategy).query)
+            self.assertNotIn('DISTINCT', sql)
+    
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            Task.objects.visible_to(self.user, strategy='nested-loop')
+    
+    def test_filter_search_and_ordering(self):
+        for strategy in TaskQuerySet.VISIBILITY_STRATEGIES:
+            with self.settings(TASK_VISIBILITY_STRATEGY=strategy):
+                response = self.client.get('/api/tasks/?status=todo&search=report&ordering=created_at')
+                titles = [task['title'] for task in response.data['results']]
+                self.assertEqual(titles, ['Owned report', 'Assigned report'], strategy)
+                self.assertEqual(response.data['count'], 2)
+
+
+class TaskPaginationTests(TestCase):
+    """Keyset pages and the count modes of TaskPagination"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        for i in range(25):
+            Task.objects.create(owner=self.user, title=f'Task {i}')
+        # Ties on created_at and nulls in due_date exercise the id tie-breaker
+        tied = timezone.now()
+        Task.objects.filter(id__lte=12).update(created_at=tied)
+        Task.objects.filter(id__gt=20).update(due_date=tied)
+    
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        return ids
+    
+    def test_cursor_visits_every_task_once(self):
+        for ordering in ['-created_at', 'created_at', 'due_date', '-due_date', 'priority']:
+            ids = self.walk(f'/api/tasks/?pagination=cursor&ordering={ordering}')
+            self.assertEqual(len(ids), 25, ordering)
+            self.assertEqual(len(set(ids)), 25, ordering)
+    
+    def test_cursor_puts_nulls_last(self):
+        ids = self.walk('/api/tasks/?pagination=cursor&ordering=due_date')
+        dated = list(Task.objects.filter(due_date__isnull=False).order_by('id').values_list('id', flat=True))
+        undated = list(Task.objects.filter(due_date__isnull=True).order_by('id').values_list('id', flat=True))
+        self.assertEqual(ids, dated + undated)
+    
+    def test_previous_link(self):
+        first = self.client.get('/api/tasks/?pagination=cursor')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [task['id'] for task in back.data['results']],
+            [task['id'] for task in first.data['results']]
+        )
+    
+    def test_cursor_page_skips_count(self):
+        first = self.client.get('/api/tasks/?pagination=cursor')
+        with self.assertNumQueries(1):
+            self.client.get(first.data['next'])
+    
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # A cursor from another ordering is rejected too
+        cursor_url = self.client.get('/api/tasks/?pagination=cursor').data['next']
+        response = self.client.get(cursor_url + '&ordering=priority')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        # Positions of the wrong type fail the same way, not in the query
+        cursor = parse_qs(urlparse(cursor_url).query)['cursor'][0]
+        payload = json.loads(base64.urlsafe_b64decode(cursor))
+        for position in (['yesterday', payload['p'][1]], [payload['p'][0], 'abc'], [payload['p'][0], {}], 'ab'):
+            forged = base64.urlsafe_b64encode(json.dumps({**payload, 'p': position}).encode()).decode()
+            response = self.client.get('/api/tasks/', {'cursor': forged})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+    
+    def test_count_none(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/?count=none&page=3')
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+    
+    def test_count_estimate_falls_back_to_exact(self):
+        response = self.client.get('/api/tasks/?count=estimate')
+        self.assertEqual(response.data['count'], 25)
+        self.assertIsNotNone(response.data['next'])
+    
+    def test_comment_cursor(self):
+        task = Task.objects.first()
+        for i in range(15):
+            Comment.objects.create(task=task, author=self.user, content=f'Comment {i}')
+        ids = self.walk(f'/api/comments/?task_id={task.id}&pagination=cursor')
+        self.assertEqual(len(set(ids)), 15)
+
+
+class TaskBulkTests(TestCase):
+    """POST /api/tasks/bulk/ writes set-based and reports errors per item"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Work', created_by=self.user)
+        self.tag = Tag.objects.create(name='urgent', created_by=self.user)
+    
+    def test_bulk_create_is_constant_in_queries(self):
+        data = {'create': [
+            {'title': f'Task {i}', 'category_ids': [self.category.id], 'tag_ids': [self.tag.id]}
+            for i in range(50)
+        ]}
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['created']), 50)
+        self.assertEqual(TaskCategory.objects.count(), 50)
+        self.assertEqual(TaskTag.objects.count(), 50)
+    
+    def test_mixed_operations(self):
+        keep = Task.objects.create(owner=self.user, title='Keep')
+        remove = Task.objects.create(owner=self.user, title='Remove')
+        data = {
+            'create': [{'title': 'Done already', 'status': 'completed'}],
+            'update': [{'id': keep.id, 'title': 'Kept', 'tag_ids': [self.tag.id]}],
+            'delete': [remove.id],
+        }
+        response = self.client.post('/api/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], [remove.id])
+        self.assertEqual(response.data['updated'][0]['title'], 'Kept')
+        
+        created = Task.objects.get(title='Done already')
+        self.assertIsNotNone(created.completed_at)
+        keep.refresh_from_db()
+        self.assertEqual(keep.title, 'Kept')
+        self.assertEqual(list(keep.tags.all()), [self.tag])
+        self.assertFalse(Task.objects.filter(id=remove.id).exists())
+    
+    def test_errors_are_per_item_and_nothing_is_written(self):
+        mine = Task.objects.create(owner=self.user, title='Mine')
+        assigned = Task.objects.create(owner=self.other, assigned_to=self.user, title='Not mine')
+        data = {
+            'create': [{'title': 'Fine'}, {'description': 'no title'}],
+            'update': [
+                {'id': mine.id, 'title': 'Renamed', 'category_ids': [999]},
+                {'id': assigned.id, 'title': 'Hijacked'},
+            ],
+            'delete': [mine.id, 12345],
+        }
+        response = self.client.post('/api/tasks/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        errors = response.data
+        self.assertEqual(errors['create'][0], {})
+        self.assertIn('title', errors['create'][1])
+        self.assertIn('category_ids', errors['update'][0])
+        self.assertIn('id', errors['update'][1])
+        self.assertIn('id', errors['delete'][0])  # duplicate of an update
+        self.assertIn('id', errors['delete'][1])
+        
+        self.assertEqual(Task.objects.count(), 2)
+        mine.refresh_from_db()
+        self.assertEqual(mine.title, 'Mine')
+    
+    def test_batch_size_limit(self):
+        with self.settings(TASK_BULK_MAX_ITEMS=2):
+            response = self.client.post(
+                '/api/tasks/bulk/',
+                {'create': [{'title': 'a'}, {'title': 'b'}, {'title': 'c'}]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FakeRedis:
+    """Local stand-in for the subset of redis-py that RedisBackend uses"""
+    
+    def __init__(self):
+        self.store = {}
+    
+    def get(self, name):
+        return self.store.get(name)
+    
+    def set(self, name, value, ex=None):
+        self.store[name] = value.encode() if isinstance(value, str) else value
+    
+    def incr(self, name):
+        self.store[name] = int(self.store.get(name, 0)) + 1
+        return self.store[name]
+
+
+LOCAL_LIST_CACHE = {'BACKEND': 'tasks.cache.LocalMemoryBackend', 'TIMEOUT': 60, 'OPTIONS': {}}
+
+
+class TaskListCacheTests(TestCase):
+    """Cached task lists are evicted only for the users a write affects"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(user=self.other)
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Cached')
+    
+    def test_hit_skips_list_queries(self):
+        with self.settings(TASK_LIST_CACHE=LOCAL_LIST_CACHE):
+            self.assertEqual(self.client.get('/api/tasks/?status=todo')['X-Cache'], 'MISS')
+            # The ETag comes from the cache key, so a hit runs no queries
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/tasks/?status=todo')
+            self.assertEqual(response['X-Cache'], 'HIT')
+            self.assertEqual(response.data['count'], 1)
+            # Different params are a different entry
+            self.assertEqual(self.client.get('/api/tasks/?status=completed')['X-Cache'], 'MISS')
+    
+    def test_write_evicts_only_affected_users(self):
+        with self.settings(TASK_LIST_CACHE=LOCAL_LIST_CACHE):
+            self.client.get('/api/tasks/')
+            self.other_client.get('/api/tasks/')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/tasks/', {'title': 'Fresh'})
+            response = self.client.get('/api/tasks/')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(response.data['count'], 2)
+            self.assertEqual(self.other_client.get('/api/tasks/')['X-Cache'], 'HIT')
+    
+    def test_reassignment_evicts_previous_assignee(self):
+        with self.settings(TASK_LIST_CACHE=LOCAL_LIST_CACHE):
+            self.task.assigned_to = self.other
+            self.task.save()
+            self.assertEqual(self.other_client.get('/api/tasks/assigned_to_me/').data['count'], 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/tasks/{self.task.id}/assign/', {'user_id': self.user.id})
+            response = self.other_client.get('/api/tasks/assigned_to_me/')
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(response.data['count'], 0)
+    
+    def test_tag_sync_evicts(self):
+        with self.settings(TASK_LIST_CACHE=LOCAL_LIST_CACHE):
+            tag = Tag.objects.create(name='Tag', created_by=self.user)
+            self.client.get('/api/tasks/')
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskTag.objects.sync({self.task: [tag.id]})
+            self.assertEqual(self.client.get('/api/tasks/')['X-Cache'], 'MISS')
+    
+    def test_lru_limits(self):
+        from .cache import LocalMemoryBackend
+        backend = LocalMemoryBackend(max_entries=2)
+        backend.set('a', [1], 60)
+        backend.set('b', [2], 60)
+        backend.get('a')
+        backend.set('c', [3], 60)
+        self.assertEqual(backend.get('b'), None)
+        self.assertEqual(backend.get('a'), [1])
+        
+        backend = LocalMemoryBackend(max_bytes=10)
+        backend.set('a', 'x' * 5, 60)
+        backend.set('b', 'y' * 5, 60)
+        self.assertEqual(len(backend), 1)
+    
+    def test_redis_backend(self):
+        from .cache import RedisBackend
+        redis = FakeRedis()
+        config = {'BACKEND': 'tasks.cache.RedisBackend', 'TIMEOUT': 60, 'OPTIONS': {'client': redis}}
+        with self.settings(TASK_LIST_CACHE=config):
+            self.client.get('/api/tasks/')
+            self.assertEqual(self.client.get('/api/tasks/')['X-Cache'], 'HIT')
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.create(owner=self.user, title='Another')
+            self.assertEqual(self.client.get('/api/tasks/').data['count'], 2)
+        self.assertEqual(RedisBackend(client=redis).get_generation(self.user.id), 1)
+
+
+class ConditionalRequestTests(TestCase):
+    """ETag/Last-Modified validators derived from Task.updated_at"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Conditional')
+        self.url = f'/api/tasks/{self.task.id}/'
+    
+    def test_detail_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_malformed_pk_is_not_found(self):
+        response = self.client.get('/api/tasks/abc/', HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.patch('/api/tasks/abc/', {'title': 'Nope'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_comment_changes_detail_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post('/api/comments/', {'task': self.task.id, 'content': 'New comment'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['comments']), 1)
+    
+    def test_nested_rows_change_detail_etag(self):
+        category = Category.objects.create(name='Work', created_by=self.user)
+        self.client.patch(self.url, {'category_ids': [category.id]}, format='json')
+        etag = self.client.get(self.url)['ETag']
+        
+        category.name = 'Home'
+        category.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['categories'][0]['name'], 'Home')
+        
+        etag = response['ETag']
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['owner']['first_name'], 'Renamed')
+    
+    def test_deleted_link_changes_detail_etag(self):
+        older = Category.objects.create(name='Older', created_by=self.user)
+        newer = Category.objects.create(name='Newer', created_by=self.user)
+        self.client.patch(self.url, {'category_ids': [older.id, newer.id]}, format='json')
+        etag = self.client.get(self.url)['ETag']
+        
+        older.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([category['name'] for category in response.data['categories']], ['Newer'])
+    
+    def test_field_selection_changes_detail_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(self.url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_if_match_guards_updates(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'title': 'First'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        
+        # A second writer still holding the old version is refused
+        response = self.client.patch(self.url, {'title': 'Second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'First')
+    
+    def test_if_match_checked_under_row_lock(self):
+        original = TaskQuerySet.select_for_update
+        with patch.object(TaskQuerySet, 'select_for_update', autospec=True, side_effect=original) as lock:
+            etag = self.client.get(self.url)['ETag']
+            lock.assert_not_called()
+            response = self.client.patch(self.url, {'title': 'Locked'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # On databases with row locks, a second writer waits here and then fails the check
+        self.assertEqual(lock.call_args.kwargs, {'of': ('self',)})
+    
+    def test_list_not_modified_until_deletion(self):
+        other = Task.objects.create(owner=self.user, title='Other')
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        other.delete()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_nested_rows_change_list_etag(self):
+        category = Category.objects.create(name='Work', created_by=self.user)
+        self.client.patch(self.url, {'category_ids': [category.id]}, format='json')
+        etag = self.client.get('/api/tasks/?expand=categories')['ETag']
+        self.assertNotEqual(self.client.get('/api/tasks/')['ETag'], etag)
+        
+        category.name = 'Home'
+        category.save()
+        response = self.client.get('/api/tasks/?expand=categories', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['categories'][0]['name'], 'Home')
+    
+    def test_cached_list_etag_skips_queries(self):
+        with self.settings(TASK_LIST_CACHE=LOCAL_LIST_CACHE):
+            etag = self.client.get('/api/tasks/?pagination=cursor')['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/tasks/?pagination=cursor', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/tasks/', {'title': 'Fresh'})
+            response = self.client.get('/api/tasks/?pagination=cursor', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 2)
+
+
+@override_settings(TASK_SYNC_OVERLAP_SECONDS=0)
+class TaskChangesFeedTests(TestCase):
+    """GET /api/tasks/changes/ returns only what changed since a token"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(name='Tag', created_by=self.user)
+        self.stale = Task.objects.create(owner=self.user, title='Stale')
+        self.fresh = Task.objects.create(owner=self.user, title='Fresh')
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+    
+    def changes(self):
+        response = self.client.get('/api/tasks/changes/', {'since': self.token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_snapshot(self):
+        data = self.client.get('/api/tasks/changes/').data
+        self.assertEqual({task['id'] for task in data['tasks']}, {self.stale.id, self.fresh.id})
+        self.assertTrue(data['token'])
+    
+    def test_only_changes_since_token(self):
+        self.client.patch(f'/api/tasks/{self.fresh.id}/', {'tag_ids': [self.tag.id]}, format='json')
+        self.client.post('/api/comments/', {'task': self.fresh.id, 'content': 'Hello'})
+        
+        data = self.changes()
+        self.assertEqual([task['id'] for task in data['tasks']], [self.fresh.id])
+        self.assertEqual(data['tasks'][0]['tag_ids'], [self.tag.id])
+        self.assertEqual([comment['content'] for comment in data['comments']], ['Hello'])
+        self.assertEqual(data['deleted'], {'tasks': [], 'comments': [], 'attachments': []})
+    
+    def test_deletions_leave_tombstones(self):
+        comment = Comment.objects.create(task=self.fresh, author=self.user, content='Bye')
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+        self.client.delete(f'/api/comments/{comment.id}/')
+        self.client.delete(f'/api/tasks/{self.stale.id}/')
+        
+        data = self.changes()
+        self.assertEqual(data['deleted']['tasks'], [self.stale.id])
+        self.assertEqual(data['deleted']['comments'], [comment.id])
+    
+    def test_reassignment_tombstones_previous_assignee(self):
+        task = Task.objects.create(owner=self.other, assigned_to=self.user, title='Shared')
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+        task.assigned_to = self.other
+        task.save()
+        self.assertEqual(self.changes()['deleted']['tasks'], [task.id])
+    
+    def test_new_assignee_gets_earlier_comments_and_attachments(self):
+        task = Task.objects.create(owner=self.other, title='Shared')
+        comment = Comment.objects.create(task=task, author=self.other, content='Before')
+        attachment = Attachment.objects.create(
+            task=task, file='a.txt', filename='a.txt', file_size=1, uploaded_by=self.other
+        )
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+        task.assigned_to = self.user
+        task.save()
+        
+        data = self.changes()
+        self.assertEqual([task['id'] for task in data['tasks']], [task.id])
+        self.assertEqual([comment['id'] for comment in data['comments']], [comment.id])
+        self.assertEqual([attachment['id'] for attachment in data['attachments']], [attachment.id])
+        
+        # Once delivered, only later changes come again
+        self.token = data['token']
+        self.assertEqual(self.changes()['comments'], [])
+    
+    def test_deleted_tag_resends_its_tasks(self):
+        kept = Tag.objects.create(name='Kept', created_by=self.user)
+        self.client.patch(f'/api/tasks/{self.fresh.id}/', {'tag_ids': [self.tag.id, kept.id]}, format='json')
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+        
+        self.tag.delete()
+        data = self.changes()
+        self.assertEqual([task['id'] for task in data['tasks']], [self.fresh.id])
+        self.assertEqual(data['tasks'][0]['tag_ids'], [kept.id])
+    
+    def test_changed_attachments(self):
+        attachment = Attachment.objects.create(
+            task=self.fresh, file='a.txt', filename='a.txt', file_size=1, uploaded_by=self.user
+        )
+        self.token = self.client.get('/api/tasks/changes/').data['token']
+        self.assertEqual(self.changes()['attachments'], [])
+        attachment.renditions = {'thumb': 'a-thumb.jpg'}
+        attachment.save()
+        self.assertEqual([attachment['id'] for attachment in self.changes()['attachments']], [attachment.id])
+    
+    def test_bulk_delete_batches_tombstones(self):
+        response = self.client.post(
+            '/api/tasks/bulk/', {'delete': [self.stale.id, self.fresh.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(self.changes()['deleted']['tasks']), sorted([self.stale.id, self.fresh.id]))
+    
+    def test_bad_and_expired_tokens(self):
+        response = self.client.get('/api/tasks/changes/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(TASK_SYNC_TOMBSTONE_DAYS=0):
+            response = self.client.get('/api/tasks/changes/', {'since': self.token})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class TaskSearchTests(TestCase):
+    """Full-text ?search= through the FTS5 index on SQLite"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.in_title = Task.objects.create(owner=self.user, title='Quarterly report', description='Numbers')
+        self.in_description = Task.objects.create(owner=self.user, title='Finance', description='Draft the quarterly report')
+        self.unrelated = Task.objects.create(owner=self.user, title='Groceries', description='Milk and eggs')
+        self.hidden = Task.objects.create(owner=self.other, title='Secret report')
+        Comment.objects.create(task=self.unrelated, author=self.user, content='Reminder for the report meeting')
+    
+    def search(self, query):
+        response = self.client.get(f'/api/tasks/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [task['id'] for task in response.data['results']]
+    
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('search=report'), [self.in_title.id, self.in_description.id])
+    
+    def test_stems_and_prefixes(self):
+        self.assertEqual(self.search('search=reports'), [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search('search=quart'), [self.in_title.id, self.in_description.id])
+    
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('search=draft report'), [self.in_description.id])
+    
+    def test_explicit_ordering_wins_over_rank(self):
+        self.assertEqual(
+            self.search('search=report&ordering=-created_at'),
+            [self.in_description.id, self.in_title.id]
+        )
+    
+    def test_search_comments(self):
+        self.assertNotIn(self.unrelated.id, self.search('search=meeting'))
+        self.assertEqual(self.search('search=meeting&search_comments=true'), [self.unrelated.id])
+    
+    def test_index_follows_updates(self):
+        self.in_title.title = 'Annual summary'
+        self.in_title.save()
+        self.assertEqual(self.search('search=report'), [self.in_description.id])
+        self.assertEqual(self.search('search=annual'), [self.in_title.id])
+    
+    def test_syntax_in_terms_is_literal(self):
+        self.assertEqual(self.search('search=report"%20OR%20NOT'), [])
+    
+    def test_cursor_pages_ignore_rank(self):
+        response = self.client.get('/api/tasks/?search=report&pagination=cursor')
+        self.assertEqual(
+            [task['id'] for task in response.data['results']],
+            [self.in_description.id, self.in_title.id]
+        )
+
+
+class AsyncViewTests(TestCase):
+    """The coroutine views under /api/async/ match their sync counterparts"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        for i in range(12):
+            Task.objects.create(owner=self.user, title=f'Task {i}', status='todo' if i % 2 else 'completed')
+        self.assigned = Task.objects.create(owner=self.other, assigned_to=self.user, title='Assigned')
+        self.hidden = Task.objects.create(owner=self.other, title='Hidden')
+    
+    def test_list_matches_sync_list(self):
+        for query in ['', '?page=2', '?status=todo&ordering=created_at']:
+            sync = self.client.get(f'/api/tasks/{query}')
+            response = self.client.get(f'/api/async/tasks/{query}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], sync.data['count'])
+            self.assertEqual(response.data['results'], sync.data['results'])
+            self.assertEqual(response.data['next'] is None, sync.data['next'] is None)
+    
+    def test_scopes(self):
+        response = self.client.get('/api/async/tasks/mine/')
+        self.assertEqual(response.data['count'], 12)
+        response = self.client.get('/api/async/tasks/assigned/')
+        self.assertEqual([task['id'] for task in response.data['results']], [self.assigned.id])
+    
+    def test_invalid_page(self):
+        response = self.client.get('/api/async/tasks/?page=9')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_detail(self):
+        response = self.client.get(f'/api/async/tasks/{self.assigned.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.client.get(f'/api/tasks/{self.assigned.id}/').data)
+        response = self.client.get(f'/api/async/tasks/{self.hidden.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_comments(self):
+        response = self.client.post('/api/async/comments/', {'task': self.assigned.id, 'content': 'On it'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(f'/api/async/comments/?task_id={self.assigned.id}')
+        self.assertEqual([comment['content'] for comment in response.data['results']], ['On it'])
+    
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/async/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    async def test_served_through_asgi(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await self.async_client.get(
+            '/api/async/tasks/', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 13)
+
+
+class TaskStatsTests(TestCase):
+    """The stats action, live and from the rollups"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.now = timezone.now()
+        
+        Task.objects.create(owner=self.user, title='Open', priority='high')
+        Task.objects.create(owner=self.user, title='Late', priority='high', due_date=self.now - timezone.timedelta(days=1))
+        Task.objects.create(owner=self.user, title='Done', status='completed', priority='low')
+        Task.objects.create(owner=self.other, assigned_to=self.user, title='Assigned', status='in_progress')
+        Task.objects.create(owner=self.other, title='Hidden', status='completed')
+        old = Task.objects.create(owner=self.user, title='Done long ago', status='completed')
+        Task.objects.filter(pk=old.pk).update(completed_at=self.now - timezone.timedelta(days=20))
+    
+    expected = {
+        'total': 5,
+        'by_status': {'todo': 2, 'in_progress': 1, 'completed': 2},
+        'by_priority': {'low': 1, 'medium': 2, 'high': 2},
+        'open_by_priority': {'low': 0, 'medium': 1, 'high': 2},
+        'overdue': 1,
+        'completed': {'last_7_days': 1, 'last_30_days': 2},
+    }
+    
+    def test_live_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.data, self.expected)
+    
+    def test_live_stats_follow_filters(self):
+        response = self.client.get('/api/tasks/stats/?priority=high')
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['overdue'], 1)
+    
+    @override_settings(TASK_STATS_ROLLUP=True)
+    def test_rollups_match_live_stats(self):
+        call_command('rebuild_task_stats', stdout=StringIO())
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/tasks/stats/')
+        self.assertEqual(response.data, self.expected)
+    
+    @override_settings(TASK_STATS_ROLLUP=True)
+    def test_rollups_follow_writes(self):
+        call_command('rebuild_task_stats', stdout=StringIO())
+        task = Task.objects.get(title='Open')
+        task.status = 'completed'
+        task.save()
+        Task.objects.get(title='Assigned').delete()
+        Task.objects.create(owner=self.other, assigned_to=self.user, title='New', priority='low')
+        self.client.post('/api/tasks/bulk/', {
+            'create': [{'title': 'Bulk', 'status': 'completed'}],
+            'update': [{'id': Task.objects.get(title='Late').pk, 'priority': 'low'}],
+        }, format='json')
+        
+        rolled_up = self.client.get('/api/tasks/stats/').data
+        with self.settings(TASK_STATS_ROLLUP=False):
+            live = self.client.get('/api/tasks/stats/').data
+        self.assertEqual(rolled_up, live)
+        self.assertEqual(rolled_up['by_status']['completed'], 4)
+
+
+@override_settings(TASK_EXPORT_CHUNK_SIZE=2)
+class TaskExportTests(TestCase):
+    """Streaming CSV/NDJSON export of the visible tasks"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.category = Category.objects.create(name='Work', created_by=self.user)
+        self.tags = [Tag.objects.create(name=name, created_by=self.user) for name in ('b-tag', 'a-tag')]
+        for i in range(4):
+            task = Task.objects.create(owner=self.user, title=f'Task {i}', status='todo' if i % 2 else 'completed')
+            TaskCategory.objects.create(task=task, category=self.category)
+            for tag in self.tags:
+                TaskTag.objects.create(task=task, tag=tag)
+        Task.objects.create(owner=self.other, assigned_to=self.user, title='Assigned, with "quotes", commas')
+        Task.objects.create(owner=self.other, title='Hidden')
+    
+    def export(self, query=''):
+        response = self.client.get(f'/api/tasks/export/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+    
+    def test_csv(self):
+        response, body = self.export()
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('tasks.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(body.splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['title'], 'Assigned, with "quotes", commas')
+        self.assertEqual(rows[0]['owner'], 'otheruser')
+        self.assertEqual(rows[0]['assigned_to'], 'testuser')
+        self.assertEqual(rows[1]['categories'], 'Work')
+        self.assertEqual(rows[1]['tags'], 'a-tag|b-tag')
+    
+    def test_ndjson_respects_filters(self):
+        response, body = self.export('?format=ndjson&status=todo')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual({row['title'] for row in rows}, {'Task 1', 'Task 3', 'Assigned, with "quotes", commas'})
+        self.assertEqual(rows[-1]['tags'], ['a-tag', 'b-tag'])
+    
+    def test_reads_in_chunks(self):
+        response = self.client.get('/api/tasks/export/?format=ndjson')
+        # One cursor, plus category and tag names for each chunk of two
+        with self.assertNumQueries(1 + 3 * 2):
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 5)
+    
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/tasks/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    async def test_streams_under_asgi(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        with override_settings(TASK_EXPORT_CHUNK_SIZE=2):
+            response = await self.async_client.get(
+                '/api/tasks/export/?format=ndjson', headers={'Authorization': f'Bearer {token}'}
+            )
+            # An async body, so Django sends chunks as they are read instead of
+            # collecting the whole export first
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(b''.join(chunks).splitlines()), 5)
+
+
+class TaskImportTests(TestCase):
+    """CSV/NDJSON import through the API and import_tasks"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Work', created_by=self.user)
+        Tag.objects.create(name='theirs', created_by=self.other)
+    
+    def upload(self, name, content, **data):
+        return self.client.post(
+            '/api/tasks/import/',
+            {'file': SimpleUploadedFile(name, content.encode()), **data},
+            format='multipart'
+        )
+    
+    def test_csv_import(self):
+        response = self.upload('tasks.csv', (
+            'title,description,status,priority,due_date,assigned_to,categories,tags\n'
+            'First,Notes,todo,high,2030-01-02,otheruser,Work|Home,urgent\n'
+            ',Missing title,todo,low,,,,\n'
+            'Bad status,,someday,low,,,,\n'
+            'Not mine,,todo,low,,,,theirs\n'
+            'Done,,Completed,,,,,\n'
+        ))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5])
+        self.assertIn('title', response.data['errors'][0]['errors'])
+        self.assertIn('tags', response.data['errors'][2]['errors'])
+        
+        first = Task.objects.get(title='First')
+        self.assertEqual(first.owner, self.user)
+        self.assertEqual(first.assigned_to, self.other)
+        self.assertEqual(first.priority, 'high')
+        self.assertEqual(sorted(first.categories.values_list('name', flat=True)), ['Home', 'Work'])
+        self.assertEqual(list(first.tags.values_list('name', flat=True)), ['urgent'])
+        self.assertIsNotNone(Task.objects.get(title='Done').completed_at)
+    
+    def test_round_trip_through_export(self):
+        task = Task.objects.create(owner=self.user, title='Original', priority='low', status='completed')
+        TaskCategory.objects.create(task=task, category=self.category)
+        exported = b''.join(self.client.get('/api/tasks/export/?format=ndjson').streaming_content).decode()
+        Task.objects.all().delete()
+        
+        response = self.upload('backup.ndjson', exported)
+        self.assertEqual(response.data, {'created': 1, 'failed': 0, 'errors': []})
+        copy = Task.objects.get()
+        self.assertEqual((copy.title, copy.priority, copy.status), ('Original', 'low', 'completed'))
+        self.assertEqual(copy.completed_at, task.completed_at)
+        self.assertEqual(list(copy.categories.all()), [self.category])
+    
+    def test_chunks_resolve_names_once(self):
+        rows = [(i, {'title': f'Task {i}', 'categories': ['Work'], 'tags': ['a', 'b']}) for i in range(6)]
+        # Per chunk: savepoint and release, create-then-read for categories
+        # and for tags, then one insert each for tasks and both link tables
+        with self.assertNumQueries(2 * 9):
+            TaskImporter(self.user, chunk_size=3).run(rows)
+        self.assertEqual(TaskTag.objects.count(), 12)
+    
+    def test_rejects_unreadable_rows(self):
+        response = self.upload('tasks.ndjson', '{"title": "Fine"}\nnot json\n[1]\n')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            [error['row'] for error in response.data['errors']], [2, 3]
+        )
+        response = self.upload('tasks.txt', 'title\nx\n', format='xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('title,priority\nOne,low\nTwo,urgent\n')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_tasks', source.name, user='testuser', stdout=stdout, stderr=stderr)
+        self.assertIn('Imported 1 tasks, 1 rows failed', stdout.getvalue())
+        self.assertIn('row 3', stderr.getvalue())
+
+
+class AttachmentUploadTests(TestCase):
+    """Chunked, resumable attachment uploads"""
+    
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=media, TASK_UPLOAD_DIR=os.path.join(media, 'staging')))
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Task')
+        self.content = bytes(range(256)) * 40
+    
+    def start(self, size=None, task=None):
+        return self.client.post('/api/attachment-uploads/', {
+            'task': (task or self.task).pk,
+            'filename': 'data.bin',
+            'size': len(self.content) if size is None else size,
+        })
+    
+    def put_part(self, upload_id, offset, data):
+        return self.client.put(
+            f'/api/attachment-uploads/{upload_id}/parts/?offset={offset}',
+            data, content_type='application/octet-stream'
+        )
+    
+    def test_upload_in_parts(self):
+        upload_id = self.start().data['id']
+        for offset in range(0, len(self.content), 4096):
+            response = self.put_part(upload_id, offset, self.content[offset:offset + 4096])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['offset'], len(self.content))
+        
+        response = self.client.post(f'/api/attachment-uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        attachment = Attachment.objects.get(pk=response.data['id'])
+        self.assertEqual((attachment.filename, attachment.file_size), ('data.bin', len(self.content)))
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'staging')), [])
+    
+    def test_resume_after_interrupted_part(self):
+        upload = AttachmentUpload.objects.get(pk=self.start().data['id'])
+        self.put_part(upload.pk, 0, self.content[:4000])
+        with self.assertRaises(ValidationError):
+            # The connection drops 1000 bytes into a 6000-byte part
+            write_part(upload, 4000, BytesIO(self.content[4000:5000]), 6000)
+        response = self.client.get(f'/api/attachment-uploads/{upload.pk}/')
+        self.assertEqual(response.data['offset'], 4000)
+        
+        self.put_part(upload.pk, 4000, self.content[4000:])
+        self.client.post(f'/api/attachment-uploads/{upload.pk}/complete/')
+        with Attachment.objects.get().file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+    
+    def test_part_racing_another_copy_of_itself(self):
+        upload = AttachmentUpload.objects.get(pk=self.start().data['id'])
+        
+        class SlowStream(BytesIO):
+            # A retry of the same part lands while this one is still arriving
+            def read(stream, size=-1):
+                if not AttachmentUpload.objects.get(pk=upload.pk).offset:
+                    write_part(upload, 0, BytesIO(self.content[:100]), 100)
+                return super().read(size)
+        
+        with self.assertRaises(UploadOffsetMismatch):
+            write_part(upload, 0, SlowStream(b'x' * 100), 100)
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 100)
+        # The loser's copy was thrown away, not written over the winner's
+        self.assertEqual(os.listdir(os.path.dirname(staging_path(upload))), [f'{upload.pk}.part'])
+        with open(staging_path(upload), 'rb') as staged:
+            self.assertEqual(staged.read(), self.content[:100])
+    
+    def test_parts_must_follow_offset(self):
+        upload_id = self.start().data['id']
+        response = self.put_part(upload_id, 100, self.content[:100])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        response = self.put_part(upload_id, 0, self.content + b'extra')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f'/api/attachment-uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Attachment.objects.exists())
+    
+    def test_only_visible_tasks_and_own_uploads(self):
+        theirs = Task.objects.create(owner=self.other, title='Theirs')
+        self.assertEqual(self.start(task=theirs).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(TASK_UPLOAD_MAX_SIZE=10):
+            self.assertEqual(self.start().status_code, status.HTTP_400_BAD_REQUEST)
+        
+        upload_id = self.start().data['id']
+        self.client.force_authenticate(user=self.other)
+        response = self.put_part(upload_id, 0, self.content)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_prune_idle_uploads(self):
+        upload = AttachmentUpload.objects.get(pk=self.start().data['id'])
+        self.put_part(upload.pk, 0, self.content[:10])
+        self.assertEqual(prune_uploads(), 0)
+        self.assertEqual(prune_uploads(timezone.now() + timedelta(days=2)), 1)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertFalse(os.path.exists(staging_path(upload)))
+
+
+class AttachmentDownloadTests(TestCase):
+    """Content-addressed attachment storage and downloads"""
+    
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media))
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Task')
+        self.content = b'0123456789' * 10
+        self.attachment = Attachment.objects.get(pk=self.upload(self.task).data['id'])
+        self.url = f'/api/attachments/{self.attachment.pk}/download/'
+    
+    def upload(self, task, name='notes.txt'):
+        return self.client.post('/api/attachments/', {
+            'task': task.pk,
+            'file': SimpleUploadedFile(name, self.content),
+        }, format='multipart')
+    
+    def test_duplicates_share_storage(self):
+        other_task = Task.objects.create(owner=self.user, title='Other')
+        copy = Attachment.objects.get(pk=self.upload(other_task, 'copy.txt').data['id'])
+        self.assertEqual(copy.file.name, self.attachment.file.name)
+        self.assertEqual(copy.sha256, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual((copy.filename, copy.file_size), ('copy.txt', 100))
+        stored = [files for _, _, files in os.walk(self.media) if files]
+        self.assertEqual(stored, [[copy.sha256]])
+    
+    def test_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertIn('filename="notes.txt"', response['Content-Disposition'])
+        self.assertEqual(response['ETag'], f'"{self.attachment.sha256}"')
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    async def test_streams_under_asgi(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        headers = {'Authorization': f'Bearer {token}'}
+        with patch('tasks.downloads.BLOCK_SIZE', 30):
+            response = await self.async_client.get(self.url, headers=headers)
+            # Read a block at a time rather than whole before sending
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+            self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+            self.assertEqual(b''.join(chunks), self.content)
+            self.assertEqual(response['Content-Length'], '100')
+            
+            response = await self.async_client.get(self.url, headers={**headers, 'Range': 'bytes=10-79'})
+            self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(b''.join(chunks), self.content[10:80])
+        self.assertEqual(response['Content-Range'], 'bytes 10-79/100')
+    
+    def test_requires_task_visibility(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        Task.objects.filter(pk=self.task.pk).update(assigned_to=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+    
+    def test_image_thumbnails(self):
+        image = BytesIO()
+        Image.new('RGB', (1200, 600), (10, 120, 200)).save(image, 'JPEG')
+        with self.settings(RENDITION_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/attachments/', {
+                'task': self.task.pk,
+                'file': SimpleUploadedFile('photo.jpg', image.getvalue()),
+            }, format='multipart')
+        attachment = Attachment.objects.get(pk=response.data['id'])
+        with attachment.file.storage.open(attachment.renditions['thumb']) as thumb:
+            self.assertEqual(Image.open(thumb).size, (320, 160))
+        
+        response = self.client.get(f'/api/attachments/{attachment.pk}/')
+        self.assertTrue(response.data['renditions']['thumb'].endswith('/thumb.webp'))
+        # Text attachments get none
+        self.assertEqual(self.client.get(f'/api/attachments/{self.attachment.pk}/').data['renditions'], {})
+    
+    def test_front_server_handoff(self):
+        with self.settings(TASK_ATTACHMENT_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.attachment.file.name}')
+        self.assertEqual(response.content, b'')
+        with self.settings(TASK_ATTACHMENT_SENDFILE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media, self.attachment.file.name))
+
+
+class FastJSONTests(TestCase):
+    """The orjson-backed renderer and parser match DRF's stdlib ones"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+    
+    def assertRendersLikeDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type)
+        )
+    
+    def test_render_matches_json_renderer(self):
+        self.assertRendersLikeDRF({
+            'aware': timezone.now(),
+            'naive': datetime(2024, 2, 29, 23, 59, 59, 123456),
+            'date': date(2024, 2, 29),
+            'decimal': Decimal('12.50'),
+            'uuid': uuid.uuid4(),
+            'duration': timedelta(hours=1, microseconds=5),
+            'lazy': gettext_lazy('Not found.'),
+            'error': ErrorDetail('Invalid.', code='invalid'),
+            1: ['int keys become strings', 'café', 'line\u2028separator'],
+            'huge': 2 ** 70,
+        })
+        # Indented output for the browsable API and "; indent=" clients
+        self.assertRendersLikeDRF({'a': [1, 2]}, 'application/json; indent=2')
+    
+    def test_render_task_serializer(self):
+        task = Task.objects.create(owner=self.user, title='Ship it', description='über', due_date=timezone.now())
+        Comment.objects.create(task=task, author=self.user, content='First')
+        self.assertRendersLikeDRF(TaskSerializer(Task.objects.all(), many=True).data)
+    
+    def test_parse(self):
+        body = '{"title": "café", "n": 1.5, "big": 1180591620717411303424, "none": null}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), json.loads(body))
+        for invalid in (b'{"title": ', b'{"n": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(invalid))
+    
+    def test_api_round_trip(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post('/api/tasks/', {
+            'title': 'Café', 'description': 'line\u2028separator', 'due_date': '2030-01-02T03:04:05.678901Z'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        body = json.loads(response.content)
+        self.assertEqual(body['description'], 'line\u2028separator')
+        self.assertEqual(body['due_date'], '2030-01-02T03:04:05.678901Z')
+        self.assertIn(b'\\u2028', response.content)
+
+
+class TaskCounterTests(TestCase):
+    """Denormalized comment/attachment counters on tasks"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Counted')
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media, RENDITION_WORKERS=0))
+    
+    def counters(self, task=None):
+        task = task or self.task
+        row = next(row for row in self.client.get('/api/tasks/').data['results'] if row['id'] == task.pk)
+        return row['comment_count'], row['attachment_count'], row['attachment_bytes']
+    
+    def test_saving_stale_copy_keeps_counters(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        self.client.post('/api/comments/', {'task': self.task.pk, 'content': 'One'})
+        self.client.post('/api/attachments/', {
+            'task': self.task.pk, 'file': SimpleUploadedFile('a.txt', b'abc'),
+        }, format='multipart')
+        stale.title = 'Renamed'
+        stale.save()
+        self.client.post(f'/api/tasks/{stale.pk}/complete/')
+        self.assertEqual(self.counters(), (1, 1, 3))
+        self.assertEqual(Task.objects.get(pk=self.task.pk).title, 'Renamed')
+    
+    def test_comments(self):
+        first = self.client.post('/api/comments/', {'task': self.task.pk, 'content': 'One'}).data['id']
+        self.client.post('/api/comments/', {'task': self.task.pk, 'content': 'Two'})
+        self.assertEqual(self.counters(), (2, 0, 0))
+        
+        other = Task.objects.create(owner=self.user, title='Other')
+        self.client.patch(f'/api/comments/{first}/', {'task': other.pk})
+        self.assertEqual(self.counters(), (1, 0, 0))
+        self.assertEqual(self.counters(other), (1, 0, 0))
+        
+        self.client.delete(f'/api/comments/{first}/')
+        self.assertEqual(self.counters(other), (0, 0, 0))
+    
+    def test_attachments(self):
+        response = self.client.post('/api/attachments/', {
+            'task': self.task.pk,
+            'file': SimpleUploadedFile('notes.txt', b'x' * 100),
+        }, format='multipart')
+        self.assertEqual(self.counters(), (0, 1, 100))
+        
+        self.client.patch(f'/api/attachments/{response.data["id"]}/', {
+            'file': SimpleUploadedFile('notes.txt', b'x' * 40),
+        }, format='multipart')
+        self.assertEqual(self.counters(), (0, 1, 40))
+        
+        upload = self.client.post('/api/attachment-uploads/', {
+            'task': self.task.pk, 'filename': 'big.bin', 'size': 10
+        }).data['id']
+        self.client.generic('PUT', f'/api/attachment-uploads/{upload}/parts/?offset=0', b'y' * 10)
+        self.client.post(f'/api/attachment-uploads/{upload}/complete/')
+        self.assertEqual(self.counters(), (0, 2, 50))
+        
+        self.client.delete(f'/api/attachments/{response.data["id"]}/')
+        self.assertEqual(self.counters(), (0, 1, 10))
+    
+    def test_rolled_back_with_the_write(self):
+        with self.assertRaises(RuntimeError), patch('tasks.views.adjust_counters', side_effect=RuntimeError):
+            self.client.post('/api/comments/', {'task': self.task.pk, 'content': 'Lost'})
+        self.assertFalse(Comment.objects.exists())
+    
+    def test_reconcile_command(self):
+        # Written behind the API's back, e.g. in the admin
+        Comment.objects.create(task=self.task, author=self.user, content='Admin')
+        Attachment.objects.create(task=self.task, file='a.txt', filename='a.txt', file_size=7, uploaded_by=self.user)
+        Task.objects.create(owner=self.user, title='Fine')
+        before = Task.objects.get(pk=self.task.pk).updated_at
+        
+        out = StringIO()
+        call_command('reconcile_task_counters', stdout=out)
+        self.assertIn('1 tasks', out.getvalue())
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual((task.comment_count, task.attachment_count, task.attachment_bytes), (1, 1, 7))
+        self.assertGreater(task.updated_at, before)
+        
+        call_command('reconcile_task_counters', stdout=out)
+        self.assertIn('0 tasks', out.getvalue())
+
+
+@override_settings(TASK_EMBED_LIMIT=3)
+class TaskNestedRelationTests(TestCase):
+    """Task detail embeds the newest comments; the rest are paged per task"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(owner=self.user, title='Busy')
+        self.comments = [
+            Comment.objects.create(task=self.task, author=self.user, content=f'Comment {i}')
+            for i in range(12)
+        ]
+        # Ties on created_at are broken by id, newest first
+        self.newest = [comment.pk for comment in reversed(self.comments)]
+        Attachment.objects.create(task=self.task, file='a.txt', filename='a.txt', file_size=1, uploaded_by=self.user)
+    
+    def test_detail_embeds_newest(self):
+        response = self.client.get(f'/api/tasks/{self.task.pk}/')
+        self.assertEqual([comment['id'] for comment in response.data['comments']], self.newest[:3])
+        self.assertEqual(len(response.data['attachments']), 1)
+        self.assertEqual(response.data['comments_url'], f'http://testserver/api/tasks/{self.task.pk}/comments/')
+        self.assertEqual(response.data['attachments_url'], f'http://testserver/api/tasks/{self.task.pk}/attachments/')
+    
+    def test_list_embeds_newest_per_task(self):
+        other = Task.objects.create(owner=self.user, title='Quiet')
+        Comment.objects.create(task=other, author=self.user, content='Only one')
+        # The page of tasks, then one windowed query for their newest comment ids
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tasks/?fields=id,comments&expand=&count=none')
+        comments = {row['id']: row['comments'] for row in response.data['results']}
+        self.assertEqual(comments[self.task.pk], self.newest[:3])
+        self.assertEqual(len(comments[other.pk]), 1)
+    
+    def test_nested_comments_cursor(self):
+        url = f'/api/tasks/{self.task.pk}/comments/'
+        # Task lookup, then one seek for the page
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual([comment['id'] for comment in response.data['results']], self.newest[:10])
+        self.assertIsNone(response.data['previous'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual([comment['id'] for comment in response.data['results']], self.newest[10:])
+        self.assertIsNone(response.data['next'])
+        
+        response = self.client.get(f'{url}?fields=id,content')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'content'})
+    
+    def test_nested_attachments(self):
+        response = self.client.get(f'/api/tasks/{self.task.pk}/attachments/')
+        self.assertEqual([attachment['filename'] for attachment in response.data['results']], ['a.txt'])
+    
+    def test_hidden_task(self):
+        other = User.objects.create_user(username='otheruser', email='other@example.com', password='TestPass123!')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/api/tasks/{self.task.pk}/comments/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThrottleTests(TestCase):
+    """Token buckets per user and scope; reads, writes and auth are separate"""
+    
+    def setUp(self):
+        # A store of its own, so earlier tests' requests don't count
+        self.enterContext(override_settings(
+            THROTTLE_STORE={'BACKEND': 'task_management_api.throttling.LocalBucketStore'},
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {
+                'read': '3/min', 'write': '2/min', 'auth': '1/min', 'token': '2/min',
+            }},
+        ))
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_bucket_refills(self):
+        store = LocalBucketStore()
+        with patch('task_management_api.throttling.time.monotonic', return_value=100.0):
+            self.assertEqual([store.consume('key', 2, 1.0) for _ in range(3)], [0, 0, 1.0])
+        with patch('task_management_api.throttling.time.monotonic', return_value=100.5):
+            self.assertEqual(store.consume('key', 2, 1.0), 0.5)
+        with patch('task_management_api.throttling.time.monotonic', return_value=101.0):
+            self.assertEqual(store.consume('key', 2, 1.0), 0)
+    
+    def test_keys_are_bounded(self):
+        store = LocalBucketStore(max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.consume(key, 1, 1.0)
+        self.assertEqual(len(store), 2)
+        # 'b' was least recently used, so it was forgotten with a full bucket
+        self.assertEqual(store.consume('b', 1, 1.0), 0)
+        self.assertGreater(store.consume('c', 1, 1.0), 0)
+    
+    def test_local_store_warns_with_several_workers(self):
+        with self.assertLogs('task_management_api.throttling', 'WARNING') as logs:
+            LocalBucketStore(workers=2)
+        self.assertIn('THROTTLE_STORE_URL', logs.output[0])
+        with self.assertNoLogs('task_management_api.throttling', 'WARNING'):
+            LocalBucketStore(workers=1)
+    
+    def test_reads_and_writes(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/tasks/').status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '20')
+        
+        # Writes have their own bucket, and so does every user
+        response = self.client.post('/api/tasks/', {'title': 'Still allowed'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        other = User.objects.create_user(username='otheruser', email='other@example.com', password='TestPass123!')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get('/api/tasks/').status_code, status.HTTP_200_OK)
+    
+    def test_auth_by_ip(self):
+        self.client.force_authenticate(user=None)
+        credentials = {'username': 'testuser', 'password': 'TestPass123!'}
+        self.assertEqual(self.client.post('/api/auth/login/', credentials).status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/auth/login/', credentials)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post('/api/auth/login/', credentials, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_token_endpoints_share_a_scope(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        self.client.force_authenticate(user=None)
+        refresh = str(RefreshToken.for_user(self.user))
+        response = self.client.post('/api/auth/token/verify/', {'token': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post('/api/auth/logout/', {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Logins are counted apart
+        credentials = {'username': 'testuser', 'password': 'TestPass123!'}
+        self.assertEqual(self.client.post('/api/auth/login/', credentials).status_code, status.HTTP_200_OK)
+    
+    @override_settings(THROTTLE_STORE={'BACKEND': ''})
+    def test_disabled(self):
+        self.assertIsNone(get_bucket_store())
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/tasks/').status_code, status.HTTP_200_OK)
+
+
+@override_settings(REQUEST_METRICS={'SAMPLE_RATE': 1.0, 'SLOW_REQUEST_MS': None})
+class RequestMetricsTests(TestCase):
+    """Per-request timings, tagged by view action, for slow logs and /metrics/"""
+    
+    def setUp(self):
+        clear_metrics()
+        self.addCleanup(clear_metrics)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='TestPass123!'
+        )
+        self.task = Task.objects.create(title='Measured', owner=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_tagged_by_action(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/tasks/')
+        _, total, count = DB_QUERIES.series('TaskViewSet.list')
+        self.assertEqual((total, count), (len(queries), 1))
+        self.assertGreater(SERIALIZER_DURATION.series('TaskViewSet.list')[1], 0)
+        
+        self.client.post(f'/api/tasks/{self.task.pk}/complete/')
+        self.client.get('/api/auth/profile/')
+        self.assertIsNotNone(REQUEST_DURATION.series('TaskViewSet.complete'))
+        self.assertIsNotNone(REQUEST_DURATION.series('UserProfileView.get'))
+    
+    def test_sampling_off(self):
+        with self.settings(REQUEST_METRICS={'SAMPLE_RATE': 0, 'SLOW_REQUEST_MS': None}):
+            self.client.get('/api/tasks/')
+        self.assertEqual(REQUEST_DURATION.series('TaskViewSet.list')[2], 1)
+        self.assertIsNone(DB_QUERIES.series('TaskViewSet.list'))
+    
+    def test_slow_request_logged(self):
+        with self.settings(REQUEST_METRICS={'SAMPLE_RATE': 1.0, 'SLOW_REQUEST_MS': 0}):
+            with self.assertLogs('task_management_api.metrics', 'WARNING') as logs:
+                self.client.get(f'/api/tasks/{self.task.pk}/')
+        self.assertIn('TaskViewSet.retrieve', logs.output[0])
+        self.assertIn('slowest query', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+    
+    def test_metrics_endpoint(self):
+        self.client.get('/api/tasks/')
+        self.assertEqual(self.client.get('/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_request_db_queries_bucket{view="TaskViewSet.list",le="+Inf"} 1', body)
+        self.assertIn('http_request_db_queries_count{view="TaskViewSet.list"} 1', body)
+
+
+class BenchmarkDataTests(TestCase):
+    """seed_benchmark_data and benchmark_api on a small dataset"""
+    
+    def seed(self, *args):
+        call_command(
+            'seed_benchmark_data', '--users', '5', '--tasks', '60', '--categories', '3', '--tags', '5',
+            '--comments', '2', '--attachments', '1', *args, stdout=StringIO()
+        )
+    
+    def test_seed(self):
+        self.seed()
+        self.assertEqual(User.objects.filter(username__startswith='bench_user_').count(), 5)
+        self.assertEqual(Task.objects.count(), 60)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(TaskTag.objects.exists())
+        # Counters were set along with the rows
+        self.assertEqual(reconcile_counters(), [])
+        
+        comments = Comment.objects.count()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed('--flush')
+        self.assertEqual(Task.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), comments)
+    
+    def test_benchmark_report(self):
+        self.seed()
+        stdout = StringIO()
+        call_command('benchmark_api', '--runs', '3', '--warmup', '0', '--bulk-size', '2', stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report['scenarios']), {'list', 'filter', 'search', 'detail', 'create', 'bulk'})
+        for result in report['scenarios'].values():
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['queries_median'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        # Creates were rolled back
+        self.assertEqual(Task.objects.count(), 60)
+    
+    def test_bulk_larger_than_owned_tasks(self):
+        self.seed()
+        stdout = StringIO()
+        call_command('benchmark_api', '--runs', '2', '--warmup', '0', '--bulk-size', '100', stdout=stdout)
+        # Updates stop at the tasks the user owns rather than repeating ids
+        self.assertEqual(json.loads(stdout.getvalue())['scenarios']['bulk']['errors'], 0)
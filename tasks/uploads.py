@@ -0,0 +1,196 @@
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from .counters import adjust_counters
+from .models import Attachment, AttachmentUpload
+from .storage import store_content
+
+# Bytes copied from the request body to the staging file per write
+READ_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Part does not start at the upload offset. Fetch the upload and resume from its offset.'
+    default_code = 'upload_offset_mismatch'
+
+
+def staging_dir():
+    return str(getattr(settings, 'TASK_UPLOAD_DIR', settings.BASE_DIR / 'upload_staging'))
+
+
+def max_upload_size():
+    return getattr(settings, 'TASK_UPLOAD_MAX_SIZE', 1024 ** 3)
+
+
+def upload_expiry():
+    return timedelta(hours=getattr(settings, 'TASK_UPLOAD_EXPIRY_HOURS', 24))
+
+
+def staging_path(upload):
+    return os.path.join(staging_dir(), f'{upload.pk}.part')
+
+
+class StagedFile(File):
+    """
+    A fully staged upload. Exposing its path lets FileSystemStorage move
+    it into place instead of copying; other backends read it in chunks.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def load_upload(pk, lock=False):
+    uploads = AttachmentUpload.objects.select_for_update() if lock else AttachmentUpload.objects
+    try:
+        return uploads.get(pk=pk)
+    except AttachmentUpload.DoesNotExist:
+        # Completed or aborted since the request looked it up
+        raise NotFound()
+
+
+def check_part(upload, offset, length):
+    if offset != upload.offset:
+        raise UploadOffsetMismatch()
+    if offset + length > upload.size:
+        raise ValidationError({'offset': [f'Part ends past the declared size of {upload.size} bytes.']})
+
+
+def receive_part(stream, length, path):
+    """Copy up to ``length`` bytes from ``stream`` into a new file at ``path``; returns the count."""
+    received = 0
+    with open(path, 'xb') as part:
+        while received < length:
+            try:
+                data = stream.read(min(READ_SIZE, length - received))
+            except OSError:
+                # The client went away mid-part
+                break
+            if not data:
+                break
+            part.write(data)
+            received += len(data)
+    return received
+
+
+def write_part(upload, offset, stream, length):
+    """
+    Copy ``length`` bytes from ``stream`` into the staging file at
+    ``offset`` and move the upload's offset past them. The part is read
+    into a file of its own with no lock held, however slowly the client
+    sends it; the upload row is then locked only to check the offset
+    again, copy the part into place on local disk and record it. A part
+    that arrives short, or loses the race to another copy of itself,
+    leaves the offset where it was, so the client resends from there.
+    """
+    # Refuse a misplaced part before reading its body
+    check_part(load_upload(upload.pk), offset, length)
+    path = staging_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Named like staging files, so prune_uploads sweeps any a crash leaves behind
+    part_path = os.path.join(staging_dir(), f'{upload.pk}-{uuid.uuid4().hex}.part')
+    try:
+        received = receive_part(stream, length, part_path)
+        if received < length:
+            raise ValidationError({'detail': [f'Part ended after {received} of {length} bytes.']})
+
+        with transaction.atomic():
+            upload = load_upload(upload.pk, lock=True)
+            check_part(upload, offset, length)
+            with (
+                open(part_path, 'rb') as part,
+                os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as staged,
+            ):
+                staged.seek(offset)
+                shutil.copyfileobj(part, staged, READ_SIZE)
+                # Drop whatever an earlier, interrupted copy left past this part
+                staged.truncate()
+                staged.flush()
+                os.fsync(staged.fileno())
+            upload.offset += length
+            upload.save(update_fields=['offset', 'updated_at'])
+    finally:
+        discard_staged(part_path)
+    return upload
+
+
+def complete_upload(upload):
+    """
+    Hand the staged file to the content-addressed attachment storage and
+    create the Attachment, with file_size counted from the assembled file.
+    """
+    with transaction.atomic():
+        upload = AttachmentUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.offset != upload.size:
+            raise ValidationError(
+                {'offset': [f'Upload is incomplete: {upload.offset} of {upload.size} bytes received.']}
+            )
+        path = staging_path(upload)
+        if upload.size == 0 and not os.path.exists(path):
+            open(path, 'wb').close()
+
+        with open(path, 'rb') as staged:
+            name, digest, size = store_content(StagedFile(staged, upload.filename))
+        attachment = Attachment.objects.create(
+            task_id=upload.task_id,
+            file=name,
+            filename=upload.filename,
+            file_size=size,
+            sha256=digest,
+            uploaded_by_id=upload.uploaded_by_id
+        )
+        adjust_counters(attachment.task, attachment_count=1, attachment_bytes=size)
+        upload.delete()
+    # Left behind when the same bytes were stored already
+    discard_staged(path)
+    return attachment
+
+
+def discard_staged(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def abort_upload(upload):
+    path = staging_path(upload)
+    upload.delete()
+    discard_staged(path)
+
+
+def prune_uploads(now=None):
+    """
+    Delete uploads idle for longer than TASK_UPLOAD_EXPIRY_HOURS, and
+    staging files whose upload is gone (e.g. deleted with its task).
+    Returns the number of staging files removed.
+    """
+    cutoff = (now or timezone.now()) - upload_expiry()
+    AttachmentUpload.objects.filter(updated_at__lt=cutoff).delete()
+    directory = staging_dir()
+    if not os.path.isdir(directory):
+        return 0
+
+    live = {str(pk) for pk in AttachmentUpload.objects.values_list('pk', flat=True)}
+    removed = 0
+    for entry in os.scandir(directory):
+        name, extension = os.path.splitext(entry.name)
+        # Recent files may belong to an upload created after ``live`` was read
+        if extension != '.part' or name in live or entry.stat().st_mtime >= cutoff.timestamp():
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
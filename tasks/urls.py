@@ -5,8 +5,10 @@ from .views import (
     CategoryViewSet,
     TagViewSet,
     CommentViewSet,
-    AttachmentViewSet
+    AttachmentViewSet,
+    AttachmentUploadViewSet
 )
+from .async_views import AsyncTaskListView, AsyncTaskDetailView, AsyncCommentListView
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
@@ -14,9 +16,16 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'attachments', AttachmentViewSet, basename='attachment')
+router.register(r'attachment-uploads', AttachmentUploadViewSet, basename='attachment-upload')
 
 app_name = 'tasks'
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Coroutine views for ASGI deployments
+    path('async/tasks/', AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/tasks/mine/', AsyncTaskListView.as_view(scope='owned'), name='async-task-mine'),
+    path('async/tasks/assigned/', AsyncTaskListView.as_view(scope='assigned'), name='async-task-assigned'),
+    path('async/tasks/<int:pk>/', AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    path('async/comments/', AsyncCommentListView.as_view(), name='async-comment-list'),
 ]
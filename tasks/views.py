@@ -1,29 +1,74 @@
+import csv
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters, status
-from django.db.models import Q
-from .models import Task, Category, Tag, Comment, Attachment
+from rest_framework import mixins, viewsets, status
+from rest_framework.exceptions import ValidationError
+from task_management_api.fieldsets import FieldSelection, SelectableFieldsMixin
+from task_management_api.renderers import FastJSONRenderer
+from task_management_api.streaming import streaming_content
+from .models import Task, Category, Tag, Comment, Attachment, AttachmentUpload, Tombstone
 from .serializers import (
     TaskSerializer,
     TaskListSerializer,
+    TaskBulkSerializer,
+    TaskSyncSerializer,
     CategorySerializer,
     TagSerializer,
     CommentSerializer,
-    AttachmentSerializer
+    AttachmentSerializer,
+    AttachmentUploadSerializer
 )
-from .filters import TaskFilter
+from .filters import TaskFilter, TaskSearchFilter, TaskOrderingFilter
+from .pagination import KeysetPagination, TaskPagination
+from .cache import cache_list_response
+from .counters import adjust_counters
+from .conditional import conditional_detail_response, conditional_list_response
+from .sync import collect_changes, decode_sync_token
+from .stats import live_stats, rollup_stats, rollups_enabled
+from .export import STREAMS, CSVRenderer, NDJSONRenderer
+from .imports import FORMATS, TaskImporter, guess_format, parse_rows
+from .uploads import write_part, complete_upload, abort_upload
+from .storage import store_content
+from .downloads import DownloadRenderer, attachment_response
 from .permissions import IsOwnerOrReadOnly
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class FieldSelectionMixin:
+    """
+    ``?fields=`` and ``?expand=`` for a view whose serializer uses
+    SelectableFieldsMixin. The same selection drives the serializer and
+    the eager loading, so relations that aren't rendered aren't loaded.
+    """
+    
+    def get_field_selection(self):
+        if not hasattr(self, '_field_selection'):
+            request = getattr(self, 'request', None)
+            self._field_selection = FieldSelection.from_params(request.query_params) if request else None
+        return self._field_selection
+    
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SelectableFieldsMixin):
+            kwargs.setdefault('selection', self.get_field_selection())
+        return super().get_serializer(*args, **kwargs)
+    
+    def setup_eager_loading(self, queryset):
+        return self.get_serializer_class().setup_eager_loading(queryset, self.get_field_selection())
+
+
+class TaskViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """
     Managing tasks with CRUD operations, filtering, search, and pagination.
     Supporting status like filtering, priority sorting, and task assignment.
     """
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = TaskPagination
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, TaskOrderingFilter]
     filterset_class = TaskFilter
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'due_date', 'priority', 'status']
@@ -31,21 +76,66 @@ class TaskViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return tasks owned by or assigned to current user."""
-        user = self.request.user
-        return Task.objects.filter(
-            Q(owner=user) | Q(assigned_to=user)
-        ).distinct()
+        return self.setup_eager_loading(self.get_visible_tasks())
+    
+    def get_visible_tasks(self):
+        return Task.objects.visible_to(self.request.user)
+    
+    def get_list_queryset(self):
+        """The unpaginated rows behind the current list action."""
+        if self.action == 'my_tasks':
+            return Task.objects.filter(owner=self.request.user)
+        if self.action == 'assigned_to_me':
+            return Task.objects.filter(assigned_to=self.request.user)
+        return self.filter_queryset(self.get_visible_tasks())
+    
+    def setup_eager_loading(self, queryset):
+        """Load every relation the serializer for this action renders."""
+        if self.action in ('destroy', 'comments', 'attachments'):
+            # The task itself isn't rendered, so prefetching would only add queries
+            return queryset
+        return super().setup_eager_loading(queryset)
+    
+    def reload_for_response(self, serializer):
+        """Swap the saved task for an eager-loaded copy before it is rendered."""
+        serializer.instance = self.setup_eager_loading(
+            Task.objects.all()
+        ).get(pk=serializer.instance.pk)
+    
+    @conditional_list_response
+    @cache_list_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_detail_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @conditional_detail_response
+    def update(self, request, *args, **kwargs):
+        """PUT/PATCH honour If-Match, so stale writes fail with 412."""
+        return super().update(request, *args, **kwargs)
     
     def get_serializer_class(self):
-        """Use lightweight serializer for list, detailed for others."""
-        if self.action == 'list':
+        """
+        Use lightweight serializer for list, detailed for others. A list
+        with ?fields= or ?expand= picks from the detailed one instead.
+        """
+        if self.action == 'list' and self.get_field_selection() is None:
             return TaskListSerializer
+        if self.action in ('comments', 'attachments'):
+            return self.serializer_class
         return TaskSerializer
     
     def perform_create(self, serializer):
         """Auto-assign current user as owner when creating task"""
         """This prevents users from creating tasks for others"""
         serializer.save(owner=self.request.user)
+        self.reload_for_response(serializer)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        self.reload_for_response(serializer)
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
@@ -56,6 +146,34 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(task)
         return Response(serializer.data)
     
+    @action(
+        detail=True, methods=['get'], serializer_class=CommentSerializer,
+        pagination_class=KeysetPagination, filter_backends=[]
+    )
+    def comments(self, request, pk=None):
+        """All of the task's comments, newest first. Follow ``next`` to page with ?cursor=."""
+        return self.list_related(Comment.objects.all())
+    
+    @action(
+        detail=True, methods=['get'], serializer_class=AttachmentSerializer,
+        pagination_class=KeysetPagination, filter_backends=[]
+    )
+    def attachments(self, request, pk=None):
+        """All of the task's attachments, newest first. Follow ``next`` to page with ?cursor=."""
+        return self.list_related(Attachment.objects.all())
+    
+    def list_related(self, queryset):
+        """
+        A page of the task's comments or attachments. Each page is a seek
+        on the (task, newest first) index, so deep pages cost the same.
+        """
+        task = self.get_object()
+        queryset = self.get_serializer_class().setup_eager_loading(
+            queryset.filter(task=task), self.get_field_selection()
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+    
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
         """Assign task to a user. Requires user_id in request body."""
@@ -82,10 +200,109 @@ class TaskViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create, update and delete many tasks in one transaction.
+        Body: {"create": [{...}], "update": [{"id": 1, ...}], "delete": [2, 3]}
+        """
+        serializer = TaskBulkSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        
+        # Reload the written tasks in one query for the compact response
+        written = TaskListSerializer.setup_eager_loading(Task.objects.all()).in_bulk(
+            [task.pk for task in result['created'] + result['updated']]
+        )
+        return Response({
+            'created': TaskListSerializer([written[task.pk] for task in result['created']], many=True).data,
+            'updated': TaskListSerializer([written[task.pk] for task in result['updated']], many=True).data,
+            'deleted': result['deleted'],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync feed. Pass the previous response's token as ?since= to get
+        only tasks, comments and attachments changed after it, plus the ids
+        of those deleted or no longer visible. Omit it for a full snapshot.
+        """
+        since = request.query_params.get('since')
+        changes = collect_changes(request.user, decode_sync_token(since) if since else None)
+        context = self.get_serializer_context()
+        return Response({
+            'token': changes['token'],
+            'tasks': TaskSyncSerializer(changes['tasks'], many=True, context=context).data,
+            'comments': CommentSerializer(changes['comments'], many=True, context=context).data,
+            'attachments': AttachmentSerializer(changes['attachments'], many=True, context=context).data,
+            'deleted': changes['deleted'],
+        })
+    
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Stream every visible task matching the list filters, search and
+        ordering as CSV (default) or NDJSON: ?format=csv|ndjson.
+        """
+        export_format = request.accepted_renderer.format
+        queryset = self.filter_queryset(self.get_visible_tasks())
+        response = StreamingHttpResponse(
+            streaming_content(request, STREAMS[export_format](queryset)),
+            content_type=f'{request.accepted_renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="tasks.{export_format}"'
+        return response
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_tasks(self, request):
+        """
+        Create tasks from an uploaded CSV or NDJSON file (multipart field
+        ``file``), in the layout /export/ produces. The format follows the
+        file extension unless the ``format`` field gives it. Rows that
+        fail are skipped and listed in the response.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.data.get('format') or guess_format(upload.name)
+        if import_format not in FORMATS:
+            return Response(
+                {'format': [f'Expected one of: {", ".join(FORMATS)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        importer = TaskImporter(request.user)
+        try:
+            importer.run(parse_rows(upload, import_format))
+        except (csv.Error, UnicodeDecodeError) as exc:
+            # Chunks before the unreadable line are already committed
+            return Response(
+                {**importer.report(), 'non_field_errors': [f'Could not read the file: {exc}']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = importer.report()
+        if report['failed'] and not report['created']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Dashboard counts over the visible tasks: by status and priority,
+        overdue, and completions in the last 7 and 30 days. Accepts the
+        list filters and search; unfiltered requests read the per-user
+        rollups when TASK_STATS_ROLLUP is on.
+        """
+        if rollups_enabled() and not request.query_params:
+            return Response(rollup_stats(request.user))
+        return Response(live_stats(self.filter_queryset(self.get_visible_tasks())))
+    
     @action(detail=False, methods=['get'])
+    @conditional_list_response
+    @cache_list_response
     def my_tasks(self, request):
         """Get all tasks owned by current user."""
-        tasks = Task.objects.filter(owner=request.user)
+        tasks = self.setup_eager_loading(self.get_list_queryset())
         page = self.paginate_queryset(tasks)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -94,9 +311,11 @@ class TaskViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @conditional_list_response
+    @cache_list_response
     def assigned_to_me(self, request):
         """Get all tasks assigned to current user."""
-        tasks = Task.objects.filter(assigned_to=request.user)
+        tasks = self.setup_eager_loading(self.get_list_queryset())
         page = self.paginate_queryset(tasks)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -105,60 +324,184 @@ class TaskViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """Managing task categories. Users can only access their own categories."""
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Category.objects.filter(created_by=self.request.user)
+        return self.setup_eager_loading(
+            Category.objects.filter(created_by=self.request.user)
+        )
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """Manage task tags. Users can only access their own tags."""
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Tag.objects.filter(created_by=self.request.user)
+        return self.setup_eager_loading(
+            Tag.objects.filter(created_by=self.request.user)
+        )
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """Manage task comments. Filter by task_id using ?task_id=1 query parameter."""
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskPagination
     
     def get_queryset(self):
+        queryset = self.setup_eager_loading(Comment.objects.all())
         task_id = self.request.query_params.get('task_id')
         if task_id:
-            return Comment.objects.filter(task_id=task_id)
-        return Comment.objects.all()
+            return queryset.filter(task_id=task_id)
+        return queryset
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        adjust_counters(comment.task, comment_count=1)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_task_id = serializer.instance.task_id
+        comment = serializer.save()
+        if comment.task_id != previous_task_id:
+            # Moved to another task: the count moves with it
+            adjust_counters(Task.objects.get(pk=previous_task_id), comment_count=-1)
+            adjust_counters(comment.task, comment_count=1)
+        else:
+            Task.objects.filter(pk=comment.task_id).touch()
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        task, pk = instance.task, instance.pk
+        instance.delete()
+        Tombstone.objects.record('comment', pk, [task.owner_id, task.assigned_to_id], task_id=task.pk)
+        adjust_counters(task, comment_count=-1)
 
 
-class AttachmentViewSet(viewsets.ModelViewSet):
+class AttachmentViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """Manage task attachments. Upload files using multipart/form-data."""
     serializer_class = AttachmentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TaskPagination
     
     def get_queryset(self):
+        queryset = self.setup_eager_loading(Attachment.objects.all())
+        if self.action == 'download':
+            queryset = queryset.filter(task__in=Task.objects.visible_to(self.request.user))
         task_id = self.request.query_params.get('task_id')
         if task_id:
-            return Attachment.objects.filter(task_id=task_id)
-        return Attachment.objects.all()
+            return queryset.filter(task_id=task_id)
+        return queryset
     
     def perform_create(self, serializer):
-        file = self.request.FILES.get('file')
-        serializer.save(
-            uploaded_by=self.request.user,
-            filename=file.name,
-            file_size=file.size
-        )
\ No newline at end of file
+        file = serializer.validated_data.pop('file')
+        name, digest, size = store_content(file)
+        with transaction.atomic():
+            attachment = serializer.save(
+                uploaded_by=self.request.user,
+                file=name,
+                filename=file.name,
+                file_size=size,
+                sha256=digest
+            )
+            adjust_counters(attachment.task, attachment_count=1, attachment_bytes=size)
+    
+    def perform_update(self, serializer):
+        file = serializer.validated_data.pop('file', None)
+        if file is not None:
+            name, digest, size = store_content(file)
+            serializer.validated_data.update(file=name, file_size=size, sha256=digest)
+        previous_task_id, previous_size = serializer.instance.task_id, serializer.instance.file_size
+        with transaction.atomic():
+            attachment = serializer.save()
+            if attachment.task_id != previous_task_id:
+                adjust_counters(
+                    Task.objects.get(pk=previous_task_id),
+                    attachment_count=-1, attachment_bytes=-previous_size
+                )
+                adjust_counters(attachment.task, attachment_count=1, attachment_bytes=attachment.file_size)
+            elif attachment.file_size != previous_size:
+                adjust_counters(attachment.task, attachment_bytes=attachment.file_size - previous_size)
+            else:
+                Task.objects.filter(pk=attachment.task_id).touch()
+    
+    @action(detail=True, methods=['get'], renderer_classes=[FastJSONRenderer, DownloadRenderer])
+    def download(self, request, pk=None):
+        """
+        The attachment's bytes, for users who can see its task. Supports
+        Range requests, or hands off to nginx/Apache when
+        TASK_ATTACHMENT_SENDFILE is set.
+        """
+        return attachment_response(request, self.get_object())
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        task, pk = instance.task, instance.pk
+        instance.delete()
+        Tombstone.objects.record('attachment', pk, [task.owner_id, task.assigned_to_id], task_id=task.pk)
+        adjust_counters(task, attachment_count=-1, attachment_bytes=-instance.file_size)
+
+
+class AttachmentUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet
+):
+    """
+    Chunked, resumable attachment uploads for files too large for one request.
+    
+    1. POST {task, filename, size} to start an upload.
+    2. PUT each part as the raw request body to parts/?offset=N, in order.
+       After a dropped connection, GET the upload and resume from its offset.
+    3. POST complete/ to create the attachment. DELETE abandons the upload.
+    """
+    serializer_class = AttachmentUploadSerializer
+    permission_classes = [IsAuthenticated]
+    # A large file is many parts; they get their own, larger budget
+    throttle_scope = 'uploads'
+    
+    def get_queryset(self):
+        return AttachmentUpload.objects.filter(uploaded_by=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user)
+    
+    def perform_destroy(self, instance):
+        abort_upload(instance)
+    
+    @action(detail=True, methods=['put'])
+    def parts(self, request, pk=None):
+        """Append the request body at ?offset=, streamed to the staging file without buffering."""
+        upload = self.get_object()
+        try:
+            offset = int(request.query_params['offset'])
+            length = int(request.META['CONTENT_LENGTH'])
+        except KeyError:
+            raise ValidationError({'detail': ['The offset parameter and a Content-Length header are required.']})
+        except ValueError:
+            raise ValidationError({'detail': ['Offset and Content-Length must be integers.']})
+        if offset < 0 or length <= 0:
+            raise ValidationError({'detail': ['Parts need a non-negative offset and a non-empty body.']})
+        upload = write_part(upload, offset, request.stream, length)
+        return Response(self.get_serializer(upload).data)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Create the attachment once every byte has arrived."""
+        attachment = complete_upload(self.get_object())
+        return Response(
+            AttachmentSerializer(attachment, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )